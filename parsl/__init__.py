@@ -42,6 +42,7 @@ from parsl.executors import ExtremeScaleExecutor
 
 from parsl.data_provider.files import File
 
+from parsl.dataflow.broadcast import broadcast
 from parsl.dataflow.dflow import DataFlowKernel, DataFlowKernelLoader
 
 __author__ = 'The Parsl Team'
@@ -58,6 +59,7 @@ __all__ = [
     # core
     'DataFlowKernel',
     'File',
+    'broadcast',
 
     # logging
     'set_stream_logger',
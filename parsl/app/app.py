@@ -19,7 +19,7 @@ class AppBase(metaclass=ABCMeta):
 
     """
 
-    def __init__(self, func, data_flow_kernel=None, executors='all', cache=False, ignore_for_cache=None):
+    def __init__(self, func, data_flow_kernel=None, executors='all', cache=False, ignore_for_cache=None, priority=0):
         """Construct the App object.
 
         Args:
@@ -31,6 +31,8 @@ class AppBase(metaclass=ABCMeta):
                after calling :meth:`parsl.dataflow.dflow.DataFlowKernelLoader.load`.
              - executors (str|list) : Labels of the executors that this app can execute over. Default is 'all'.
              - cache (Bool) : Enable caching of this app ?
+             - priority (int or float) : Default priority of invocations of this app. Executors which queue
+               tasks run those with higher priorities first. Default is 0.
 
         Returns:
              - App object.
@@ -43,6 +45,7 @@ class AppBase(metaclass=ABCMeta):
         self.executors = executors
         self.cache = cache
         self.ignore_for_cache = ignore_for_cache
+        self.priority = priority
         if not (isinstance(executors, list) or isinstance(executors, str)):
             logger.error("App {} specifies invalid executor option, expects string or list".format(
                 func.__name__))
@@ -74,8 +77,44 @@ class AppBase(metaclass=ABCMeta):
     def __call__(self, *args, **kwargs):
         pass
 
+    def _pop_priority(self, kwargs):
+        """Remove the parsl_priority keyword argument of an invocation from kwargs,
+        returning the priority of the invocation."""
+        return kwargs.pop('parsl_priority', self.priority)
 
-def python_app(function=None, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=None):
+    def _prepare_invocation(self, kwargs):
+        """Prepare an invocation of this app for submission.
+
+        Removes the parsl_priority keyword argument from kwargs.
+
+        Args:
+             - kwargs (dict) : Keyword arguments of the invocation
+
+        Returns:
+             - (dfk, func, invocation_kwargs, priority) : The DataFlowKernel to submit to, the
+               function to submit, the keyword arguments merged over the defaults of the app,
+               and the priority of the invocation
+        """
+        from parsl.dataflow.dflow import DataFlowKernelLoader
+
+        priority = self._pop_priority(kwargs)
+        invocation_kwargs = {}
+        invocation_kwargs.update(self.kwargs)
+        invocation_kwargs.update(kwargs)
+
+        if self.data_flow_kernel is None:
+            dfk = DataFlowKernelLoader.dfk()
+        else:
+            dfk = self.data_flow_kernel
+
+        return dfk, self._submitted_func(invocation_kwargs), invocation_kwargs, priority
+
+    def _submitted_func(self, invocation_kwargs):
+        """The function to submit for an invocation with invocation_kwargs."""
+        return self.func
+
+
+def python_app(function=None, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=None, priority=0, inline=None):
     """Decorator function for making python apps.
 
     Parameters
@@ -92,6 +131,14 @@ def python_app(function=None, data_flow_kernel=None, cache=False, executors='all
         Labels of the executors that this app can execute over. Default is 'all'.
     cache : bool
         Enable caching of the app call. Default is False.
+    priority : int or float
+        Priority of invocations of the app. Executors which queue tasks run those with higher priorities
+        first. An invocation can override this with a `parsl_priority` keyword argument. Default is 0.
+    inline : bool
+        If True, the app's tasks run on a thread pool in the submitting process rather than on an executor,
+        which avoids serialization and transfer costs for very cheap apps. If None, they run inline when the
+        `inline_threshold` of the config finds them cheap enough, unless the app specifies its executors.
+        Default is None.
     """
     from parsl.app.python import PythonApp
 
@@ -101,14 +148,16 @@ def python_app(function=None, data_flow_kernel=None, cache=False, executors='all
                              data_flow_kernel=data_flow_kernel,
                              cache=cache,
                              executors=executors,
-                             ignore_for_cache=ignore_for_cache)
+                             ignore_for_cache=ignore_for_cache,
+                             priority=priority,
+                             inline=inline)
         return wrapper(func)
     if function is not None:
         return decorator(function)
     return decorator
 
 
-def bash_app(function=None, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=None):
+def bash_app(function=None, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=None, priority=0):
     """Decorator function for making bash apps.
 
     Parameters
@@ -127,6 +176,9 @@ def bash_app(function=None, data_flow_kernel=None, cache=False, executors='all',
         Labels of the executors that this app can execute over. Default is 'all'.
     cache : bool
         Enable caching of the app call. Default is False.
+    priority : int or float
+        Priority of invocations of the app. Executors which queue tasks run those with higher priorities
+        first. An invocation can override this with a `parsl_priority` keyword argument. Default is 0.
     """
     from parsl.app.bash import BashApp
 
@@ -136,7 +188,8 @@ def bash_app(function=None, data_flow_kernel=None, cache=False, executors='all',
                            data_flow_kernel=data_flow_kernel,
                            cache=cache,
                            executors=executors,
-                           ignore_for_cache=ignore_for_cache)
+                           ignore_for_cache=ignore_for_cache,
+                           priority=priority)
         return wrapper(func)
     if function is not None:
         return decorator(function)
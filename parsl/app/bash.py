@@ -3,7 +3,6 @@ from inspect import signature, Parameter
 
 from parsl.app.errors import wrap_error
 from parsl.app.app import AppBase
-from parsl.dataflow.dflow import DataFlowKernelLoader
 
 
 def remote_side_bash_executor(func, *args, **kwargs):
@@ -110,8 +109,9 @@ def remote_side_bash_executor(func, *args, **kwargs):
 
 class BashApp(AppBase):
 
-    def __init__(self, func, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=None):
-        super().__init__(func, data_flow_kernel=data_flow_kernel, executors=executors, cache=cache, ignore_for_cache=ignore_for_cache)
+    def __init__(self, func, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=None, priority=0):
+        super().__init__(func, data_flow_kernel=data_flow_kernel, executors=executors, cache=cache, ignore_for_cache=ignore_for_cache,
+                         priority=priority)
         self.kwargs = {}
 
         # We duplicate the extraction of parameter defaults
@@ -123,6 +123,9 @@ class BashApp(AppBase):
             if sig.parameters[s].default is not Parameter.empty:
                 self.kwargs[s] = sig.parameters[s].default
 
+    def _submitted_func(self, invocation_kwargs):
+        return wrap_error(update_wrapper(remote_side_bash_executor, self.func))
+
     def __call__(self, *args, **kwargs):
         """Handle the call to a Bash app.
 
@@ -136,21 +139,83 @@ class BashApp(AppBase):
                    App_fut
 
         """
-        invocation_kwargs = {}
-        invocation_kwargs.update(self.kwargs)
-        invocation_kwargs.update(kwargs)
-
-        if self.data_flow_kernel is None:
-            dfk = DataFlowKernelLoader.dfk()
-        else:
-            dfk = self.data_flow_kernel
+        dfk, func, invocation_kwargs, priority = self._prepare_invocation(kwargs)
 
-        app_fut = dfk.submit(wrap_error(update_wrapper(remote_side_bash_executor, self.func)),
+        app_fut = dfk.submit(func,
                              app_args=(self.func, *args),
                              executors=self.executors,
                              fn_hash=self.func_hash,
                              cache=self.cache,
                              ignore_for_cache=self.ignore_for_cache,
-                             app_kwargs=invocation_kwargs)
+                             app_kwargs=invocation_kwargs,
+                             priority=priority)
 
         return app_fut
+
+    def map(self, *iterables, **kwargs):
+        """Invoke this app once for each item of the given iterables.
+
+        As with the builtin map, if several iterables are given then the app
+        is invoked with one positional argument taken from each of them, and
+        invocation stops when the shortest iterable is exhausted. Any keyword
+        arguments are passed to every invocation.
+
+        Args:
+             - iterables : Iterables of positional arguments
+
+        Kwargs:
+             - Arbitrary, passed to every invocation
+
+        Returns:
+                   List of App_futs, in the order of the iterables
+
+        """
+        dfk, func, invocation_kwargs, priority = self._prepare_invocation(kwargs)
+
+        app_args_list = [(self.func, *args) for args in zip(*iterables)]
+
+        app_futs = dfk.submit_many(func,
+                                   app_args_list,
+                                   executors=self.executors,
+                                   fn_hash=self.func_hash,
+                                   cache=self.cache,
+                                   ignore_for_cache=self.ignore_for_cache,
+                                   app_kwargs_list=[dict(invocation_kwargs) for args in app_args_list],
+                                   priority=priority)
+
+        return app_futs
+
+    def imap_unordered(self, *iterables, max_inflight=None, **kwargs):
+        """Invoke this app once for each item of the given iterables, keeping
+        at most max_inflight tasks in flight, and yield their results in
+        completion order.
+
+        Items are only taken from the iterables as earlier tasks complete. If a
+        task fails, its exception is raised by the iterator.
+
+        Args:
+             - iterables : Iterables of positional arguments
+
+        Kwargs:
+             - max_inflight (int) : Maximum number of tasks in flight at once.
+               Default is the max_inflight value of the config.
+             - Arbitrary, passed to every invocation
+
+        Returns:
+                   Generator of results, in completion order
+
+        """
+        dfk, func, invocation_kwargs, priority = self._prepare_invocation(kwargs)
+
+        app_futs = dfk.submit_windowed(func,
+                                       ((self.func, *args) for args in zip(*iterables)),
+                                       max_inflight=max_inflight,
+                                       executors=self.executors,
+                                       fn_hash=self.func_hash,
+                                       cache=self.cache,
+                                       ignore_for_cache=self.ignore_for_cache,
+                                       app_kwargs=invocation_kwargs,
+                                       priority=priority)
+
+        for app_fut in app_futs:
+            yield app_fut.result()
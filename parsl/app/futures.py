@@ -4,7 +4,7 @@ import os
 import logging
 from concurrent.futures import Future
 
-from parsl.dataflow.futures import _STATE_TO_DESCRIPTION_MAP, FINISHED
+from parsl.dataflow.futures import _STATE_TO_DESCRIPTION_MAP, FINISHED, wrap_future
 from parsl.app.errors import NotFutureError
 from parsl.data_provider.files import File
 
@@ -97,6 +97,9 @@ class DataFuture(Future):
         else:
             return False
 
+    def __await__(self):
+        return wrap_future(self).__await__()
+
     def __repr__(self):
 
         parent = self.parent
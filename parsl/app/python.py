@@ -5,7 +5,6 @@ tblib.pickling_support.install()
 
 from parsl.app.app import AppBase
 from parsl.app.errors import wrap_error
-from parsl.dataflow.dflow import DataFlowKernelLoader
 
 
 logger = logging.getLogger(__name__)
@@ -35,14 +34,25 @@ def timeout(f, seconds):
 class PythonApp(AppBase):
     """Extends AppBase to cover the Python App."""
 
-    def __init__(self, func, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=[]):
+    def __init__(self, func, data_flow_kernel=None, cache=False, executors='all', ignore_for_cache=[], priority=0, inline=None):
         super().__init__(
             wrap_error(func),
             data_flow_kernel=data_flow_kernel,
             executors=executors,
             cache=cache,
-            ignore_for_cache=ignore_for_cache
+            ignore_for_cache=ignore_for_cache,
+            priority=priority
         )
+        # apps which specify their executors only run inline if asked to
+        if inline is None and executors != 'all':
+            inline = False
+        self.inline = inline
+
+    def _submitted_func(self, invocation_kwargs):
+        walltime = invocation_kwargs.get('walltime')
+        if walltime is not None:
+            return timeout(self.func, walltime)
+        return self.func
 
     def __call__(self, *args, **kwargs):
         """This is where the call to a python app is handled.
@@ -56,26 +66,87 @@ class PythonApp(AppBase):
                    App_fut
 
         """
-        invocation_kwargs = {}
-        invocation_kwargs.update(self.kwargs)
-        invocation_kwargs.update(kwargs)
-
-        if self.data_flow_kernel is None:
-            dfk = DataFlowKernelLoader.dfk()
-        else:
-            dfk = self.data_flow_kernel
-
-        walltime = invocation_kwargs.get('walltime')
-        if walltime is not None:
-            func = timeout(self.func, walltime)
-        else:
-            func = self.func
+        dfk, func, _, priority = self._prepare_invocation(kwargs)
 
         app_fut = dfk.submit(func, app_args=args,
                              executors=self.executors,
                              fn_hash=self.func_hash,
                              cache=self.cache,
                              ignore_for_cache=self.ignore_for_cache,
-                             app_kwargs=kwargs)
+                             app_kwargs=kwargs,
+                             priority=priority,
+                             inline=self.inline)
 
         return app_fut
+
+    def map(self, *iterables, **kwargs):
+        """Invoke this app once for each item of the given iterables.
+
+        As with the builtin map, if several iterables are given then the app
+        is invoked with one positional argument taken from each of them, and
+        invocation stops when the shortest iterable is exhausted. Any keyword
+        arguments are passed to every invocation.
+
+        This is equivalent to calling the app in a loop, but submits the tasks
+        to the DataFlowKernel in bulk, which is much cheaper for large numbers
+        of small tasks.
+
+        Args:
+             - iterables : Iterables of positional arguments
+        Kwargs:
+             - Arbitrary, passed to every invocation
+
+        Returns:
+                   List of App_futs, in the order of the iterables
+
+        """
+        dfk, func, _, priority = self._prepare_invocation(kwargs)
+
+        app_args_list = [tuple(args) for args in zip(*iterables)]
+
+        app_futs = dfk.submit_many(func, app_args_list,
+                                   executors=self.executors,
+                                   fn_hash=self.func_hash,
+                                   cache=self.cache,
+                                   ignore_for_cache=self.ignore_for_cache,
+                                   app_kwargs_list=[dict(kwargs) for args in app_args_list],
+                                   priority=priority,
+                                   inline=self.inline)
+
+        return app_futs
+
+    def imap_unordered(self, *iterables, max_inflight=None, **kwargs):
+        """Invoke this app once for each item of the given iterables, keeping
+        at most max_inflight tasks in flight, and yield their results in
+        completion order.
+
+        Items are only taken from the iterables as earlier tasks complete, so
+        this can consume very long (or unbounded) generators without holding
+        a task for every item. If a task fails, its exception is raised by
+        the iterator.
+
+        Args:
+             - iterables : Iterables of positional arguments
+        Kwargs:
+             - max_inflight (int) : Maximum number of tasks in flight at once.
+               Default is the max_inflight value of the config.
+             - Arbitrary, passed to every invocation
+
+        Returns:
+                   Generator of results, in completion order
+
+        """
+        dfk, func, _, priority = self._prepare_invocation(kwargs)
+
+        app_futs = dfk.submit_windowed(func, zip(*iterables),
+                                       max_inflight=max_inflight,
+                                       executors=self.executors,
+                                       fn_hash=self.func_hash,
+                                       cache=self.cache,
+                                       ignore_for_cache=self.ignore_for_cache,
+                                       app_kwargs=kwargs,
+                                       priority=priority,
+                                       inline=self.inline)
+
+        for app_fut in app_futs:
+            yield app_fut.result()
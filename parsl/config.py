@@ -1,12 +1,14 @@
 import logging
 import typeguard
 
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from parsl.utils import RepresentationMixin
 from parsl.executors.base import ParslExecutor
 from parsl.executors.threads import ThreadPoolExecutor
+from parsl.dataflow.checkpoints import CHECKPOINT_FORMATS
 from parsl.dataflow.error import ConfigurationError
+from parsl.dataflow.executor_selection import ExecutorSelector, SELECTORS
 from parsl.monitoring import MonitoringHub
 
 logger = logging.getLogger(__name__)
@@ -24,17 +26,45 @@ class Config(RepresentationMixin):
         is [:class:`~parsl.executors.threads.ThreadPoolExecutor()`].
     app_cache : bool, optional
         Enable app caching. Default is True.
+    app_cache_max_entries : int, optional
+        Maximum number of app cache results to hold in memory. Least recently used results beyond this are
+        spilled to a store in the run directory, and reloaded when they are next needed. Default is None,
+        which does not limit the number of results.
+    app_cache_max_bytes : int, optional
+        Maximum total size, in pickled bytes, of the app cache results to hold in memory, beyond which results
+        are spilled as for `app_cache_max_entries`. Setting this means that each result is pickled once to
+        measure its size. Default is None, which does not limit the size of results.
     checkpoint_files : list of str, optional
         List of paths to checkpoint files. Default is None.
     checkpoint_mode : str, optional
         Checkpoint mode to use, can be 'dfk_exit', 'task_exit', or 'periodic'. If set to
         `None`, checkpointing will be disabled. Default is None.
+    checkpoint_format : str, optional
+        Format in which to write checkpoints, 'pickle' or 'sqlite'. A 'pickle' checkpoint is a log of results
+        which is read into memory in full when it is loaded. An 'sqlite' checkpoint is a database indexed by
+        task hash, from which results are only read as they are needed. Checkpoints of either format can
+        be loaded regardless of this setting. Default is 'pickle'.
     checkpoint_period : str, optional
         Time interval (in "HH:MM:SS") at which to checkpoint completed tasks. Only has an effect if
         `checkpoint_mode='periodic'`.
+    checkpoint_batch_period : float, optional
+        With `checkpoint_mode='task_exit'`, each task is checkpointed synchronously as it completes if this is 0.
+        Otherwise, completed tasks are checkpointed by a background writer, which commits them together in batches,
+        and this is the maximum time in seconds for which a completed task waits to be committed. It so bounds the
+        number of completed tasks which may be missing from the checkpoint if the workflow crashes. Default is 0.
+    checkpoint_batch_size : int, optional
+        Maximum number of completed tasks committed in one batch with `checkpoint_mode='task_exit'`.
+        Default is 1000.
+    checkpoint_fsync : bool, optional
+        If True, each checkpoint write is synced to disk before it completes, so that checkpointed tasks
+        survive a crash of the machine as well as of the workflow. Default is False.
     data_management_max_threads : int, optional
         Maximum number of threads to allocate for the data manager to use for managing input and output transfers.
         Default is 10.
+    max_inflight : int, optional
+        Maximum number of tasks that windowed submission (:meth:`parsl.dataflow.dflow.DataFlowKernel.submit_windowed`,
+        and the ``imap_unordered`` method of apps) keeps in flight at once, when no limit is given for a particular
+        submission. Default is 10000.
     monitoring : MonitoringHub, optional
         The config to use for database monitoring. Default is None which does not log to a database.
     lazy_errors : bool, optional
@@ -49,6 +79,46 @@ class Config(RepresentationMixin):
         scaling will be disabled. Default is 'simple'.
     max_idletime : float, optional
         The maximum idle time for an executor in the 'simple' strategy. Default is 120.0 seconds.
+    critical_path_scheduling : bool, optional
+        If True, tasks are submitted to executors with a priority which includes an estimate of the length of the
+        longest chain of tasks which depend on them (their critical path), based on the runtimes of completed tasks
+        of each app. Executors which order their queued tasks by priority then run tasks on long chains first, which
+        reduces the makespan of workflows with deep task graphs. Default is False.
+    executor_selection : str or ExecutorSelector, optional
+        Policy for choosing the executor of a task from the executors its app may run on. Can be 'random';
+        'least_outstanding', which chooses the executor with the fewest incomplete tasks; 'worker_weighted',
+        which chooses the executor with the fewest incomplete tasks per connected worker; or an instance of a
+        subclass of :class:`~parsl.dataflow.executor_selection.ExecutorSelector`. Default is 'random'.
+    task_fusion : bool, optional
+        If True, a task which becomes ready to run is submitted together with the chain of waiting tasks below it in
+        which each task depends only on the one before, which has no other dependents, and all run on the same
+        executor. The chain runs as a single task on the executor, saving a round trip through the executor for each
+        task after the first. Tasks which are memoized are not fused, and fusion is disabled when monitoring is
+        enabled. Default is False.
+    task_fusion_max_length : int, optional
+        The maximum number of tasks fused into one submission. Default is 10.
+    speculative_execution : bool, optional
+        If True, a task which has been running for longer than ``speculative_execution_percentile`` of the runtimes of
+        the completed tasks of its app is submitted to its executor a second time, and the first attempt to succeed
+        provides its result. Apps should be safe to run twice. Speculative execution is disabled when task fusion is
+        enabled. Default is False.
+    speculative_execution_percentile : float, optional
+        Percentile of the runtimes of an app beyond which its tasks are re-executed speculatively. Default is 95.
+    speculative_execution_min_samples : int, optional
+        Number of tasks of an app which must have completed before its tasks are re-executed speculatively.
+        Default is 10.
+    inline_threshold : float, optional
+        If set, tasks of python apps which may run on any executor run inline, on a thread pool in this process, once
+        the mean runtime of the completed tasks of their app is below this many seconds. Apps created with
+        ``inline=True`` always run inline. Default is None, which only runs apps created with ``inline=True`` inline.
+    inline_max_threads : int, optional
+        Maximum number of threads for running tasks inline. The threads are only started when ``inline_threshold``
+        is set, or once a task of an app created with ``inline=True`` is submitted. Default is 2.
+    completion_dispatch_threads : int, optional
+        If greater than 0, the handling of completed tasks (retries, memoization, checkpointing and launching the tasks
+        which depend on them) runs on a pool of this many threads, rather than on the executor thread which received the
+        result, so that executors can keep receiving results while completions are handled. The completions of each
+        task are handled in order. Default is 0.
     usage_tracking : bool, optional
         Set this field to True to opt-in to Parsl's usage tracking system. Parsl only collects minimal, non personally-identifiable,
         information used for reporting to our funding agencies. Default is False.
@@ -67,15 +137,32 @@ class Config(RepresentationMixin):
     def __init__(self,
                  executors: Optional[List[ParslExecutor]] = None,
                  app_cache: bool = True,
+                 app_cache_max_entries: Optional[int] = None,
+                 app_cache_max_bytes: Optional[int] = None,
                  checkpoint_files: Optional[List[str]] = None,
                  checkpoint_mode: Optional[str] = None,
+                 checkpoint_format: str = 'pickle',
                  checkpoint_period: Optional[str] = None,
+                 checkpoint_batch_period: float = 0,
+                 checkpoint_batch_size: int = 1000,
+                 checkpoint_fsync: bool = False,
                  data_management_max_threads: int = 10,
                  lazy_errors: bool = True,
+                 max_inflight: int = 10000,
                  retries: int = 0,
                  run_dir: str = 'runinfo',
                  strategy: Optional[str] = 'simple',
                  max_idletime: float = 120.0,
+                 critical_path_scheduling: bool = False,
+                 executor_selection: Union[str, ExecutorSelector] = 'random',
+                 task_fusion: bool = False,
+                 task_fusion_max_length: int = 10,
+                 speculative_execution: bool = False,
+                 speculative_execution_percentile: float = 95.0,
+                 speculative_execution_min_samples: int = 10,
+                 inline_threshold: Optional[float] = None,
+                 inline_max_threads: int = 2,
+                 completion_dispatch_threads: int = 0,
                  monitoring: Optional[MonitoringHub] = None,
                  usage_tracking: bool = False,
                  initialize_logging: bool = True):
@@ -83,8 +170,13 @@ class Config(RepresentationMixin):
             executors = [ThreadPoolExecutor()]
         self.executors = executors
         self.app_cache = app_cache
+        self.app_cache_max_entries = app_cache_max_entries
+        self.app_cache_max_bytes = app_cache_max_bytes
         self.checkpoint_files = checkpoint_files
         self.checkpoint_mode = checkpoint_mode
+        if checkpoint_format not in CHECKPOINT_FORMATS:
+            raise ConfigurationError('checkpoint_format must be one of {}, got {}'.format(CHECKPOINT_FORMATS, repr(checkpoint_format)))
+        self.checkpoint_format = checkpoint_format
         if checkpoint_period is not None:
             if checkpoint_mode is None:
                 logger.debug('The requested `checkpoint_period={}` will have no effect because `checkpoint_mode=None`'.format(
@@ -97,12 +189,43 @@ class Config(RepresentationMixin):
         if checkpoint_mode == 'periodic' and checkpoint_period is None:
             checkpoint_period = "00:30:00"
         self.checkpoint_period = checkpoint_period
+        if checkpoint_batch_period < 0:
+            raise ConfigurationError('checkpoint_batch_period must not be negative, got {}'.format(checkpoint_batch_period))
+        self.checkpoint_batch_period = checkpoint_batch_period
+        if checkpoint_batch_size < 1:
+            raise ConfigurationError('checkpoint_batch_size must be at least 1, got {}'.format(checkpoint_batch_size))
+        self.checkpoint_batch_size = checkpoint_batch_size
+        self.checkpoint_fsync = checkpoint_fsync
         self.data_management_max_threads = data_management_max_threads
         self.lazy_errors = lazy_errors
+        if max_inflight < 1:
+            raise ConfigurationError('max_inflight must be at least 1, got {}'.format(max_inflight))
+        self.max_inflight = max_inflight
         self.retries = retries
         self.run_dir = run_dir
         self.strategy = strategy
         self.max_idletime = max_idletime
+        if isinstance(executor_selection, str) and executor_selection not in SELECTORS:
+            raise ConfigurationError('executor_selection must be one of {} or an ExecutorSelector, got {}'.format(
+                list(SELECTORS), repr(executor_selection)))
+        self.executor_selection = executor_selection
+        self.critical_path_scheduling = critical_path_scheduling
+        self.task_fusion = task_fusion
+        if task_fusion_max_length < 1:
+            raise ConfigurationError('task_fusion_max_length must be at least 1, got {}'.format(task_fusion_max_length))
+        self.task_fusion_max_length = task_fusion_max_length
+        if not 0 < speculative_execution_percentile <= 100:
+            raise ConfigurationError('speculative_execution_percentile must be in (0, 100], got {}'.format(
+                speculative_execution_percentile))
+        self.speculative_execution = speculative_execution
+        self.speculative_execution_percentile = speculative_execution_percentile
+        self.speculative_execution_min_samples = speculative_execution_min_samples
+        self.inline_threshold = inline_threshold
+        self.inline_max_threads = inline_max_threads
+        if completion_dispatch_threads < 0:
+            raise ConfigurationError('completion_dispatch_threads must not be negative, got {}'.format(
+                completion_dispatch_threads))
+        self.completion_dispatch_threads = completion_dispatch_threads
         self.usage_tracking = usage_tracking
         self.initialize_logging = initialize_logging
         self.monitoring = monitoring
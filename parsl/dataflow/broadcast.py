@@ -0,0 +1,147 @@
+"""Broadcast of large arguments shared by many tasks.
+
+An object passed to many tasks, such as a large lookup table, would be
+serialized and sent with every task. Wrapping it with :func:`broadcast`
+instead gives a small :class:`Broadcast` object to pass in its place::
+
+    table = parsl.broadcast(load_table())
+    results = [lookup(table, key) for key in keys]
+
+Executors which support broadcasts, such as the HighThroughputExecutor, send
+the object to each node once and replace the Broadcast with the object on the
+node. For other executors the DFK replaces the Broadcast with the object
+before submitting the task, so apps always see the object itself.
+
+Broadcasts are found where the DFK looks for dependencies: in positional
+and keyword arguments, and in the ``inputs`` list.
+
+Executors hold a broadcast until it is released with :meth:`Broadcast.release`,
+once the tasks which use it have been submitted::
+
+    table.release()
+"""
+import hashlib
+import threading
+
+from ipyparallel.serialize import serialize_object
+
+# Objects larger than this are sent as separate buffers, which workers can
+# use without copying
+BUFFER_THRESHOLD = 1024 * 1024
+
+
+class Broadcast(object):
+    """A reference to an object which is sent to each node once.
+
+    Broadcasts are identified by a digest of the serialized object, which is
+    computed, along with the serialization, the first time either is needed.
+    Only the digest is kept when a Broadcast is pickled.
+    """
+
+    def __init__(self, value):
+        """
+        Args:
+            - value : The object to broadcast
+        """
+        self.value = value
+        self._buffers = None
+        self._broadcast_id = None
+        self._lock = threading.Lock()
+
+    def _serialize(self):
+        with self._lock:
+            if self._buffers is None:
+                buffers = serialize_object(self.value, buffer_threshold=BUFFER_THRESHOLD)
+                digest = hashlib.sha256()
+                for buf in buffers:
+                    digest.update(buf)
+                self._broadcast_id = digest.digest()
+                self._buffers = buffers
+            return self._buffers
+
+    @property
+    def buffers(self):
+        """The buffers of the serialized object."""
+        return self._serialize()
+
+    @property
+    def broadcast_id(self):
+        """The digest identifying the object."""
+        if self._broadcast_id is None:
+            self._serialize()
+        return self._broadcast_id
+
+    def release(self, dfk=None):
+        """Release the copies of the object held by executors, which drop them
+        once the tasks already submitted with it have finished. The serialized
+        object is dropped too. If the Broadcast is passed to more tasks, it is
+        serialized and sent again.
+
+        Args:
+            - dfk (DataFlowKernel) : The DFK whose executors hold the object.
+              Default is the loaded DFK.
+        """
+        if dfk is None:
+            from parsl.dataflow.dflow import DataFlowKernelLoader
+            dfk = DataFlowKernelLoader.dfk()
+        dfk.release_broadcast(self)
+        with self._lock:
+            self._buffers = None
+
+    def __getstate__(self):
+        return {'_broadcast_id': self.broadcast_id}
+
+    def __setstate__(self, state):
+        self.value = None
+        self._buffers = None
+        self._broadcast_id = state['_broadcast_id']
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<Broadcast {}>'.format(self.broadcast_id.hex()[:16] if self._broadcast_id else hex(id(self)))
+
+
+def broadcast(obj):
+    """Wrap an object which is passed to many tasks, so that executors which
+    support broadcasts send it to each node only once.
+
+    Returns:
+        - Broadcast
+    """
+    return Broadcast(obj)
+
+
+def replace_broadcasts(args, kwargs, replace):
+    """Copies of args and kwargs with the Broadcasts replaced by replace(b),
+    or args and kwargs themselves if they have none."""
+    def has_broadcast(items):
+        return any(isinstance(i, Broadcast) for i in items)
+
+    inputs = kwargs.get('inputs')
+    if not (has_broadcast(args) or has_broadcast(kwargs.values()) or
+            (isinstance(inputs, list) and has_broadcast(inputs))):
+        return args, kwargs
+
+    new_args = [replace(a) if isinstance(a, Broadcast) else a for a in args]
+    new_kwargs = {k: replace(v) if isinstance(v, Broadcast) else v for k, v in kwargs.items()}
+    if isinstance(inputs, list):
+        new_kwargs['inputs'] = [replace(i) if isinstance(i, Broadcast) else i for i in inputs]
+    return new_args, new_kwargs
+
+
+def find_broadcasts(args, kwargs):
+    """The distinct Broadcasts in the arguments of a task."""
+    found = {}
+
+    def collect(b):
+        found[b.broadcast_id] = b
+        return b
+
+    replace_broadcasts(args, kwargs, collect)
+    return list(found.values())
+
+
+def resolve_broadcasts(args, kwargs):
+    """Replace the Broadcasts in the arguments of a task with their objects,
+    as held in the submitting process."""
+    return replace_broadcasts(args, kwargs, lambda b: b.value)
@@ -0,0 +1,489 @@
+"""Storage formats for checkpoints.
+
+A checkpoint is a directory holding records of completed tasks, each of which
+is a dict with the keys 'hash' (the task's memoization hashsum), 'exception'
+and 'result'. Two formats are supported:
+
+- 'pickle' : records are appended to ``tasks.pkl`` as a sequence of pickles.
+  Loading such a checkpoint reads every record into memory.
+
+- 'sqlite' : records are stored in an sqlite database, ``tasks.db``, indexed
+  by hash. Loading such a checkpoint only opens the database; a record is read
+  and unpickled when a task with its hash is looked up.
+
+Checkpoints from several runs can be merged into a single 'sqlite' checkpoint,
+holding only the latest record for each hash, with :func:`merge_checkpoints`
+or the ``parsl-compact-checkpoints`` command.
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from parsl.dataflow.error import BadCheckpoint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMATS = ('pickle', 'sqlite')
+
+
+def record_to_future(record):
+    """Make a completed Future from a checkpoint record."""
+    fu = Future()
+    if record['exception']:
+        fu.set_exception(record['exception'])
+    else:
+        fu.set_result(record['result'])
+    return fu
+
+
+class PickleCheckpointStore(object):
+    """A checkpoint stored as a log of pickled records in tasks.pkl."""
+
+    filename = 'tasks.pkl'
+
+    def __init__(self, checkpoint_dir, fsync=False):
+        self.path = os.path.join(checkpoint_dir, self.filename)
+        self.fsync = fsync
+
+    def write(self, records):
+        """Append records to the checkpoint. If fsync is set, they are
+        flushed to disk before this returns."""
+        # We are using pickle here since pickle dumps to a file in 'ab'
+        # mode behave like a incremental log.
+        with open(self.path, 'ab') as f:
+            for record in records:
+                pickle.dump(record, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self):
+        """Iterate over all of the records in the checkpoint, in the order they
+        were written."""
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    # Done with the checkpoint file
+                    break
+
+    def close(self):
+        pass
+
+
+class SqliteCheckpointStore(object):
+    """A checkpoint stored as an sqlite database, tasks.db, indexed by hash.
+
+    Each record is stored pickled, so that it is only unpickled when it is
+    looked up. A later record for a hash replaces any earlier one.
+
+    The database is written in WAL mode. If fsync is set, sqlite syncs each
+    write to disk before it completes. Otherwise, the log is only synced when
+    it is copied into the database, so that the database cannot be corrupted,
+    but the latest writes may be lost if the machine fails.
+    """
+
+    filename = 'tasks.db'
+
+    def __init__(self, checkpoint_dir, readonly=False, fsync=False):
+        self.path = os.path.join(checkpoint_dir, self.filename)
+        self.readonly = readonly
+        self.fsync = fsync
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            if self.readonly:
+                self._db = sqlite3.connect('file:{}?mode=ro'.format(self.path), uri=True, check_same_thread=False)
+            else:
+                self._db = sqlite3.connect(self.path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode = WAL")
+                self._db.execute("PRAGMA synchronous = {}".format('FULL' if self.fsync else 'NORMAL'))
+                self._db.execute("CREATE TABLE IF NOT EXISTS tasks (hash TEXT PRIMARY KEY, record BLOB)")
+                # the checkpoints merged into this one, by merge_checkpoints
+                self._db.execute("CREATE TABLE IF NOT EXISTS merged (path TEXT PRIMARY KEY, signature TEXT)")
+                self._db.commit()
+        return self._db
+
+    def write(self, records):
+        """Add records to the checkpoint, in a single transaction."""
+        rows = [(record['hash'], pickle.dumps(record)) for record in records]
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.executemany("INSERT OR REPLACE INTO tasks (hash, record) VALUES (?, ?)", rows)
+
+    def merged(self):
+        """Return a dict of the paths of the checkpoints merged into this one
+        to the signatures they had when they were merged."""
+        with self._lock:
+            return dict(self._connect().execute("SELECT path, signature FROM merged").fetchall())
+
+    def record_merged(self, path, signature):
+        """Record that the checkpoint at path, with signature, has been merged into this one."""
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.execute("INSERT OR REPLACE INTO merged (path, signature) VALUES (?, ?)", (path, signature))
+
+    def get(self, hashsum):
+        """Return the record for hashsum, or None if there is none."""
+        with self._lock:
+            row = self._connect().execute("SELECT record FROM tasks WHERE hash = ?", (hashsum,)).fetchone()
+        return None if row is None else pickle.loads(row[0])
+
+    def read(self):
+        """Iterate over all of the records in the checkpoint."""
+        with self._lock:
+            rows = self._connect().execute("SELECT record FROM tasks").fetchall()
+        for row in rows:
+            yield pickle.loads(row[0])
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def make_checkpoint_store(checkpoint_dir, checkpoint_format, fsync=False):
+    """Make a store to write checkpoints of the given format to checkpoint_dir."""
+    if checkpoint_format == 'sqlite':
+        return SqliteCheckpointStore(checkpoint_dir, fsync=fsync)
+    elif checkpoint_format == 'pickle':
+        return PickleCheckpointStore(checkpoint_dir, fsync=fsync)
+    else:
+        raise ValueError("Unknown checkpoint format {}, expected one of {}".format(checkpoint_format, CHECKPOINT_FORMATS))
+
+
+class CheckpointWriter(object):
+    """A background thread which checkpoints completed tasks in batches.
+
+    Task ids passed to :meth:`submit` are queued, and committed together by
+    calling commit with a list of task ids. A batch is committed once it holds
+    batch_size tasks, or once batch_period seconds have passed since its first
+    task was submitted, whichever comes first.
+
+    The writer keeps metrics of its commits: see :meth:`stats`.
+    """
+
+    def __init__(self, commit, batch_size=1000, batch_period=0.1):
+        """Start the writer thread.
+
+        Args:
+            - commit (callable) : Called with a list of task ids to checkpoint them
+
+        KWargs:
+            - batch_size (int) : Maximum number of tasks to commit together. Default 1000.
+            - batch_period (float) : Maximum time in seconds for which a task waits to be committed. Default 0.1.
+        """
+        self.commit = commit
+        self.batch_size = batch_size
+        self.batch_period = batch_period
+
+        self.commits = 0
+        self.tasks_committed = 0
+        self.total_commit_time = 0.0
+        self.max_commit_time = 0.0
+        self.max_task_latency = 0.0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="Checkpoint-Writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, task_id):
+        """Queue a completed task to be checkpointed."""
+        self._queue.put((task_id, time.time()))
+
+    def close(self):
+        """Commit any queued tasks and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        logger.info("Checkpoint writer statistics: {}".format(self.stats()))
+
+    def stats(self):
+        """Return a dictionary of the writer's metrics. Latencies are in seconds:
+        the commit time is the time taken to write a batch, and the task latency is
+        the time from a task being submitted until its batch was written."""
+        return {'commits': self.commits,
+                'tasks_committed': self.tasks_committed,
+                'mean_commit_time': self.total_commit_time / self.commits if self.commits else 0.0,
+                'max_commit_time': self.max_commit_time,
+                'max_task_latency': self.max_task_latency}
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = item[1] + self.batch_period
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.time()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        start = time.time()
+        try:
+            self.commit([task_id for (task_id, submitted) in batch])
+        except Exception:
+            logger.exception("Checkpoint writer failed to commit {} tasks".format(len(batch)))
+            return
+        end = time.time()
+
+        self.commits += 1
+        self.tasks_committed += len(batch)
+        self.total_commit_time += end - start
+        self.max_commit_time = max(self.max_commit_time, end - start)
+        self.max_task_latency = max(self.max_task_latency, end - batch[0][1])
+
+
+class CheckpointIndex(object):
+    """Lookup of results in a list of checkpoints, where later checkpoints
+    take precedence over earlier ones.
+
+    Checkpoints in the 'pickle' format are read into memory when the index is
+    made. Checkpoints in the 'sqlite' format are looked up lazily.
+    """
+
+    def __init__(self, checkpoint_dirs):
+        """Open the checkpoints in checkpoint_dirs.
+
+        Args:
+            - checkpoint_dirs (list) : List of filepaths to checkpoints
+              Eg. ['runinfo/001', 'runinfo/002']
+
+        Raises:
+            - BadCheckpoint : if a checkpoint is missing or cannot be read
+        """
+        # Each source is either a dict of hash -> Future, or an SqliteCheckpointStore
+        self._sources = []
+
+        for checkpoint_dir in checkpoint_dirs:
+            logger.info("Loading checkpoints from {}".format(checkpoint_dir))
+            sqlite_store = SqliteCheckpointStore(checkpoint_dir, readonly=True)
+            pickle_store = PickleCheckpointStore(checkpoint_dir)
+
+            found = False
+            if os.path.exists(pickle_store.path):
+                found = True
+                self._sources.append(self._load_pickle(pickle_store))
+            if os.path.exists(sqlite_store.path):
+                found = True
+                try:
+                    count = len(sqlite_store)
+                except Exception:
+                    reason = "Failed to load checkpoint: {}".format(sqlite_store.path)
+                    logger.error(reason)
+                    raise BadCheckpoint(reason)
+                logger.info("Opened checkpoint: {0} with {1} tasks".format(sqlite_store.path, count))
+                self._sources.append(sqlite_store)
+
+            if not found:
+                reason = "Checkpoint file was not found: {}".format(pickle_store.path)
+                logger.error(reason)
+                raise BadCheckpoint(reason)
+
+    @staticmethod
+    def _load_pickle(store):
+        table = {}
+        try:
+            for record in store.read():
+                table[record['hash']] = record_to_future(record)
+        except Exception:
+            reason = "Failed to load checkpoint: {}".format(store.path)
+            logger.error(reason)
+            raise BadCheckpoint(reason)
+
+        logger.info("Completed loading checkpoint: {0} with {1} tasks".format(store.path, len(table)))
+        return table
+
+    def get(self, hashsum):
+        """Return a completed Future holding the checkpointed outcome for
+        hashsum, or None if no checkpoint holds one."""
+        for source in reversed(self._sources):
+            if isinstance(source, dict):
+                fu = source.get(hashsum)
+                if fu is not None:
+                    return fu
+            else:
+                record = source.get(hashsum)
+                if record is not None:
+                    return record_to_future(record)
+        return None
+
+    def __contains__(self, hashsum):
+        return self.get(hashsum) is not None
+
+    def __len__(self):
+        """The total number of records in all of the checkpoints, counting
+        records for the same hash in different checkpoints separately."""
+        return sum(len(source) for source in self._sources)
+
+    def close(self):
+        for source in self._sources:
+            if not isinstance(source, dict):
+                source.close()
+
+
+def _read_checkpoint(store):
+    try:
+        for record in store.read():
+            yield record
+    except Exception:
+        reason = "Failed to load checkpoint: {}".format(store.path)
+        logger.error(reason)
+        raise BadCheckpoint(reason)
+    finally:
+        store.close()
+
+
+def _signature(stores):
+    """Identify the state of the files of a checkpoint by their sizes and modification times."""
+    paths = [path for store in stores for path in (store.path, store.path + '-wal')]
+    stats = [(os.path.basename(path), os.stat(path)) for path in paths if os.path.exists(path)]
+    # readers of an sqlite checkpoint leave an empty log behind them
+    return json.dumps([(name, stat.st_size, stat.st_mtime_ns) for name, stat in stats
+                       if stat.st_size or not name.endswith('-wal')])
+
+
+def merge_checkpoints(checkpoint_dirs, output_dir, batch_size=10000):
+    """Merge checkpoints into a single 'sqlite' checkpoint in output_dir.
+
+    Where several records have the same hash, only the latest is kept: records
+    in later checkpoints take precedence over earlier ones, as when the
+    checkpoints are loaded together. Loading the merged checkpoint therefore
+    gives the same results as loading all of checkpoint_dirs.
+
+    The merged checkpoint records which checkpoints have been merged into it,
+    with the sizes and modification times of their files. If output_dir
+    already holds a merged checkpoint, such as one written by an earlier
+    merge, the checkpoints in checkpoint_dirs are merged into it, skipping
+    those which have been merged before and not changed since, so that the
+    cost of a merge depends on the new checkpoints alone.
+
+    Each checkpoint is recorded as merged once all of its records have been
+    written, so an interrupted merge leaves a valid merged checkpoint, and the
+    checkpoints it had not finished are merged by the next merge.
+
+    Args:
+        - checkpoint_dirs (list) : List of filepaths to checkpoints, oldest first
+        - output_dir (str) : Directory to write the merged checkpoint to
+
+    KWargs:
+        - batch_size (int) : Number of records to write in each transaction. Default 10000.
+
+    Returns:
+        - A dict with the number of 'checkpoints' merged, the number 'skipped' as
+          already merged, the number of 'records_read' from the merged checkpoints
+          and the number of 'records_written' in the merged checkpoint.
+
+    Raises:
+        - BadCheckpoint : if a checkpoint is missing or cannot be read
+        - ValueError : if output_dir holds a 'pickle' checkpoint
+    """
+    output_dir = os.path.abspath(output_dir)
+    if os.path.exists(os.path.join(output_dir, PickleCheckpointStore.filename)):
+        raise ValueError("{} already holds a 'pickle' checkpoint".format(output_dir))
+    os.makedirs(output_dir, exist_ok=True)
+
+    sources = []
+    for checkpoint_dir in checkpoint_dirs:
+        checkpoint_dir = os.path.abspath(checkpoint_dir)
+        if checkpoint_dir == output_dir:
+            continue
+        stores = [PickleCheckpointStore(checkpoint_dir),
+                  SqliteCheckpointStore(checkpoint_dir, readonly=True)]
+        stores = [store for store in stores if os.path.exists(store.path)]
+        if not stores:
+            reason = "Checkpoint file was not found: {}".format(os.path.join(checkpoint_dir, PickleCheckpointStore.filename))
+            logger.error(reason)
+            raise BadCheckpoint(reason)
+        sources.append((checkpoint_dir, stores))
+
+    output = SqliteCheckpointStore(output_dir)
+    records_read = 0
+    merged = 0
+    try:
+        previously_merged = output.merged()
+        for checkpoint_dir, stores in sources:
+            signature = _signature(stores)
+            if previously_merged.get(checkpoint_dir) == signature:
+                logger.debug("Checkpoint {} has already been merged".format(checkpoint_dir))
+                continue
+            for store in stores:
+                logger.info("Merging checkpoint: {}".format(store.path))
+                batch = []
+                for record in _read_checkpoint(store):
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        output.write(batch)
+                        records_read += len(batch)
+                        batch = []
+                output.write(batch)
+                records_read += len(batch)
+            output.record_merged(checkpoint_dir, signature)
+            merged += 1
+        records_written = len(output)
+    finally:
+        output.close()
+
+    logger.info("Merged {} records from {} checkpoints into {} records in {}, skipping {} merged before".format(
+        records_read, merged, records_written, output_dir, len(sources) - merged))
+    return {'checkpoints': merged,
+            'skipped': len(sources) - merged,
+            'records_read': records_read,
+            'records_written': records_written}
+
+
+def cli_run():
+    """Merge the checkpoints of previous runs into a single checkpoint."""
+    from parsl.utils import get_all_checkpoints
+
+    parser = argparse.ArgumentParser(description='Merge parsl checkpoints into a single deduplicated checkpoint')
+    parser.add_argument('checkpoint_dirs', nargs='*',
+                        help='Checkpoint directories to merge, oldest first. Default: all of the checkpoints in the run directory')
+    parser.add_argument('-r', '--rundir', default='runinfo',
+                        help='Run directory in which to find checkpoints, if none are listed. Default: runinfo')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Directory to write the merged checkpoint to')
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Enable debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+
+    checkpoint_dirs = args.checkpoint_dirs or get_all_checkpoints(args.rundir)
+    if not checkpoint_dirs:
+        parser.error("No checkpoints found in {}".format(args.rundir))
+
+    stats = merge_checkpoints(checkpoint_dirs, args.output)
+    print("Merged {records_read} records from {checkpoints} checkpoints into {records_written} records, "
+          "skipping {skipped} checkpoints merged before".format(**stats))
+    print("Merged checkpoint written to {}".format(os.path.abspath(args.output)))
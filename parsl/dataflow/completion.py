@@ -0,0 +1,85 @@
+"""Dispatch of task completion callbacks to a pool of DFK threads.
+
+Executors complete the futures of their tasks from their own threads, such
+as the queue management thread of the HighThroughputExecutor, and the
+callbacks of those futures run synchronously on that thread. The DFK's
+completion handling (retries, memoization, checkpointing, and launching the
+tasks which depend on the completed one) then holds up the receipt of
+further results. A CompletionDispatcher moves that work onto threads of its
+own, leaving executor threads to hand over each completion and return.
+
+Completions are assigned to threads by task id, and each thread handles its
+completions in the order they arrive, so the completions of any one task
+(for example of its retries) are handled in order.
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionDispatcher(object):
+    """A pool of threads which run completion callbacks, keeping the
+    callbacks for each key in order.
+    """
+
+    def __init__(self, threads, name="Completion-Dispatch"):
+        """Start the pool.
+
+        Args:
+            - threads (int) : Number of threads in the pool
+
+        KWargs:
+            - name (str) : Base name of the threads
+        """
+        if threads < 1:
+            raise ValueError("A completion dispatcher needs at least one thread, got {}".format(threads))
+        self._queues = [queue.Queue() for i in range(threads)]
+        self._processed = [0] * threads
+        self.max_depth = 0
+        self._threads = []
+        for i, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(i, q), name="{}-{}".format(name, i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def dispatch(self, key, callback, *args):
+        """Run callback(*args) on the thread of the pool which handles key."""
+        q = self._queues[hash(key) % len(self._queues)]
+        q.put((callback, args))
+        depth = q.qsize()
+        if depth > self.max_depth:
+            # unsynchronized, so may miss a concurrent maximum; this is only instrumentation
+            self.max_depth = depth
+
+    def depth(self):
+        """The number of callbacks waiting to run."""
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self):
+        """Counts of the callbacks which have run and are waiting, and the
+        greatest number seen waiting for one thread."""
+        return {'processed': sum(self._processed),
+                'waiting': self.depth(),
+                'max_depth': self.max_depth}
+
+    def _run(self, index, q):
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            callback, args = item
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("Completion callback {} raised an exception, which will be ignored".format(callback))
+            self._processed[index] += 1
+
+    def close(self):
+        """Run the callbacks which are waiting, and stop the threads."""
+        for q in self._queues:
+            q.put(None)
+        for thread in self._threads:
+            thread.join()
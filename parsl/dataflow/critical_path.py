@@ -0,0 +1,162 @@
+"""Critical path estimates for critical-path-aware scheduling.
+
+The critical path length of a task is the estimated time from the start of
+the task until the end of the longest chain of tasks which depend on it,
+directly or indirectly. Dispatching tasks with longer critical paths first
+keeps deep chains of work moving, and so reduces the makespan of workflows
+with deep task graphs.
+
+Estimates are computed lazily, when a task is dispatched. Submitting a task
+only records it as a dependent of the incomplete tasks it depends on, and
+marks their estimates, and those of their waiting ancestors in turn, as
+stale. Marking stops at tasks which are already stale, so that submitting a
+long chain of tasks costs time linear in its length. Dispatching a task
+computes its critical path length from those of its dependents, recomputing
+only the stale estimates below it.
+
+Launched tasks whose estimates become stale have already been given to
+their executor with their priority at dispatch. They are brought up to date
+when the next task is dispatched, which is when their order relative to the
+tasks which their executor queues matters, and on_launched_update is called
+for them, to let the executor reprioritize them if they are still queued.
+"""
+import logging
+import threading
+
+from parsl.dataflow.states import States
+
+logger = logging.getLogger(__name__)
+
+# states of tasks which have not yet been given to an executor
+_WAITING_STATES = (States.unsched, States.pending, States.runnable)
+
+
+class CriticalPathEstimator(object):
+    """Estimates the critical path length of each task from per-app runtime
+    estimates.
+
+    The runtime of an app is estimated as an exponentially weighted moving
+    average of the runtimes of its completed tasks, measured from launch to
+    completion. Apps with no completed tasks are assumed to take
+    default_runtime seconds, so that until runtimes are known, the critical
+    path length of a task is proportional to the depth of the graph below it.
+    """
+
+    def __init__(self, default_runtime=1.0, smoothing=0.2, on_launched_update=None):
+        """Initialize the estimator.
+
+        KWargs:
+            - default_runtime (float) : Runtime in seconds assumed for apps with no completed tasks. Default 1.0.
+            - smoothing (float) : Weight given to each new runtime in the moving average. Default 0.2.
+            - on_launched_update (callable) : Called with the task record of a launched task whose
+              critical path length has changed. Default None.
+        """
+        self.default_runtime = default_runtime
+        self.smoothing = smoothing
+        self.on_launched_update = on_launched_update
+        self._runtimes = {}
+        # the tasks which depend on each incomplete task
+        self._dependents = {}
+        # launched tasks whose critical path lengths are stale
+        self._stale_launched = {}
+        self._lock = threading.Lock()
+
+    def runtime(self, func_name):
+        """The estimated runtime of an app, in seconds."""
+        return self._runtimes.get(func_name, self.default_runtime)
+
+    def task_submitted(self, task_record):
+        """Record a new task as a dependent of the incomplete tasks it depends
+        on, and mark their critical path lengths as stale."""
+        with self._lock:
+            task_record.critical_path = None
+            stack = []
+            for dep in task_record.depends or ():
+                dep_record = task_record_of(dep)
+                if dep_record is None or dep_record.status not in _WAITING_STATES + (States.launched,):
+                    continue
+                self._dependents.setdefault(dep_record.id, []).append(task_record)
+                stack.append(dep_record)
+
+            while stack:
+                record = stack.pop()
+                if record.critical_path is None:
+                    # its waiting ancestors were marked stale with it
+                    continue
+                record.critical_path = None
+                if record.status == States.launched:
+                    self._stale_launched[record.id] = record
+                    continue
+                for dep in record.depends or ():
+                    dep_record = task_record_of(dep)
+                    if dep_record is not None and dep_record.status in _WAITING_STATES + (States.launched,):
+                        stack.append(dep_record)
+
+    def _length(self, task_record):
+        """The critical path length of a task, computing the stale estimates
+        of it and of the tasks below it. Must be called with the lock held."""
+        stack = [(task_record, False)]
+        while stack:
+            record, expanded = stack.pop()
+            if record.critical_path is not None:
+                continue
+            dependents = self._dependents.get(record.id, ())
+            if expanded:
+                record.critical_path = self.runtime(record.func_name) + \
+                    max((d.critical_path for d in dependents), default=0.0)
+            else:
+                stack.append((record, True))
+                stack.extend((d, False) for d in dependents if d.critical_path is None)
+        return task_record.critical_path
+
+    def length(self, task_record):
+        """The critical path length of a task, in seconds."""
+        with self._lock:
+            return self._length(task_record)
+
+    def priority(self, task_record):
+        """The dispatch priority of a task: its own priority, plus its
+        critical path length in milliseconds.
+
+        This also brings the estimates of launched tasks up to date, calling
+        on_launched_update for each of them.
+        """
+        with self._lock:
+            length = self._length(task_record)
+            launched = list(self._stale_launched.values())
+            self._stale_launched.clear()
+            for record in launched:
+                self._length(record)
+
+        if self.on_launched_update is not None:
+            for record in launched:
+                if record is not task_record:
+                    self.on_launched_update(record)
+        return task_record.priority + int(length * 1000)
+
+    def task_finished(self, task_record):
+        """Forget the dependents of a task which has reached a final state."""
+        with self._lock:
+            self._dependents.pop(task_record.id, None)
+            self._stale_launched.pop(task_record.id, None)
+
+    def task_completed(self, task_record):
+        """Update the runtime estimate of the app of a successfully completed task."""
+        if task_record.time_submitted is None or task_record.time_returned is None:
+            return
+        runtime = (task_record.time_returned - task_record.time_submitted).total_seconds()
+        with self._lock:
+            previous = self._runtimes.get(task_record.func_name)
+            if previous is None:
+                self._runtimes[task_record.func_name] = runtime
+            else:
+                self._runtimes[task_record.func_name] = previous + self.smoothing * (runtime - previous)
+
+
+def task_record_of(fu):
+    """The DFK task record behind an AppFuture, or behind the AppFuture which
+    produces a DataFuture, or None for other futures."""
+    task_record = getattr(fu, 'task_record', None)
+    if task_record is None:
+        task_record = getattr(getattr(fu, 'parent', None), 'task_record', None)
+    return task_record
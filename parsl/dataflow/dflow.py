@@ -3,9 +3,12 @@ import logging
 import os
 import pathlib
 import pickle
-import random
 import typeguard
 import inspect
+import itertools
+import math
+import numbers
+import queue
 import threading
 import sys
 import datetime
@@ -22,12 +25,21 @@ from parsl.app.futures import DataFuture
 from parsl.config import Config
 from parsl.data_provider.data_manager import DataManager
 from parsl.data_provider.files import File
+from parsl.dataflow.broadcast import resolve_broadcasts
+from parsl.dataflow.checkpoints import CheckpointIndex, CheckpointWriter, make_checkpoint_store
+from parsl.dataflow.completion import CompletionDispatcher
+from parsl.dataflow.critical_path import CriticalPathEstimator, task_record_of
+from parsl.dataflow.executor_selection import make_executor_selector
+from parsl.dataflow.inline import INLINE_EXECUTOR_LABEL, InlinePolicy
+from parsl.dataflow.speculation import SPECULATION_INTERVAL, Speculator
 from parsl.dataflow.error import BadCheckpoint, ConfigurationError, DependencyError, DuplicateTaskError
 from parsl.dataflow.flow_control import FlowControl, Timer
+from parsl.dataflow.fusion import mark_previous, run_fused
 from parsl.dataflow.futures import AppFuture
 from parsl.dataflow.memoization import Memoizer
 from parsl.dataflow.rundirs import make_rundir
 from parsl.dataflow.states import States
+from parsl.dataflow.taskrecord import TaskRecord
 from parsl.dataflow.usage_tracking.usage import UsageTracker
 from parsl.executors.threads import ThreadPoolExecutor
 from parsl.utils import get_version, get_std_fname_mode
@@ -154,9 +166,14 @@ class DataFlowKernel(object):
                                  workflow_info)
 
         checkpoints = self.load_checkpoints(config.checkpoint_files)
-        self.memoizer = Memoizer(self, memoize=config.app_cache, checkpoint=checkpoints)
+        self.memoizer = Memoizer(self, memoize=config.app_cache, checkpoint=checkpoints,
+                                 max_entries=config.app_cache_max_entries,
+                                 max_bytes=config.app_cache_max_bytes,
+                                 spill_dir=os.path.join(self.run_dir, 'memo_spill'))
         self.checkpointed_tasks = 0
         self._checkpoint_timer = None
+        self._checkpoint_store = None
+        self.checkpoint_writer = None
         self.checkpoint_mode = config.checkpoint_mode
 
         # the flow control keeps track of executors and provider task states;
@@ -164,10 +181,40 @@ class DataFlowKernel(object):
         # flowcontrol.add_executors.
         self.flowcontrol = FlowControl(self)
 
+        self.completion_dispatcher = None
+        if config.completion_dispatch_threads > 0:
+            self.completion_dispatcher = CompletionDispatcher(config.completion_dispatch_threads)
+
         self.executors = {}
+        self.executor_selector = make_executor_selector(config.executor_selection)
+        self.executor_selector.start(self)
+        self.critical_path = None
+        if config.critical_path_scheduling:
+            self.critical_path = CriticalPathEstimator(on_launched_update=self._reprioritize)
+        self.task_fusion = config.task_fusion
+        if self.task_fusion and self.monitoring is not None:
+            logger.warning("Task fusion is not supported with monitoring, and has been disabled")
+            self.task_fusion = False
+        # with task fusion, the ids of the tasks which depend on each incomplete task
+        self._dependents = {}
+        self.speculator = None
+        self._speculation_timer = None
+        if config.speculative_execution:
+            if self.task_fusion:
+                logger.warning("Speculative execution is not supported with task fusion, and has been disabled")
+            else:
+                self.speculator = Speculator(percentile=config.speculative_execution_percentile,
+                                             min_samples=config.speculative_execution_min_samples)
+        self.inline_policy = None
+        if config.inline_threshold is not None:
+            self.inline_policy = InlinePolicy(config.inline_threshold)
         self.data_manager = DataManager(self)
         data_manager_executor = ThreadPoolExecutor(max_threads=config.data_management_max_threads, label='data_manager')
         self.add_executors(config.executors + [data_manager_executor])
+        # the executor for inline tasks is only started once some task may run inline
+        self._inline_executor_lock = threading.Lock()
+        if self.inline_policy is not None:
+            self._start_inline_executor()
 
         if self.checkpoint_mode == "periodic":
             try:
@@ -178,9 +225,18 @@ class DataFlowKernel(object):
                 logger.error("invalid checkpoint_period provided: {0} expected HH:MM:SS".format(config.checkpoint_period))
                 self._checkpoint_timer = Timer(self.checkpoint, interval=(30 * 60), name="Checkpoint")
 
+        if self.checkpoint_mode == "task_exit" and config.checkpoint_batch_period > 0:
+            self.checkpoint_writer = CheckpointWriter(self.checkpoint,
+                                                      batch_size=config.checkpoint_batch_size,
+                                                      batch_period=config.checkpoint_batch_period)
+
         self.task_count = 0
         self.tasks = {}
         self.submitter_lock = threading.Lock()
+        self.dependency_lock = threading.Lock()
+
+        if self.speculator is not None:
+            self._speculation_timer = Timer(self._speculate, interval=SPECULATION_INTERVAL, name="Speculation")
 
         atexit.register(self.atexit_cleanup)
 
@@ -188,21 +244,22 @@ class DataFlowKernel(object):
         """
         Create the dictionary that will be included in the log.
         """
+        task_record = self.tasks[task_id]
 
         info_to_monitor = ['func_name', 'fn_hash', 'memoize', 'hashsum', 'fail_count', 'status',
                            'id', 'time_submitted', 'time_returned', 'executor']
 
-        task_log_info = {"task_" + k: self.tasks[task_id][k] for k in info_to_monitor}
+        task_log_info = {"task_" + k: getattr(task_record, k) for k in info_to_monitor}
         task_log_info['run_id'] = self.run_id
         task_log_info['timestamp'] = datetime.datetime.now()
-        task_log_info['task_status_name'] = self.tasks[task_id]['status'].name
+        task_log_info['task_status_name'] = task_record.status.name
         task_log_info['tasks_failed_count'] = self.tasks_failed_count
         task_log_info['tasks_completed_count'] = self.tasks_completed_count
-        task_log_info['task_inputs'] = str(self.tasks[task_id]['kwargs'].get('inputs', None))
-        task_log_info['task_outputs'] = str(self.tasks[task_id]['kwargs'].get('outputs', None))
-        task_log_info['task_stdin'] = self.tasks[task_id]['kwargs'].get('stdin', None)
-        stdout_spec = self.tasks[task_id]['kwargs'].get('stdout', None)
-        stderr_spec = self.tasks[task_id]['kwargs'].get('stderr', None)
+        task_log_info['task_inputs'] = str(task_record.kwargs.get('inputs', None))
+        task_log_info['task_outputs'] = str(task_record.kwargs.get('outputs', None))
+        task_log_info['task_stdin'] = task_record.kwargs.get('stdin', None)
+        stdout_spec = task_record.kwargs.get('stdout', None)
+        stderr_spec = task_record.kwargs.get('stderr', None)
         try:
             stdout_name, _ = get_std_fname_mode('stdout', stdout_spec)
         except Exception as e:
@@ -215,30 +272,39 @@ class DataFlowKernel(object):
             stderr_name = str(e)
         task_log_info['task_stdout'] = stdout_name
         task_log_info['task_stderr'] = stderr_name
-        task_log_info['task_fail_history'] = ",".join(self.tasks[task_id]['fail_history'])
+        task_log_info['task_fail_history'] = ",".join(task_record.fail_history)
         task_log_info['task_depends'] = None
-        if self.tasks[task_id]['depends'] is not None:
-            task_log_info['task_depends'] = ",".join([str(t.tid) for t in self.tasks[task_id]['depends']
+        if task_record.depends is not None:
+            task_log_info['task_depends'] = ",".join([str(t.tid) for t in task_record.depends
                                                       if isinstance(t, AppFuture) or isinstance(t, DataFuture)])
         task_log_info['task_elapsed_time'] = None
-        if self.tasks[task_id]['time_returned'] is not None:
-            task_log_info['task_elapsed_time'] = (self.tasks[task_id]['time_returned'] -
-                                                  self.tasks[task_id]['time_submitted']).total_seconds()
+        if task_record.time_returned is not None:
+            task_log_info['task_elapsed_time'] = (task_record.time_returned -
+                                                  task_record.time_submitted).total_seconds()
         task_log_info['task_fail_mode'] = fail_mode
         return task_log_info
 
-    def _count_deps(self, depends):
+    def _dependency_done(self, task_id, dep_fut):
         """Internal.
 
-        Count the number of unresolved futures in the list depends.
+        Callback registered on each dependency of a task. It decrements the
+        count of outstanding dependencies for the task, and when the last
+        dependency completes, considers the task for launch.
+
+        This keeps readiness checking O(1) per dependency completion, rather
+        than rescanning the full list of dependencies each time.
         """
-        count = 0
-        for dep in depends:
-            if isinstance(dep, Future):
-                if not dep.done():
-                    count += 1
+        task_record = self.tasks.get(task_id)
+        if task_record is None:
+            logger.debug("Task {} has no task record. Assuming it has already been processed to completion.".format(task_id))
+            return
 
-        return count
+        with self.dependency_lock:
+            task_record.outstanding_deps -= 1
+            outstanding = task_record.outstanding_deps
+
+        if outstanding == 0:
+            self.launch_if_ready(task_id)
 
     @property
     def config(self):
@@ -262,6 +328,16 @@ class DataFlowKernel(object):
              makes this callback
         """
 
+        task_record = self.tasks.get(task_id)
+        if task_record is None:
+            # the losing attempt at a task which was re-executed
+            # speculatively, completing after the task was wiped
+            logger.debug("Ignoring attempt at task {} which completed after the task was wiped".format(task_id))
+            return
+
+        if self.speculator is not None and not self._accept_attempt(task_record, future):
+            return
+
         try:
             res = future.result()
             if isinstance(res, RemoteExceptionWrapper):
@@ -271,41 +347,48 @@ class DataFlowKernel(object):
             logger.debug("Task {} failed".format(task_id))
             # We keep the history separately, since the future itself could be
             # tossed.
-            self.tasks[task_id]['fail_history'].append(str(e))
-            self.tasks[task_id]['fail_count'] += 1
+            task_record.fail_history.append(str(e))
+            task_record.fail_count += 1
 
             if not self._config.lazy_errors:
                 logger.exception("Eager fail, skipping retry logic")
-                self.tasks[task_id]['status'] = States.failed
+                task_record.status = States.failed
                 if self.monitoring:
                     task_log_info = self._create_task_log_info(task_id, 'eager')
                     self.monitoring.send(MessageType.TASK_INFO, task_log_info)
                 return
 
-            if self.tasks[task_id]['status'] == States.dep_fail:
+            if task_record.status == States.dep_fail:
                 logger.info("Task {} failed due to dependency failure so skipping retries".format(task_id))
-            elif self.tasks[task_id]['fail_count'] <= self._config.retries:
-                self.tasks[task_id]['status'] = States.pending
+            elif task_record.retries_left > 0:
+                task_record.status = States.pending
+                task_record.speculated = False
                 logger.info("Task {} marked for retry".format(task_id))
 
             else:
                 logger.exception("Task {} failed after {} retry attempts".format(task_id,
                                                                                  self._config.retries))
-                self.tasks[task_id]['status'] = States.failed
+                task_record.status = States.failed
                 self.tasks_failed_count += 1
-                self.tasks[task_id]['time_returned'] = datetime.datetime.now()
+                task_record.time_returned = datetime.datetime.now()
 
         else:
-            self.tasks[task_id]['status'] = States.done
+            task_record.status = States.done
             self.tasks_completed_count += 1
 
             logger.info("Task {} completed".format(task_id))
-            self.tasks[task_id]['time_returned'] = datetime.datetime.now()
-
-        if self.tasks[task_id]['app_fu'].stdout is not None:
-            logger.info("Standard output for task {} available at {}".format(task_id, self.tasks[task_id]['app_fu'].stdout))
-        if self.tasks[task_id]['app_fu'].stderr is not None:
-            logger.info("Standard error for task {} available at {}".format(task_id, self.tasks[task_id]['app_fu'].stderr))
+            task_record.time_returned = datetime.datetime.now()
+            if self.critical_path is not None:
+                self.critical_path.task_completed(task_record)
+            if self.speculator is not None:
+                self.speculator.task_completed(task_record)
+            if self.inline_policy is not None:
+                self.inline_policy.task_completed(task_record)
+
+        if task_record.app_fu.stdout is not None:
+            logger.info("Standard output for task {} available at {}".format(task_id, task_record.app_fu.stdout))
+        if task_record.app_fu.stderr is not None:
+            logger.info("Standard error for task {} available at {}".format(task_id, task_record.app_fu.stderr))
 
         if self.monitoring:
             task_log_info = self._create_task_log_info(task_id, 'lazy')
@@ -313,10 +396,10 @@ class DataFlowKernel(object):
 
         # it might be that in the course of the update, we've gone back to being
         # pending - in which case, we should consider ourself for relaunch
-        if self.tasks[task_id]['status'] == States.pending:
+        if task_record.status == States.pending:
             self.launch_if_ready(task_id)
 
-        with self.tasks[task_id]['app_fu']._update_lock:
+        with task_record.app_fu._update_lock:
 
             if not future.done():
                 raise ValueError("done callback called, despite future not reporting itself as done")
@@ -326,15 +409,15 @@ class DataFlowKernel(object):
                 if isinstance(res, RemoteExceptionWrapper):
                     res.reraise()
 
-                self.tasks[task_id]['app_fu'].set_result(future.result())
+                task_record.app_fu.set_result(future.result())
             except Exception as e:
-                if self.tasks[task_id]['retries_left'] > 0:
+                if task_record.retries_left > 0:
                     # ignore this exception, because assume some later
                     # parent executor, started external to this class,
                     # will provide the answer
                     pass
                 else:
-                    self.tasks[task_id]['app_fu'].set_exception(e)
+                    task_record.app_fu.set_exception(e)
 
         return
 
@@ -350,28 +433,65 @@ class DataFlowKernel(object):
                  consistent with the task structure 'app_fu' entry
 
         """
+        task_record = self.tasks[task_id]
 
-        if not self.tasks[task_id]['app_fu'].done():
+        if not task_record.app_fu.done():
             logger.error("Internal consistency error: app_fu is not done for task {}".format(task_id))
-        if not self.tasks[task_id]['app_fu'] == future:
+        if not task_record.app_fu == future:
             logger.error("Internal consistency error: callback future is not the app_fu in task structure, for task {}".format(task_id))
 
-        self.memoizer.update_memo(task_id, self.tasks[task_id], future)
+        self.memoizer.update_memo(task_id, task_record, future)
+        if task_record.executor != INLINE_EXECUTOR_LABEL:
+            self.executor_selector.task_done(task_record.executor)
+        if self.task_fusion:
+            with self.dependency_lock:
+                self._dependents.pop(task_id, None)
+        if self.critical_path is not None:
+            self.critical_path.task_finished(task_record)
+
+        # the task is now in a final state, so its arguments will not be needed again
+        self._release_task_arguments(task_record)
 
         if self.checkpoint_mode == 'task_exit':
-            self.checkpoint(tasks=[task_id])
+            if self.checkpoint_writer is not None:
+                self.checkpoint_writer.submit(task_id)
+            else:
+                self.checkpoint(tasks=[task_id])
 
         # If checkpointing is turned on, wiping app_fu is left to the checkpointing code
         # else we wipe it here.
         if self.checkpoint_mode is None:
             self.wipe_task(task_id)
+            with self.dependency_lock:
+                consumers = task_record.consumers
+            if consumers == 0:
+                self._release_result(task_record)
         return
 
+    def _app_fu_done(self, future):
+        """Done callback for AppFutures. This is a method rather than a per-task
+        partial so that registering it does not allocate anything per task.
+        """
+        self.handle_app_update(future.tid, future)
+
     def wipe_task(self, task_id):
         """ Remove task with task_id from the internal tasks table
         """
         del self.tasks[task_id]
 
+    @staticmethod
+    def _check_priority(priority):
+        """Raise an error unless priority is a number which executors can
+        order tasks by, and which fits in the priority field of HTEX messages."""
+        if isinstance(priority, bool) or not isinstance(priority, numbers.Real):
+            raise TypeError("Task priority must be an int or float, not {}".format(type(priority).__name__))
+        try:
+            finite = math.isfinite(priority)
+        except OverflowError:
+            finite = False
+        if not finite:
+            raise ValueError("Task priority must be a finite number, not {}".format(priority))
+
     @staticmethod
     def check_staging_inhibited(kwargs):
         return kwargs.get('staging_inhibit_output', False)
@@ -399,72 +519,234 @@ class DataFlowKernel(object):
             # assume this task has already been processed to completion
             logger.debug("Task {} has no task record. Assuming it has already been processed to completion.".format(task_id))
             return
-        if self._count_deps(task_record['depends']) == 0:
-
-            # We can now launch *task*
-            new_args, kwargs, exceptions = self.sanitize_and_wrap(task_id,
-                                                                  task_record['args'],
-                                                                  task_record['kwargs'])
-            task_record['args'] = new_args
-            task_record['kwargs'] = kwargs
-            if not exceptions:
-                # There are no dependency errors
-                exec_fu = None
-                # Acquire a lock, retest the state, launch
-                with task_record['task_launch_lock']:
-                    if task_record['status'] == States.pending:
-                        try:
+        if task_record.outstanding_deps == 0:
+
+            exec_fu = None
+            # Acquire a lock, retest the state, launch
+            with task_record.task_launch_lock:
+                if task_record.status != States.pending:
+                    # this task has already been launched (or failed) by some
+                    # other call to launch_if_ready
+                    return
+
+                # We can now launch *task*
+                exec_fu = self._resolve_dependencies(task_id, task_record)
+                if exec_fu is None:
+                    # There are no dependency errors
+                    try:
+                        if self.task_fusion:
+                            exec_fu = self._launch_fusable(task_id, task_record)
+                        else:
                             exec_fu = self.launch_task(
-                                task_id, task_record['func'], *new_args, **kwargs)
-                        except Exception as e:
-                            # task launched failed somehow. the execution might
-                            # have been launched and an exception raised after
-                            # that, though. that's hard to detect from here.
-                            # we don't attempt retries here. This is an error with submission
-                            # even though it might come from user code such as a plugged-in
-                            # executor or memoization hash function.
-
-                            logger.debug("Got an exception launching task", exc_info=True)
-                            self.tasks[task_id]['retries_left'] = 0
-                            exec_fu = Future()
-                            exec_fu.set_exception(e)
-            else:
-                logger.info(
-                    "Task {} failed due to dependency failure".format(task_id))
-                # Raise a dependency exception
-                task_record['status'] = States.dep_fail
-                self.tasks_dep_fail_count += 1
-
-                if self.monitoring is not None:
-                    task_log_info = self._create_task_log_info(task_id, 'lazy')
-                    self.monitoring.send(MessageType.TASK_INFO, task_log_info)
+                                task_id, task_record.func, *task_record.args, **task_record.kwargs)
+                    except Exception as e:
+                        exec_fu = self._launch_failed(task_record, e)
 
-                self.tasks[task_id]['retries_left'] = 0
-                exec_fu = Future()
-                exec_fu.set_exception(DependencyError(exceptions,
-                                                      task_id))
+            if exec_fu:
+                self._track_exec_fu(task_id, task_record, exec_fu)
+
+    def _resolve_dependencies(self, task_id, task_record):
+        """Replace the futures in the arguments of a task, whose dependencies
+        have all completed, with their results. Must be called with the task
+        launch lock held.
+
+        Returns:
+            - None if all dependencies succeeded, otherwise a failed Future
+              carrying a DependencyError, to be used as the task's exec_fu.
+        """
+        new_args, kwargs, exceptions = self.sanitize_and_wrap(task_id,
+                                                              task_record.args,
+                                                              task_record.kwargs)
+        task_record.args = new_args
+        task_record.kwargs = kwargs
+        if not exceptions:
+            return None
+
+        logger.info(
+            "Task {} failed due to dependency failure".format(task_id))
+        # Raise a dependency exception
+        task_record.status = States.dep_fail
+        self.tasks_dep_fail_count += 1
+
+        if self.monitoring is not None:
+            task_log_info = self._create_task_log_info(task_id, 'lazy')
+            self.monitoring.send(MessageType.TASK_INFO, task_log_info)
+
+        task_record.retries_left = 0
+        exec_fu = Future()
+        exec_fu.set_exception(DependencyError(exceptions,
+                                              task_id))
+        return exec_fu
+
+    def _launch_failed(self, task_record, e):
+        """Make a failed exec_fu for a task whose submission raised e."""
+        # task launched failed somehow. the execution might
+        # have been launched and an exception raised after
+        # that, though. that's hard to detect from here.
+        # we don't attempt retries here. This is an error with submission
+        # even though it might come from user code such as a plugged-in
+        # executor or memoization hash function.
+
+        logger.debug("Got an exception launching task", exc_info=True)
+        task_record.retries_left = 0
+        exec_fu = Future()
+        exec_fu.set_exception(e)
+        return exec_fu
+
+    def _track_exec_fu(self, task_id, task_record, exec_fu):
+        """Attach the exec_fu of a task which has just been launched (or
+        failed to launch) to its task record, and arrange for
+        handle_exec_update to be called when it completes.
+        """
+        # Once a task has been dispatched with no retries left, the
+        # DFK will never need its arguments again, unless to re-execute
+        # it speculatively.
+        if task_record.status == States.launched and task_record.retries_left == 0 and self.speculator is None:
+            self._release_task_arguments(task_record)
+        self._release_dependencies(task_record)
+
+        try:
+            exec_fu.add_done_callback(self._exec_done_callback(task_id))
+        except Exception as e:
+            # this exception is ignored here because it is assumed that exception
+            # comes from directly executing handle_exec_update (because exec_fu is
+            # done already). If the callback executes later, then any exception
+            # coming out of the callback will be ignored and not propate anywhere,
+            # so this block attempts to keep the same behaviour here.
+            logger.error("add_done_callback got an exception {} which will be ignored".format(e))
+
+        task_record.exec_fu = exec_fu
+
+    def _exec_done_callback(self, task_id):
+        """The done callback for an execution attempt of a task, which calls
+        handle_exec_update, on a thread of the completion dispatcher if there is one."""
+        if self.completion_dispatcher is None:
+            return partial(self.handle_exec_update, task_id)
+        return partial(self._dispatch_exec_update, task_id)
+
+    def _dispatch_exec_update(self, task_id, future):
+        self.completion_dispatcher.dispatch(task_id, self.handle_exec_update, task_id, future)
+
+    def launch_many_if_ready(self, task_ids):
+        """Launch those of the specified tasks which are ready to run, handing
+        them to their executors in batches.
+
+        This behaves like calling launch_if_ready on each task, but tasks
+        which are bound for the same executor are submitted with a single
+        call to the executor's submit_batch method, under a single
+        acquisition of the submitter lock.
+
+        Tasks which are not ready to run are left for their dependency
+        callbacks to launch, as with launch_if_ready.
+
+        Args:
+            - task_ids (list) : Ids of the tasks to consider for launch
+        """
+        batches = {}
+        for task_id in task_ids:
+            task_record = self.tasks.get(task_id)
+            if task_record is None or task_record.outstanding_deps != 0:
+                continue
+
+            exec_fu = None
+            with task_record.task_launch_lock:
+                if task_record.status != States.pending:
+                    continue
+
+                exec_fu = self._resolve_dependencies(task_id, task_record)
+                if exec_fu is None:
+                    try:
+                        prepared = self._prepare_launch(task_id, task_record, task_record.func)
+                        if isinstance(prepared, Future):
+                            exec_fu = prepared
+                        else:
+                            executor, executable = prepared
+                            # Mark the task as queued for submission, so that
+                            # no other call to launch_if_ready will launch it.
+                            task_record.status = States.runnable
+                            batches.setdefault(executor, []).append((task_record, executable))
+                    except Exception as e:
+                        exec_fu = self._launch_failed(task_record, e)
 
             if exec_fu:
+                self._track_exec_fu(task_id, task_record, exec_fu)
 
-                try:
-                    exec_fu.add_done_callback(partial(self.handle_exec_update, task_id))
-                except Exception as e:
-                    # this exception is ignored here because it is assumed that exception
-                    # comes from directly executing handle_exec_update (because exec_fu is
-                    # done already). If the callback executes later, then any exception
-                    # coming out of the callback will be ignored and not propate anywhere,
-                    # so this block attempts to keep the same behaviour here.
-                    logger.error("add_done_callback got an exception {} which will be ignored".format(e))
+        for executor, batch in batches.items():
+            priorities = [self._dispatch_priority(task_record) for (task_record, _) in batch]
+            if not any(priorities):
+                priorities = None
+            try:
+                with self.submitter_lock:
+                    tasks = [(executable,) + self._executor_arguments(executor, task_record.args, task_record.kwargs)
+                             for (task_record, executable) in batch]
+                    exec_fus = executor.submit_batch(tasks, priorities=priorities)
+                if len(exec_fus) != len(batch):
+                    raise ValueError("Executor {} returned {} futures for a batch of {} tasks".format(
+                        executor.label, len(exec_fus), len(batch)))
+            except Exception as e:
+                exec_fus = [self._launch_failed(task_record, e) for (task_record, _) in batch]
+            else:
+                for (task_record, _) in batch:
+                    self._task_launched(task_record.id, task_record, executor)
+
+            for (task_record, _), exec_fu in zip(batch, exec_fus):
+                self._track_exec_fu(task_record.id, task_record, exec_fu)
 
-                task_record['exec_fu'] = exec_fu
+    def _release_task_arguments(self, task_record):
+        """Drop the DFK's references to the arguments of a task which will not
+        be launched again, keeping only the small descriptive kwargs which are
+        used for logging and monitoring.
+        """
+        keep = ['stdout', 'stderr', 'stdin', 'outputs']
+        if self.monitoring is not None:
+            keep.append('inputs')
+        task_record.release_arguments(keep)
+
+    def _release_dependencies(self, task_record):
+        """Drop the references of a task to the futures of its dependencies,
+        once it has been dispatched to an executor (or has failed without
+        being dispatched) and so will not need them again, and release the
+        results of dependencies which have no other consumers left to dispatch.
+
+        When monitoring, the dependencies of a task are kept, because they
+        are reported with each change of its state.
+        """
+        if self.monitoring is not None:
+            return
+        released = []
+        with self.dependency_lock:
+            depends = task_record.depends
+            task_record.depends = None
+            for d in depends or ():
+                dep_record = task_record_of(d)
+                if dep_record is not None:
+                    dep_record.consumers -= 1
+                    if dep_record.consumers == 0:
+                        released.append(dep_record)
+        for dep_record in released:
+            self._release_result(dep_record)
+
+    def _release_result(self, task_record):
+        """Drop the DFK's internal references to the result of a task whose
+        consumers have all been dispatched, so that the result is freed as soon
+        as the user drops its AppFuture.
+
+        The result is only released once the task has been wiped from the task
+        table: until then, it may still be needed for checkpointing.
+        """
+        if self.tasks.get(task_record.id) is task_record:
+            return
+        task_record.exec_fu = None
+        task_record.speculative_fu = None
+        # break the reference cycle between the task record and its AppFuture
+        task_record.app_fu = None
 
     def launch_task(self, task_id, executable, *args, **kwargs):
         """Handle the actual submission of the task to the executor layer.
 
         If the app task has the executors attributes not set (default=='all')
-        the task is launched on a randomly selected executor from the
-        list of executors. This behavior could later be updated to support
-        binding to executors based on user specified criteria.
+        the task is launched on an executor chosen from the list of
+        executors by the executor_selection policy of the config.
 
         If the app task specifies a particular set of executors, it will be
         targeted at those specific executors.
@@ -479,14 +761,289 @@ class DataFlowKernel(object):
         Returns:
             Future that tracks the execution of the submitted executable
         """
-        self.tasks[task_id]['time_submitted'] = datetime.datetime.now()
+        task_record = self.tasks[task_id]
+        prepared = self._prepare_launch(task_id, task_record, executable)
+        if isinstance(prepared, Future):
+            return prepared
+        executor, executable = prepared
+
+        exec_fu = self._submit(executor, task_record, executable, args, kwargs)
+        self._task_launched(task_id, task_record, executor)
+        return exec_fu
+
+    def _submit(self, executor, task_record, executable, args, kwargs, avoid=None):
+        """Submit executable to executor, with the dispatch priority of task_record.
+
+        If avoid is the future of another attempt at the task on the same
+        executor, and the executor has a submit_elsewhere method, the task is
+        submitted with it so that it does not run where that attempt runs.
+        """
+        priority = self._dispatch_priority(task_record)
+        args, kwargs = self._executor_arguments(executor, args, kwargs)
+        with self.submitter_lock:
+            if avoid is not None and hasattr(executor, 'submit_elsewhere'):
+                return executor.submit_elsewhere(avoid, priority, executable, *args, **kwargs)
+            elif priority:
+                return executor.submit_with_priority(priority, executable, *args, **kwargs)
+            else:
+                return executor.submit(executable, *args, **kwargs)
+
+    def release_broadcast(self, broadcast):
+        """Release the copies of a broadcast held by the executors which resolve
+        broadcasts themselves. Called by Broadcast.release.
+
+        Args:
+            - broadcast (Broadcast) : The broadcast to release
+        """
+        for executor in list(self.executors.values()):
+            if hasattr(executor, 'release_broadcast'):
+                executor.release_broadcast(broadcast.broadcast_id)
+
+    def _executor_arguments(self, executor, args, kwargs):
+        """The arguments of a task as they are passed to an executor: with the
+        Broadcasts replaced by their objects, unless the executor resolves them.
+        """
+        if getattr(executor, "resolves_broadcasts", False):
+            return tuple(args), kwargs
+        args, kwargs = resolve_broadcasts(args, kwargs)
+        return tuple(args), kwargs
+
+    def _launch_fusable(self, task_id, task_record):
+        """Launch a task whose dependencies have been resolved, fused with the
+        chain of waiting tasks below it if there is one. Must be called with the
+        task launch lock held.
+
+        The tasks of the chain after the first are given exec_fus of their own,
+        which are completed from the results of the fused submission by
+        _fused_done.
+
+        Returns:
+            Future that tracks the execution of the task
+        """
+        prepared = self._prepare_launch(task_id, task_record, task_record.func)
+        if isinstance(prepared, Future):
+            return prepared
+        executor, executable = prepared
+
+        chain = self._claim_fusion_chain(task_record)
+        if not chain:
+            exec_fu = self._submit(executor, task_record, executable, task_record.args, task_record.kwargs)
+            self._task_launched(task_id, task_record, executor)
+            return exec_fu
+
+        # Broadcasts within the stages are not seen by executors, so they are
+        # always replaced by their objects
+        stages = [(executable,) + resolve_broadcasts(task_record.args, task_record.kwargs)]
+        previous = task_record
+        for record in chain:
+            args, kwargs = mark_previous(record.args, record.kwargs, previous.app_fu)
+            stages.append((record.func,) + resolve_broadcasts(args, kwargs))
+            previous = record
+
+        try:
+            fused_fu = self._submit(executor, task_record, run_fused, [stages], {})
+        except Exception:
+            for record in chain:
+                record.status = States.pending
+            raise
+        logger.debug("Task {} fused with tasks {}".format(task_id, [record.id for record in chain]))
+
+        self._task_launched(task_id, task_record, executor)
+        exec_fus = [Future()]
+        for record in chain:
+            record.time_submitted = task_record.time_submitted
+            self._task_launched(record.id, record, executor)
+            exec_fu = Future()
+            exec_fu.add_done_callback(self._exec_done_callback(record.id))
+            record.exec_fu = exec_fu
+            exec_fus.append(exec_fu)
+
+        fused_fu.add_done_callback(partial(self._fused_done, [task_record] + chain, exec_fus))
+        return exec_fus[0]
+
+    def _claim_fusion_chain(self, task_record):
+        """Find the chain of waiting tasks below a task which is being launched
+        in which each task depends only on the one before, which has no other
+        dependents, and all run on the same executor. Tasks of the chain are
+        marked runnable, so that no call to launch_if_ready will launch them.
+
+        Returns:
+            - The list of the task records of the chain, in order
+        """
+        chain = []
+        previous = task_record
+        while len(chain) + 1 < self._config.task_fusion_max_length:
+            with self.dependency_lock:
+                dependents = self._dependents.get(previous.id)
+                if dependents is None or len(dependents) != 1:
+                    break
+                record = self.tasks.get(dependents[0])
+            if record is None or record.executor != task_record.executor or record.memoize:
+                break
+            if not record.depends or len(record.depends) != 1 or record.depends[0] is not previous.app_fu:
+                break
+            with record.task_launch_lock:
+                if record.status != States.pending:
+                    break
+                record.status = States.runnable
+            chain.append(record)
+            previous = record
+        return chain
+
+    def _fused_done(self, task_records, exec_fus, future):
+        """Callback for the completion of a fused submission, which passes the
+        result of each task of the chain to its exec_fu.
+
+        Tasks after one which failed were not run, and are returned to pending
+        state, to be launched (or fail with a dependency error) when the task
+        they depend on completes.
+        """
+        try:
+            results = future.result()
+        except Exception as e:
+            results = None
+            error = e
+
+        executed = 1 if results is None else len(results)
+        for task_record in task_records[executed:]:
+            with task_record.task_launch_lock:
+                task_record.status = States.pending
+
+        if results is None:
+            exec_fus[0].set_exception(error)
+        else:
+            for task_record in task_records[1:len(results)]:
+                self._release_dependencies(task_record)
+            for exec_fu, result in zip(exec_fus, results):
+                exec_fu.set_result(result)
+
+    def _speculate(self):
+        """Launch a speculative copy of each straggling task. Called
+        periodically by the speculation timer."""
+        stragglers = self.speculator.stragglers(list(self.tasks.values()), datetime.datetime.now())
+        for task_record in stragglers:
+            self._launch_speculative(task_record)
+
+    def _speculative_executor(self, task_record):
+        """Choose the executor for a speculative copy of a task: another of the
+        executors the task could have been sent to, which stages files in the
+        same way as its own, if there is one, and otherwise its own executor.
+        """
+        executor = self.executors[task_record.executor]
+        others = [label for label in task_record.choices or ()
+                  if label != task_record.executor and label in self.executors and
+                  getattr(self.executors[label], 'storage_access', None) == getattr(executor, 'storage_access', None)]
+        if others:
+            return self.executors[self.executor_selector.select(others)]
+        return executor
+
+    def _launch_speculative(self, task_record):
+        """Submit a second attempt at a launched task, to another executor if
+        the task could run on one, and otherwise to its own executor, which
+        is asked to run it elsewhere than the first attempt if it can. The
+        outcomes of the two attempts are reconciled by _accept_attempt."""
+        with task_record.task_launch_lock:
+            exec_fu = task_record.exec_fu
+            if task_record.status != States.launched or task_record.speculated or \
+                    exec_fu is None or exec_fu.done() or task_record.args is None:
+                return
+            executor = self._speculative_executor(task_record)
+            avoid = exec_fu if executor.label == task_record.executor else None
+            try:
+                speculative_fu = self._submit(executor, task_record,
+                                              task_record.func, task_record.args, task_record.kwargs,
+                                              avoid=avoid)
+            except Exception:
+                logger.exception("Failed to launch a speculative copy of task {}".format(task_record.id))
+                return
+            task_record.speculated = True
+            task_record.speculative_fu = speculative_fu
+
+        logger.info("Task {} launched a speculative copy on executor {}".format(task_record.id, executor.label))
+        speculative_fu.add_done_callback(self._exec_done_callback(task_record.id))
+
+    def _accept_attempt(self, task_record, future):
+        """Decide whether the completion of an attempt at a task should be
+        handled, when the task may have been re-executed speculatively.
+
+        While two attempts are running, the first to succeed is accepted, and
+        a failure is ignored in favour of the other attempt. Once an attempt
+        has been accepted, or the other ignored, only the task's exec_fu is
+        accepted, so the outcome of a losing attempt is ignored.
+
+        Returns:
+            - True if the outcome of future should be handled
+        """
+        with task_record.task_launch_lock:
+            speculative_fu = task_record.speculative_fu
+            if speculative_fu is None:
+                if not task_record.speculated:
+                    # no copy will be launched of an attempt which has completed
+                    task_record.speculated = True
+                    return True
+                return future is task_record.exec_fu
+
+            if future is speculative_fu:
+                other = task_record.exec_fu
+            elif future is task_record.exec_fu:
+                other = speculative_fu
+            else:
+                return False
+            task_record.speculative_fu = None
+
+            if future.exception() is None and not isinstance(future.result(), RemoteExceptionWrapper):
+                task_record.exec_fu = future
+                accepted = True
+            else:
+                task_record.exec_fu = other
+                accepted = False
 
-        memo_fu = self.memoizer.check_memo(task_id, self.tasks[task_id])
+        if accepted:
+            logger.info("Task {} completed by {} attempt".format(task_record.id,
+                                                                 'speculative' if future is speculative_fu else 'original'))
+        else:
+            logger.info("Task {} ignoring failed attempt, as another is running".format(task_record.id))
+        return accepted
+
+    def _reprioritize(self, task_record):
+        """Pass the new dispatch priority of a launched task to its executor."""
+        exec_fu = task_record.exec_fu
+        if exec_fu is None or exec_fu.done():
+            return
+        try:
+            self.executors[task_record.executor].reprioritize(exec_fu, self._dispatch_priority(task_record))
+        except Exception:
+            logger.exception("Failed to reprioritize task {}".format(task_record.id))
+
+    def _dispatch_priority(self, task_record):
+        """The priority with which to submit a task to its executor: its own
+        priority, or with critical path scheduling, that plus its critical
+        path length in milliseconds."""
+        if self.critical_path is not None:
+            return self.critical_path.priority(task_record)
+        return task_record.priority
+
+    def _prepare_launch(self, task_id, task_record, executable):
+        """Do the work of launching a task which comes before submission to
+        an executor.
+
+        Returns:
+            - A Future holding the memoized result of the task if there is one,
+              otherwise a tuple of the executor to submit the task to and the
+              executable to submit.
+        """
+        task_record.time_submitted = datetime.datetime.now()
+
+        memo_fu = self.memoizer.check_memo(task_id, task_record)
         if memo_fu:
             logger.info("Reusing cached result for task {}".format(task_id))
+            # The memoized outcome is final: retrying would only fetch
+            # the same outcome again.
+            task_record.status = States.launched
+            task_record.retries_left = 0
             return memo_fu
 
-        executor_label = self.tasks[task_id]["executor"]
+        executor_label = task_record.executor
         try:
             executor = self.executors[executor_label]
         except Exception:
@@ -500,18 +1057,18 @@ class DataFlowKernel(object):
                                                          self.run_id,
                                                          wrapper_logging_level,
                                                          self.monitoring.resource_monitoring_interval)
+        return executor, executable
 
-        with self.submitter_lock:
-            exec_fu = executor.submit(executable, *args, **kwargs)
-        self.tasks[task_id]['status'] = States.launched
+    def _task_launched(self, task_id, task_record, executor):
+        """Update the record of a task which has been submitted to executor."""
+        task_record.status = States.launched
         if self.monitoring is not None:
             task_log_info = self._create_task_log_info(task_id, 'lazy')
             self.monitoring.send(MessageType.TASK_INFO, task_log_info)
 
-        self.tasks[task_id]['retries_left'] = self._config.retries - \
-            self.tasks[task_id]['fail_count']
+        task_record.retries_left = self._config.retries - \
+            task_record.fail_count
         logger.info("Task {} launched on executor {}".format(task_id, executor.label))
-        return exec_fu
 
     def _add_input_deps(self, executor, args, kwargs, func):
         """Look for inputs of the app that are files. Give the data manager
@@ -663,12 +1220,13 @@ class DataFlowKernel(object):
 
         return new_args, kwargs, dep_failures
 
-    def submit(self, func, app_args, executors='all', fn_hash=None, cache=False, ignore_for_cache=None, app_kwargs={}):
+    def submit(self, func, app_args, executors='all', fn_hash=None, cache=False, ignore_for_cache=None, app_kwargs={},
+               priority=0, inline=False):
         """Add task to the dataflow system.
 
         If the app task has the executors attributes not set (default=='all')
-        the task will be launched on a randomly selected executor from the
-        list of executors. If the app task specifies a particular set of
+        the task will be launched on an executor chosen from the list of
+        executors by the executor_selection policy of the config. If the app task specifies a particular set of
         executors, it will be targeted at the specified executors.
 
         >>> IF all deps are met:
@@ -688,6 +1246,11 @@ class DataFlowKernel(object):
             - cache (Bool) : To enable memoization or not
             - ignore_for_cache (list) : List of kwargs to be ignored for memoization/checkpointing
             - app_kwargs (dict) : Rest of the kwargs to the fn passed as dict.
+            - priority (int or float) : Priority of the task. Executors which queue tasks run
+                    those with higher priorities first. Default=0
+            - inline (Bool) : Whether to run the task on the DFK's own thread pool rather
+                    than on one of executors. If None, the task runs inline if the
+                    inline_threshold of the config says its app is cheap enough. Default=False
 
         Returns:
                (AppFuture) [DataFutures,]
@@ -700,15 +1263,208 @@ class DataFlowKernel(object):
         if self.cleanup_called:
             raise ValueError("Cannot submit to a DFK that has been cleaned up")
 
-        task_id = self.task_count
-        self.task_count += 1
+        choices = self._executor_choices(self.task_count, executors)
+        task_record = self._create_task(func, app_args, choices, fn_hash, cache, ignore_for_cache, app_kwargs, priority, inline)
+        task_id = task_record.id
+
+        depend_descs = []
+        # if its last dependency has just completed, the task may already
+        # have been launched and have dropped its dependencies
+        for d in task_record.depends or ():
+            if isinstance(d, AppFuture) or isinstance(d, DataFuture):
+                depend_descs.append("task {}".format(d.tid))
+            else:
+                depend_descs.append(repr(d))
+
+        if depend_descs != []:
+            waiting_message = "waiting on {}".format(", ".join(depend_descs))
+        else:
+            waiting_message = "not waiting on any dependency"
+
+        logger.info("Task {} submitted for App {}, {}".format(task_id,
+                                                              task_record.func_name,
+                                                              waiting_message))
+        # once the task has completed, the DFK may release its reference to app_fu
+        app_fu = task_record.app_fu
+        logger.debug("Task {} set to pending state with AppFuture: {}".format(task_id, app_fu))
+
+        self.launch_if_ready(task_id)
+
+        return app_fu
+
+    def submit_many(self, func, app_args_list, executors='all', fn_hash=None, cache=False, ignore_for_cache=None, app_kwargs_list=None,
+                    priority=0, inline=False):
+        """Add many invocations of the same function to the dataflow system.
+
+        This behaves like calling submit once for each set of arguments, but
+        amortises the per-task overheads of submission: the executor choices are
+        resolved once, logging is summarised for the whole batch, and tasks which
+        are ready to run are handed to each executor in a single call to its
+        submit_batch method.
+
+        Args:
+            - func : A function object
+            - app_args_list (list of tuples) : Positional args for each invocation
+
+        KWargs :
+            - executors (list or string) : List of executors these calls could go to.
+                    Default='all'
+            - fn_hash (Str) : Hash of the function
+                    Default=None
+            - cache (Bool) : To enable memoization or not
+            - ignore_for_cache (list) : List of kwargs to be ignored for memoization/checkpointing
+            - app_kwargs_list (list of dicts) : Keyword args for each invocation. These
+                    dicts are used, and may be modified, by the DFK.
+                    Default=None, meaning no keyword args.
+            - priority (int or float) : Priority of the tasks, as for submit. Default=0
+            - inline (Bool) : Whether to run the tasks inline, as for submit. Default=False
+
+        Returns:
+               List of AppFutures, one per invocation, in the order of app_args_list.
+        """
+
+        if ignore_for_cache is None:
+            ignore_for_cache = []
+
+        if self.cleanup_called:
+            raise ValueError("Cannot submit to a DFK that has been cleaned up")
+
+        app_args_list = list(app_args_list)
+        if app_kwargs_list is None:
+            app_kwargs_list = [{} for args in app_args_list]
+        elif len(app_kwargs_list) != len(app_args_list):
+            raise ValueError("submit_many was given {} sets of args but {} sets of kwargs".format(
+                len(app_args_list), len(app_kwargs_list)))
+
+        if not app_args_list:
+            return []
+
+        choices = self._executor_choices(self.task_count, executors)
+        task_records = [self._create_task(func, app_args, choices, fn_hash, cache, ignore_for_cache, app_kwargs, priority, inline)
+                        for (app_args, app_kwargs) in zip(app_args_list, app_kwargs_list)]
+
+        logger.info("Tasks {} to {} submitted for App {}".format(task_records[0].id,
+                                                                 task_records[-1].id,
+                                                                 task_records[0].func_name))
+
+        # once the tasks have completed, the DFK may release its references to their app_fus
+        app_futs = [task_record.app_fu for task_record in task_records]
+        self.launch_many_if_ready([task_record.id for task_record in task_records])
+
+        return app_futs
+
+    def submit_windowed(self, func, app_args_iter, max_inflight=None, executors='all', fn_hash=None, cache=False, ignore_for_cache=None,
+                        app_kwargs={}, priority=0, inline=False):
+        """Submit invocations of the same function from an iterable, keeping at
+        most max_inflight of them in flight at once, and yield their AppFutures
+        as they complete.
+
+        The next item is only taken from app_args_iter when an earlier task has
+        completed, so the memory used is bounded by the window rather than by
+        the length of the iterable, which may be an unbounded generator.
+
+        Args:
+            - func : A function object
+            - app_args_iter (iterable of tuples) : Positional args for each invocation
+
+        KWargs :
+            - max_inflight (int) : Maximum number of tasks to have in flight at once.
+                    Default=None, meaning the max_inflight value of the config
+            - executors (list or string) : List of executors these calls could go to.
+                    Default='all'
+            - fn_hash (Str) : Hash of the function
+                    Default=None
+            - cache (Bool) : To enable memoization or not
+            - ignore_for_cache (list) : List of kwargs to be ignored for memoization/checkpointing
+            - app_kwargs (dict) : Keyword args, a copy of which is passed to every invocation
+            - priority (int or float) : Priority of the tasks, as for submit. Default=0
+            - inline (Bool) : Whether to run the tasks inline, as for submit. Default=False
+
+        Returns:
+               A generator of completed AppFutures, in completion order.
+        """
+        if max_inflight is None:
+            max_inflight = self._config.max_inflight
+        if max_inflight < 1:
+            raise ValueError("max_inflight must be at least 1, got {}".format(max_inflight))
+
+        app_args_iter = iter(app_args_iter)
+        completed = queue.Queue()
+        inflight = 0
+        exhausted = False
+
+        while True:
+            if not exhausted and inflight < max_inflight:
+                wanted = max_inflight - inflight
+                app_args_list = [tuple(args) for args in itertools.islice(app_args_iter, wanted)]
+                if len(app_args_list) < wanted:
+                    exhausted = True
+                if app_args_list:
+                    app_futs = self.submit_many(func, app_args_list,
+                                                executors=executors,
+                                                fn_hash=fn_hash,
+                                                cache=cache,
+                                                ignore_for_cache=ignore_for_cache,
+                                                app_kwargs_list=[dict(app_kwargs) for args in app_args_list],
+                                                priority=priority,
+                                                inline=inline)
+                    inflight += len(app_futs)
+                    for app_fu in app_futs:
+                        app_fu.add_done_callback(completed.put)
+                    del app_futs
+
+            if inflight == 0:
+                return
+
+            app_fu = completed.get()
+            inflight -= 1
+            yield app_fu
+
+    def _executor_choices(self, task_id, executors):
+        """Resolve the executors parameter of a submission to a list of executor labels."""
         if isinstance(executors, str) and executors.lower() == 'all':
-            choices = list(e for e in self.executors if e != 'data_manager')
+            return list(e for e in self.executors if e not in ('data_manager', INLINE_EXECUTOR_LABEL))
         elif isinstance(executors, list):
-            choices = executors
+            return executors
         else:
             raise ValueError("Task {} supplied invalid type for executors: {}".format(task_id, type(executors)))
-        executor = random.choice(choices)
+
+    def _start_inline_executor(self):
+        """Start the DFK's executor for inline tasks, unless it is already running.
+
+        Returns:
+            - The executor for inline tasks
+        """
+        executor = self.executors.get(INLINE_EXECUTOR_LABEL)
+        if executor is not None:
+            return executor
+        with self._inline_executor_lock:
+            if INLINE_EXECUTOR_LABEL not in self.executors:
+                logger.debug("Starting the executor for inline tasks")
+                self.add_executors([ThreadPoolExecutor(max_threads=self._config.inline_max_threads,
+                                                       label=INLINE_EXECUTOR_LABEL)])
+            return self.executors[INLINE_EXECUTOR_LABEL]
+
+    def _create_task(self, func, app_args, choices, fn_hash, cache, ignore_for_cache, app_kwargs, priority=0, inline=False):
+        """Create the record for a new task, register it with the DFK and
+        add callbacks to its dependencies, leaving it in pending state.
+
+        The caller is responsible for calling launch_if_ready (or
+        launch_many_if_ready) on the new task once this returns.
+
+        Returns:
+            - The TaskRecord of the new task
+        """
+        self._check_priority(priority)
+        task_id = self.task_count
+        self.task_count += 1
+        if inline is None:
+            inline = self.inline_policy is not None and self.inline_policy.runs_inline(func.__name__)
+        if inline:
+            self._start_inline_executor()
+            executor = INLINE_EXECUTOR_LABEL
+        else:
+            executor = self.executor_selector.select(choices)
 
         # The below uses func.__name__ before it has been wrapped by any staging code.
 
@@ -729,91 +1485,81 @@ class DataFlowKernel(object):
                                     kw)
                     )
 
-        task_def = {'depends': None,
-                    'executor': executor,
-                    'func_name': func.__name__,
-                    'fn_hash': fn_hash,
-                    'memoize': cache,
-                    'hashsum': None,
-                    'exec_fu': None,
-                    'fail_count': 0,
-                    'fail_history': [],
-                    'ignore_for_cache': ignore_for_cache,
-                    'status': States.unsched,
-                    'id': task_id,
-                    'time_submitted': None,
-                    'time_returned': None}
-
-        app_fu = AppFuture(task_def)
+        task_record = TaskRecord(task_id,
+                                 func=func,
+                                 func_name=func.__name__,
+                                 fn_hash=fn_hash,
+                                 executor=executor,
+                                 memoize=cache,
+                                 ignore_for_cache=ignore_for_cache,
+                                 priority=priority,
+                                 choices=choices)
+        task_record.kwargs = app_kwargs
+
+        app_fu = AppFuture(task_record)
 
         # Transform remote input files to data futures
         app_args, app_kwargs, func = self._add_input_deps(executor, app_args, app_kwargs, func)
 
         func = self._add_output_deps(executor, app_args, app_kwargs, app_fu, func)
 
-        task_def.update({
-                    'args': app_args,
-                    'func': func,
-                    'kwargs': app_kwargs,
-                    'app_fu': app_fu})
+        task_record.args = app_args
+        task_record.func = func
+        task_record.kwargs = app_kwargs
+        task_record.app_fu = app_fu
 
         if task_id in self.tasks:
             raise DuplicateTaskError(
                 "internal consistency error: Task {0} already exists in task list".format(task_id))
         else:
-            self.tasks[task_id] = task_def
+            self.tasks[task_id] = task_record
 
         # Get the list of dependencies for the task
         depends = self._gather_all_deps(app_args, app_kwargs)
-        task_def['depends'] = depends
-
-        depend_descs = []
-        for d in depends:
-            if isinstance(d, AppFuture) or isinstance(d, DataFuture):
-                depend_descs.append("task {}".format(d.tid))
-            else:
-                depend_descs.append(repr(d))
+        task_record.depends = depends
+        task_record.outstanding_deps = len(depends)
 
-        if depend_descs != []:
-            waiting_message = "waiting on {}".format(", ".join(depend_descs))
-        else:
-            waiting_message = "not waiting on any dependency"
+        # count the consumers of the result of each task, so that the DFK
+        # can release the result once they have all been dispatched
+        if depends:
+            with self.dependency_lock:
+                for d in depends:
+                    dep_record = task_record_of(d)
+                    if dep_record is not None:
+                        dep_record.consumers += 1
+                        if self.task_fusion:
+                            self._dependents.setdefault(dep_record.id, []).append(task_id)
 
-        logger.info("Task {} submitted for App {}, {}".format(task_id,
-                                                              task_def['func_name'],
-                                                              waiting_message))
+        if self.critical_path is not None:
+            self.critical_path.task_submitted(task_record)
 
-        task_def['task_launch_lock'] = threading.Lock()
+        app_fu.add_done_callback(self._app_fu_done)
 
-        app_fu.add_done_callback(partial(self.handle_app_update, task_id))
-        task_def['status'] = States.pending
-        logger.debug("Task {} set to pending state with AppFuture: {}".format(task_id, task_def['app_fu']))
-
-        # at this point add callbacks to all dependencies to do a launch_if_ready
-        # call whenever a dependency completes.
+        # at this point add callbacks to all dependencies to decrement the
+        # outstanding dependency count, which will do a launch_if_ready call
+        # when the last dependency completes.
 
         # we need to be careful about the order of setting the state to pending,
-        # adding the callbacks, and caling launch_if_ready explicitly once always below.
+        # adding the callbacks, and the caller calling launch_if_ready explicitly
+        # once always afterwards.
 
-        # I think as long as we call launch_if_ready once after setting pending, then
-        # we can add the callback dependencies at any point: if the callbacks all fire
-        # before then, they won't cause a launch, but the one below will. if they fire
-        # after we set it pending, then the last one will cause a launch, and the
-        # explicit one won't.
+        # The task is only set pending after the callbacks have been added, so
+        # any callbacks which fire straight away (because their dependency has
+        # already completed) will not cause a launch; the explicit launch by the
+        # caller will. If the last callback fires after we set it pending, then
+        # it will cause a launch, and the explicit one won't. Deferring the
+        # launch to the caller lets submit_many launch ready tasks in batches.
 
+        dependency_callback = partial(self._dependency_done, task_id)
         for d in depends:
-
-            def callback_adapter(dep_fut):
-                self.launch_if_ready(task_id)
-
             try:
-                d.add_done_callback(callback_adapter)
+                d.add_done_callback(dependency_callback)
             except Exception as e:
                 logger.error("add_done_callback got an exception {} which will be ignored".format(e))
 
-        self.launch_if_ready(task_id)
+        task_record.status = States.pending
 
-        return app_fu
+        return task_record
 
     # it might also be interesting to assert that all DFK
     # tasks are in a "final" state (3,4,5) when the DFK
@@ -828,7 +1574,7 @@ class DataFlowKernel(object):
         keytasks = {state: 0 for state in States}
 
         for tid in self.tasks:
-            keytasks[self.tasks[tid]['status']] += 1
+            keytasks[self.tasks[tid].status] += 1
         # Fetch from counters since tasks get wiped
         keytasks[States.done] = self.tasks_completed_count
         keytasks[States.failed] = self.tasks_failed_count
@@ -902,10 +1648,11 @@ class DataFlowKernel(object):
         for task_id in list(self.tasks):
             # .exception() is a less exception throwing way of
             # waiting for completion than .result()
-            if task_id not in self.tasks:
+            task_record = self.tasks.get(task_id)
+            fut = None if task_record is None else task_record.app_fu
+            if fut is None:
                 logger.debug("Task {} no longer in task list".format(task_id))
             else:
-                fut = self.tasks[task_id]['app_fu']
                 if not fut.done():
                     logger.debug("Waiting for task {} to complete".format(task_id))
                     fut.exception()
@@ -934,12 +1681,20 @@ class DataFlowKernel(object):
         # Checkpointing takes priority over the rest of the tasks
         # checkpoint if any valid checkpoint method is specified
         if self.checkpoint_mode is not None:
+            if self.checkpoint_writer is not None:
+                logger.info("Stopping checkpoint writer")
+                self.checkpoint_writer.close()
+
             self.checkpoint()
 
             if self._checkpoint_timer:
                 logger.info("Stopping checkpoint timer")
                 self._checkpoint_timer.close()
 
+        if self._checkpoint_store is not None:
+            self._checkpoint_store.close()
+        self.memoizer.close()
+
         # Send final stats
         self.usage_tracker.send_message()
         self.usage_tracker.close()
@@ -947,13 +1702,21 @@ class DataFlowKernel(object):
         logger.info("Terminating flow_control and strategy threads")
         self.flowcontrol.close()
 
-        for executor in self.executors.values():
+        if self._speculation_timer is not None:
+            self._speculation_timer.close()
+
+        for executor in list(self.executors.values()):
             if executor.managed:
                 if executor.scaling_enabled:
                     job_ids = executor.provider.resources.keys()
                     executor.scale_in(len(job_ids))
                 executor.shutdown()
 
+        if self.completion_dispatcher is not None:
+            logger.info("Stopping completion dispatcher")
+            self.completion_dispatcher.close()
+            logger.info("Completion dispatcher stats: {}".format(self.completion_dispatcher.stats()))
+
         self.time_completed = datetime.datetime.now()
 
         if self.monitoring:
@@ -996,49 +1759,51 @@ class DataFlowKernel(object):
 
             checkpoint_dir = '{0}/checkpoint'.format(self.run_dir)
             checkpoint_dfk = checkpoint_dir + '/dfk.pkl'
-            checkpoint_tasks = checkpoint_dir + '/tasks.pkl'
 
             if not os.path.exists(checkpoint_dir):
                 os.makedirs(checkpoint_dir, exist_ok=True)
 
+            if self._checkpoint_store is None:
+                self._checkpoint_store = make_checkpoint_store(checkpoint_dir, self._config.checkpoint_format,
+                                                               fsync=self._config.checkpoint_fsync)
+
             with open(checkpoint_dfk, 'wb') as f:
                 state = {'rundir': self.run_dir,
                          'task_count': self.task_count
                          }
                 pickle.dump(state, f)
 
-            count = 0
-
-            with open(checkpoint_tasks, 'ab') as f:
-                for task_id in checkpoint_queue:
-                    if task_id in self.tasks and \
-                       self.tasks[task_id]['app_fu'] is not None and \
-                       self.tasks[task_id]['app_fu'].done() and \
-                       self.tasks[task_id]['app_fu'].exception() is None:
-                        hashsum = self.tasks[task_id]['hashsum']
-                        self.wipe_task(task_id)
-                        # self.tasks[task_id]['app_fu'] = None
-                        if not hashsum:
-                            continue
-                        t = {'hash': hashsum,
-                             'exception': None,
-                             'result': None}
-                        try:
-                            # Asking for the result will raise an exception if
-                            # the app had failed. Should we even checkpoint these?
-                            # TODO : Resolve this question ?
-                            r = self.memoizer.hash_lookup(hashsum).result()
-                        except Exception as e:
-                            t['exception'] = e
-                        else:
-                            t['result'] = r
+            records = []
+
+            for task_id in checkpoint_queue:
+                if task_id in self.tasks and \
+                   self.tasks[task_id].app_fu is not None and \
+                   self.tasks[task_id].app_fu.done() and \
+                   self.tasks[task_id].app_fu.exception() is None:
+                    hashsum = self.tasks[task_id].hashsum
+                    self.wipe_task(task_id)
+                    # self.tasks[task_id]['app_fu'] = None
+                    if not hashsum:
+                        continue
+                    t = {'hash': hashsum,
+                         'exception': None,
+                         'result': None}
+                    try:
+                        # Asking for the result will raise an exception if
+                        # the app had failed. Should we even checkpoint these?
+                        # TODO : Resolve this question ?
+                        r = self.memoizer.hash_lookup(hashsum).result()
+                    except Exception as e:
+                        t['exception'] = e
+                    else:
+                        t['result'] = r
+
+                    records.append(t)
+                    logger.debug("Task {} checkpointed".format(task_id))
 
-                        # We are using pickle here since pickle dumps to a file in 'ab'
-                        # mode behave like a incremental log.
-                        pickle.dump(t, f)
-                        count += 1
-                        logger.debug("Task {} checkpointed".format(task_id))
+            self._checkpoint_store.write(records)
 
+            count = len(records)
             self.checkpointed_tasks += count
 
             if count == 0:
@@ -1060,48 +1825,18 @@ class DataFlowKernel(object):
         in the checkpoint, we hash these input params and use it as the key
         for the memoized lookup table.
 
+        Checkpoints in the 'pickle' format are read into memory. Checkpoints
+        in the 'sqlite' format are only opened, and results are read from them
+        as they are looked up.
+
         Args:
             - checkpointDirs (list) : List of filepaths to checkpoints
               Eg. ['runinfo/001', 'runinfo/002']
 
         Returns:
-            - memoized_lookup_table (dict)
+            - CheckpointIndex, mapping hashsums to futures
         """
-        memo_lookup_table = {}
-
-        for checkpoint_dir in checkpointDirs:
-            logger.info("Loading checkpoints from {}".format(checkpoint_dir))
-            checkpoint_file = os.path.join(checkpoint_dir, 'tasks.pkl')
-            try:
-                with open(checkpoint_file, 'rb') as f:
-                    while True:
-                        try:
-                            data = pickle.load(f)
-                            # Copy and hash only the input attributes
-                            memo_fu = Future()
-                            if data['exception']:
-                                memo_fu.set_exception(data['exception'])
-                            else:
-                                memo_fu.set_result(data['result'])
-                            memo_lookup_table[data['hash']] = memo_fu
-
-                        except EOFError:
-                            # Done with the checkpoint file
-                            break
-            except FileNotFoundError:
-                reason = "Checkpoint file was not found: {}".format(
-                    checkpoint_file)
-                logger.error(reason)
-                raise BadCheckpoint(reason)
-            except Exception:
-                reason = "Failed to load checkpoint: {}".format(
-                    checkpoint_file)
-                logger.error(reason)
-                raise BadCheckpoint(reason)
-
-            logger.info("Completed loading checkpoint: {0} with {1} tasks".format(checkpoint_file,
-                                                                                  len(memo_lookup_table.keys())))
-        return memo_lookup_table
+        return CheckpointIndex(checkpointDirs)
 
     def load_checkpoints(self, checkpointDirs):
         """Load checkpoints from the checkpoint files into a dictionary.
@@ -1113,7 +1848,7 @@ class DataFlowKernel(object):
                Eg. ['runinfo/001', 'runinfo/002']
 
         Returns:
-             - dict containing, hashed -> future mappings
+             - CheckpointIndex (or an empty dict if there are no checkpoints), mapping hashsum -> future
         """
         self.memo_lookup_table = None
 
@@ -0,0 +1,157 @@
+"""Policies for choosing which executor runs a task.
+
+When an app may run on several executors, the DataFlowKernel asks its
+:class:`ExecutorSelector` to choose one of them as each task is created. The
+selector is told when each task completes, so that load-aware policies can
+count the tasks outstanding on each executor without querying the executors,
+which for some executors (such as the HighThroughputExecutor) would mean a
+round trip to a remote process for every task.
+"""
+import logging
+import random
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from collections import defaultdict
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSelector(metaclass=ABCMeta):
+    """Base class for executor selection policies.
+
+    Subclasses implement :meth:`select`. Selectors are called on the submit
+    path for every task, so should be cheap.
+    """
+
+    def start(self, dfk):
+        """Called by the DataFlowKernel when it is created, before any task
+        is submitted. Resets any state from a previous run."""
+        self.dfk = dfk
+
+    @abstractmethod
+    def select(self, choices: List[str]) -> str:
+        """Choose the executor to run a new task.
+
+        Args:
+            - choices (list of str) : Labels of the executors which may run the task
+
+        Returns:
+            - The label of the chosen executor, which will run the task.
+        """
+        pass
+
+    def task_done(self, label: str) -> None:
+        """Called when a task which was assigned to executor label reaches a final state."""
+        pass
+
+
+class RandomSelector(ExecutorSelector):
+    """Choose an executor uniformly at random."""
+
+    def select(self, choices):
+        return random.choice(choices)
+
+
+class LeastOutstandingSelector(ExecutorSelector):
+    """Join the shortest queue: choose the executor with the fewest tasks
+    which have been assigned to it and not yet completed.
+
+    Ties are broken at random.
+    """
+
+    def start(self, dfk):
+        super().start(dfk)
+        self._lock = threading.Lock()
+        self.outstanding = defaultdict(int)
+
+    def load(self, label):
+        """The load of an executor, which this selector minimises."""
+        return self.outstanding[label]
+
+    def select(self, choices):
+        with self._lock:
+            if len(choices) == 1:
+                label = choices[0]
+            else:
+                best = None
+                best_load = None
+                ties = 0
+                for choice in choices:
+                    load = self.load(choice)
+                    if best is None or load < best_load:
+                        best, best_load, ties = choice, load, 1
+                    elif load == best_load:
+                        # reservoir sampling picks uniformly among tied executors
+                        ties += 1
+                        if random.randrange(ties) == 0:
+                            best = choice
+                label = best
+            self.outstanding[label] += 1
+        return label
+
+    def task_done(self, label):
+        with self._lock:
+            self.outstanding[label] -= 1
+
+
+class WorkerWeightedSelector(LeastOutstandingSelector):
+    """Choose the executor with the fewest outstanding tasks per worker.
+
+    The number of workers of an executor is its ``connected_workers``
+    where it has one (as the HighThroughputExecutor does), or else its
+    ``max_threads``, or else 1. Executors with no workers yet are treated as
+    having one. As looking up the connected workers may be expensive, the
+    value is cached and refreshed at most every refresh_interval seconds.
+
+    Parameters
+    ----------
+    refresh_interval : float
+        Time in seconds for which the number of workers of an executor is cached. Default 5.
+    """
+
+    def __init__(self, refresh_interval: float = 5):
+        self.refresh_interval = refresh_interval
+
+    def start(self, dfk):
+        super().start(dfk)
+        self._workers = {}
+
+    def load(self, label):
+        return (self.outstanding[label] + 1) / self.workers(label)
+
+    def workers(self, label):
+        now = time.time()
+        cached = self._workers.get(label)
+        if cached is None or now - cached[1] > self.refresh_interval:
+            cached = (self._query_workers(label), now)
+            self._workers[label] = cached
+        return cached[0]
+
+    def _query_workers(self, label):
+        executor = self.dfk.executors.get(label)
+        workers = None
+        if hasattr(executor, 'connected_workers'):
+            try:
+                workers = executor.connected_workers
+            except Exception:
+                logger.debug("Could not get connected workers of executor {}".format(label), exc_info=True)
+        if not isinstance(workers, int):
+            workers = getattr(executor, 'max_threads', None)
+        if not isinstance(workers, int):
+            workers = 1
+        return max(workers, 1)
+
+
+SELECTORS = {'random': RandomSelector,
+             'least_outstanding': LeastOutstandingSelector,
+             'worker_weighted': WorkerWeightedSelector}
+
+
+def make_executor_selector(selection):
+    """Make a selector from the executor_selection option of a Config, which
+    is either the name of a policy in SELECTORS or an ExecutorSelector."""
+    if isinstance(selection, ExecutorSelector):
+        return selection
+    return SELECTORS[selection]()
@@ -0,0 +1,64 @@
+"""Fusion of linear chains of tasks into a single submission.
+
+When task fusion is enabled, a task which becomes ready to run is launched
+together with the chain of pending tasks below it in which each task depends
+only on the result of the one before, which has no other dependents, and
+all of the tasks run on the same executor. The chain is submitted to the
+executor as one call of run_fused, which runs the tasks one after another,
+passing the result of each to the next, and returns all of their results.
+This saves a round trip through the executor for every task after the first.
+
+In the arguments of each task after the first, the future of the task before
+is replaced by a PreviousResult placeholder, which run_fused replaces with
+the result of that task.
+"""
+import sys
+
+from parsl.app.errors import RemoteExceptionWrapper
+
+
+class PreviousResult(object):
+    """Placeholder for the result of the previous task of a fused chain."""
+
+    def __repr__(self):
+        return "PreviousResult()"
+
+
+def _replace(args, kwargs, match, value):
+    """Copies of args and kwargs with the items which match replaced by value,
+    looking in the same places as the DFK looks for dependencies."""
+    new_args = [value if match(a) else a for a in args]
+    new_kwargs = {k: value if match(v) else v for k, v in kwargs.items()}
+    if 'inputs' in new_kwargs:
+        new_kwargs['inputs'] = [value if match(i) else i for i in new_kwargs['inputs']]
+    return new_args, new_kwargs
+
+
+def mark_previous(args, kwargs, fu):
+    """Replace the future fu in the arguments of a task with PreviousResult."""
+    return _replace(args, kwargs, lambda a: a is fu, PreviousResult())
+
+
+def run_fused(stages):
+    """Run a fused chain of tasks.
+
+    Args:
+        - stages (list) : (func, args, kwargs) for each task of the chain, in order
+
+    Returns:
+        - The list of the results of the tasks which were run. If a task
+          fails, its result is a RemoteExceptionWrapper, and the tasks after
+          it are not run.
+    """
+    results = []
+    for func, args, kwargs in stages:
+        if results:
+            args, kwargs = _replace(args, kwargs, lambda a: isinstance(a, PreviousResult), results[-1])
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            result = RemoteExceptionWrapper(*sys.exc_info())
+        results.append(result)
+        if isinstance(result, RemoteExceptionWrapper):
+            break
+    return results
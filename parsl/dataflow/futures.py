@@ -4,11 +4,16 @@ We have two basic types of futures:
     1. DataFutures which represent data objects
     2. AppFutures which represent the futures on App/Leaf tasks.
 
+Both can be awaited in asyncio coroutines. Awaiting a future adds a done
+callback to it which passes its outcome to the event loop, so awaiting any
+number of futures uses no threads.
 """
 
 from concurrent.futures import Future
+import asyncio
 import logging
 import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -55,31 +60,38 @@ class AppFuture(Future):
 
     """
 
-    def __init__(self, task_def):
+    def __init__(self, task_record):
         """Initialize the AppFuture.
 
         Args:
 
         KWargs:
-             - task_def : The DFK task definition dictionary for the task represented
+             - task_record : The DFK task record for the task represented
                    by this future.
         """
         super().__init__()
         self._update_lock = threading.Lock()
         self._outputs = []
-        self.task_def = task_def
+        self.task_record = task_record
+
+    @property
+    def task_def(self):
+        """The DFK task record for the task, under its name from before
+        task records replaced task definition dictionaries. Fields of the
+        record can still be accessed as ``task_def['status']``."""
+        return self.task_record
 
     @property
     def stdout(self):
-        return self.task_def['kwargs'].get('stdout')
+        return self.task_record.kwargs.get('stdout')
 
     @property
     def stderr(self):
-        return self.task_def['kwargs'].get('stderr')
+        return self.task_record.kwargs.get('stderr')
 
     @property
     def tid(self):
-        return self.task_def['id']
+        return self.task_record.id
 
     def cancel(self):
         raise NotImplementedError("Cancel not implemented")
@@ -108,13 +120,114 @@ class AppFuture(Future):
 
            Returns: str
         """
-        return self.task_def['status'].name
+        return self.task_record.status.name
 
     @property
     def outputs(self):
         return self._outputs
 
+    def __await__(self):
+        return wrap_future(self).__await__()
+
     def __repr__(self):
         return '<%s super=%s>' % (
             self.__class__.__name__,
             super().__repr__())
+
+
+def _copy_outcome(future, aio_future):
+    """Copy the outcome of a done Future to an asyncio future. Must be called
+    on the thread of the event loop of aio_future."""
+    if aio_future.cancelled():
+        return
+    exception = future.exception()
+    if exception is not None:
+        aio_future.set_exception(exception)
+    else:
+        aio_future.set_result(future.result())
+
+
+def _call_soon_threadsafe(loop, callback, *args):
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+    except RuntimeError:
+        # the event loop has been closed, so nothing is waiting any more
+        pass
+
+
+def wrap_future(future, loop=None):
+    """Make an asyncio future which completes with the outcome of an AppFuture
+    or DataFuture.
+
+    Unlike asyncio.wrap_future, cancelling the asyncio future does not
+    cancel the parsl future, as parsl tasks cannot be cancelled.
+
+    Args:
+        - future (Future) : The future to wrap
+
+    KWargs:
+        - loop (asyncio.AbstractEventLoop) : The event loop of the new future. Default is the current event loop.
+
+    Returns:
+        - asyncio.Future
+    """
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    aio_future = loop.create_future()
+    future.add_done_callback(lambda fu: _call_soon_threadsafe(loop, _copy_outcome, fu, aio_future))
+    return aio_future
+
+
+class as_completed(object):
+    """Asynchronous iterator over futures, which yields each of them as it
+    completes, in the manner of concurrent.futures.as_completed::
+
+        async for fu in as_completed(futures):
+            print(fu.result())
+
+    Raises asyncio.TimeoutError if timeout seconds pass, from the start of
+    the iteration, before all of the futures have completed.
+    """
+
+    def __init__(self, futures, timeout=None):
+        """
+        Args:
+            - futures (iterable of Future) : AppFutures, DataFutures or other concurrent futures
+
+        KWargs:
+            - timeout (float) : Seconds to wait for all futures to complete. Default is None, for no limit.
+        """
+        self._futures = set(futures)
+        self._timeout = timeout
+        self._deadline = None
+        self._completed = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._completed is None:
+            loop = asyncio.get_event_loop()
+            self._completed = asyncio.Queue()
+            if self._timeout is not None:
+                self._deadline = time.monotonic() + self._timeout
+            for future in self._futures:
+                future.add_done_callback(
+                    lambda fu: _call_soon_threadsafe(loop, self._completed.put_nowait, fu))
+        if not self._futures:
+            raise StopAsyncIteration
+        if self._deadline is None:
+            future = await self._completed.get()
+        else:
+            future = await asyncio.wait_for(self._completed.get(), max(self._deadline - time.monotonic(), 0))
+        self._futures.discard(future)
+        return future
+
+
+async def submit(app, *args, **kwargs):
+    """Invoke an app, and return the result of its task once it completes.
+
+    This is the same as ``await app(*args, **kwargs)``, and is convenient
+    for passing invocations to functions such as asyncio.gather.
+    """
+    return await app(*args, **kwargs)
@@ -0,0 +1,59 @@
+"""Inline execution of cheap apps.
+
+Tasks of very short apps, such as glue code which reformats or sums the
+results of other tasks, can spend far longer being serialized and sent to a
+remote worker than running. The DataFlowKernel can instead run such tasks
+inline: on a small thread pool of its own, in the submitting process. Inline
+tasks go through the same launch path as any other, so memoization,
+checkpointing, retries and monitoring treat them as usual.
+
+A task runs inline if its app was created with ``inline=True``, or, when the
+config sets an ``inline_threshold``, if its app was created with the default
+``inline=None`` and the mean runtime of its completed tasks is below the
+threshold. Runtimes are measured from launch to completion, so for remote
+executors they include the round trip, and overestimate the runtime of the
+app itself.
+"""
+import threading
+
+# label of the DFK's executor for inline tasks
+INLINE_EXECUTOR_LABEL = '_parsl_inline'
+
+
+class InlinePolicy(object):
+    """Decides which apps run inline from the mean runtimes of their tasks.
+
+    The mean runtime of an app is an exponentially weighted moving average of
+    the runtimes of its completed tasks, so that an app whose tasks become
+    slow stops running inline.
+    """
+
+    def __init__(self, threshold, min_samples=3, smoothing=0.2):
+        """Initialize the policy.
+
+        Args:
+            - threshold (float) : Mean runtime in seconds below which apps run inline
+
+        KWargs:
+            - min_samples (int) : Number of tasks of an app which must complete before it can run inline. Default 3.
+            - smoothing (float) : Weight given to each new runtime in the moving average. Default 0.2.
+        """
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self._runtimes = {}
+        self._lock = threading.Lock()
+
+    def task_completed(self, task_record):
+        """Update the mean runtime of the app of a successfully completed task."""
+        if task_record.time_submitted is None or task_record.time_returned is None:
+            return
+        runtime = (task_record.time_returned - task_record.time_submitted).total_seconds()
+        with self._lock:
+            count, mean = self._runtimes.get(task_record.func_name, (0, runtime))
+            self._runtimes[task_record.func_name] = (count + 1, mean + self.smoothing * (runtime - mean))
+
+    def runs_inline(self, func_name):
+        """Whether tasks of an app should run inline."""
+        count, mean = self._runtimes.get(func_name, (0, None))
+        return count >= self.min_samples and mean < self.threshold
@@ -1,6 +1,15 @@
 import hashlib
-from functools import singledispatch
+import os
+import sys
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial, singledispatch
 import logging
+import threading
+from parsl.data_provider.files import File
+from parsl.dataflow.broadcast import Broadcast
+from parsl.dataflow.memotable import MemoTable
 from parsl.executors.serialize.serialize import serialize_object
 import types
 
@@ -35,7 +44,16 @@ def id_for_memo(obj, output_ref=False):
     content of an input file invalidates memoization. This does not make
     sense to do for output files: there is no meaningful content stored
     where an output filename points at memoization time.
+
+    Implementations for types from optional dependencies (such as NumPy
+    arrays) are registered the first time a value of that type is seen, so
+    that those dependencies are not imported unless they are used.
     """
+    type_name = "{}.{}".format(type(obj).__module__, type(obj).__qualname__)
+    if type_name in _lazy_id_for_memo:
+        id_for_memo.register(type(obj), _lazy_id_for_memo[type_name])
+        return id_for_memo(obj, output_ref=output_ref)
+
     logger.error("id_for_memo attempted on unknown type {}".format(type(obj)))
     raise ValueError("unknown type for memoization: {}".format(type(obj)))
 
@@ -81,37 +99,265 @@ def id_for_memo_dict(denormalized_dict, output_ref=False):
     return serialize_object(normalized_list)[0]
 
 
+@id_for_memo.register(tuple)
+def id_for_memo_tuple(denormalized_tuple, output_ref=False):
+    if type(denormalized_tuple) is not tuple:
+        raise ValueError("id_for_memo_tuple cannot work on subclasses of tuple")
+
+    normalized_list = [b'tuple']
+
+    for e in denormalized_tuple:
+        normalized_list.append(id_for_memo(e, output_ref=output_ref))
+
+    return serialize_object(normalized_list)[0]
+
+
+@id_for_memo.register(bytes)
+@id_for_memo.register(bytearray)
+def id_for_memo_bytes(obj, output_ref=False):
+    """Bytes are identified by a digest of their content.
+
+    The digests of large bytes objects are cached while the objects are in
+    use elsewhere, so that an object passed to many tasks is hashed once.
+    bytearrays, which can change, are hashed on every use.
+    """
+    if type(obj) is bytes and len(obj) >= _DIGEST_CACHE_MIN_BYTES:
+        return b'bytes:' + _cached_bytes_digest(obj)
+    return b'bytes:' + _digest(obj)
+
+
+@id_for_memo.register(Broadcast)
+def id_for_memo_broadcast(obj, output_ref=False):
+    """Broadcasts are identified by the digest of their serialized object."""
+    return b'broadcast:' + obj.broadcast_id
+
+
+@id_for_memo.register(File)
+def id_for_memo_file(file, output_ref=False):
+    """Files are identified by their URL.
+
+    To have changes to the content of input files invalidate memoization,
+    register id_for_memo_file_mtime or id_for_memo_file_content instead::
+
+        id_for_memo.register(File, id_for_memo_file_content)
+    """
+    return b'file:' + file.url.encode('utf-8')
+
+
+def id_for_memo_file_mtime(file, output_ref=False):
+    """Identify local input files by their URL, size and modification time,
+    and other files by their URL alone.
+    """
+    stat = _stat_input_file(file, output_ref)
+    if stat is None:
+        return id_for_memo_file(file, output_ref=output_ref)
+    return serialize_object([b'file-mtime', file.url, stat.st_size, stat.st_mtime_ns])[0]
+
+
+def id_for_memo_file_content(file, output_ref=False):
+    """Identify local input files by a digest of their content, and other
+    files by their URL alone.
+
+    The digest of a file is cached against its size and modification time, so
+    that a file used by many tasks is only read once.
+    """
+    stat = _stat_input_file(file, output_ref)
+    if stat is None:
+        return id_for_memo_file(file, output_ref=output_ref)
+
+    key = (os.path.abspath(file.filepath), stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        digest = _file_digests.get(key)
+        if digest is not None:
+            _file_digests.move_to_end(key)
+    if digest is None:
+        h = _new_hash()
+        with open(file.filepath, 'rb') as f:
+            for block in iter(partial(f.read, 1 << 20), b''):
+                h.update(block)
+        digest = h.digest()
+        with _file_digests_lock:
+            _file_digests[key] = digest
+            while len(_file_digests) > _FILE_DIGESTS_MAX_ENTRIES:
+                _file_digests.popitem(last=False)
+    return b'file-content:' + digest
+
+
+def _stat_input_file(file, output_ref):
+    """Return the stat of a local input file, or None if it is an output
+    reference, is not a local file, or does not exist.
+    """
+    if output_ref or file.scheme != 'file':
+        return None
+    try:
+        return os.stat(file.filepath)
+    except OSError:
+        logger.debug("Could not stat {} for memoization, identifying it by URL".format(file))
+        return None
+
+
+# (path, size, mtime) -> content digest, for id_for_memo_file_content
+_FILE_DIGESTS_MAX_ENTRIES = 1024
+_file_digests = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+
+def id_for_memo_ndarray(array, output_ref=False):
+    """NumPy arrays are identified by their dtype, shape and a digest of their
+    data.
+
+    The digests of large read-only arrays which own their data are cached
+    while the arrays exist, so that an array passed to many tasks is hashed
+    once. Such an array must not be made writeable and changed while it is
+    in use by the DFK: it is hashed again if it is writeable when next used,
+    but not if it has been made read-only again by then.
+    """
+    if array.dtype.hasobject:
+        raise ValueError("id_for_memo cannot hash numpy arrays containing objects")
+
+    if array.flags.owndata and not array.flags.writeable and array.nbytes >= _DIGEST_CACHE_MIN_BYTES:
+        digest = _cached_array_digest(array)
+    else:
+        digest = _array_digest(array)
+    dtype = array.dtype.descr if array.dtype.fields else array.dtype.str
+    return serialize_object([b'numpy.ndarray', dtype, array.shape, digest])[0]
+
+
+# Implementations of id_for_memo which are registered when a value of
+# the named type is first seen.
+_lazy_id_for_memo = {
+    'numpy.ndarray': id_for_memo_ndarray,
+}
+
+
+# blake2b is much faster than sha256, but only in hashlib from Python 3.6
+_blake2b = getattr(hashlib, 'blake2b', None)
+
+
+def _new_hash():
+    if _blake2b is not None:
+        return _blake2b(digest_size=32)
+    return hashlib.sha256()
+
+
+def _digest(data):
+    h = _new_hash()
+    h.update(data)
+    return h.digest()
+
+
+def _array_digest(array):
+    from numpy import ascontiguousarray
+    return _digest(ascontiguousarray(array).data)
+
+
+# Arguments smaller than this are hashed on every use
+_DIGEST_CACHE_MIN_BYTES = 1 << 20
+_DIGEST_CACHE_MAX_ENTRIES = 64
+
+# id(array) -> (weak reference to the array, digest). Entries are removed
+# when their arrays are freed, so ids are never reused while in the cache.
+_array_digests = OrderedDict()
+
+# id(bytes) -> (bytes, digest). bytes cannot be weakly referenced, so the
+# cache holds them, and drops each entry once it holds the only reference.
+_bytes_digests = OrderedDict()
+
+# reentrant, as the weak reference callbacks may run in the garbage collector
+# while the cache is being updated
+_digests_lock = threading.RLock()
+
+# references to a cached bytes object held by its cache entry, and by the
+# argument of sys.getrefcount
+_CACHE_ONLY_REFCOUNT = 2
+
+
+def _cached_array_digest(array):
+    key = id(array)
+    with _digests_lock:
+        entry = _array_digests.get(key)
+        if entry is not None and entry[0]() is array:
+            _array_digests.move_to_end(key)
+            return entry[1]
+    digest = _array_digest(array)
+
+    def forget(ref, key=key):
+        with _digests_lock:
+            entry = _array_digests.get(key)
+            if entry is not None and entry[0] is ref:
+                del _array_digests[key]
+
+    with _digests_lock:
+        _array_digests[key] = (weakref.ref(array, forget), digest)
+        while len(_array_digests) > _DIGEST_CACHE_MAX_ENTRIES:
+            _array_digests.popitem(last=False)
+    return digest
+
+
+def _cached_bytes_digest(obj):
+    key = id(obj)
+    with _digests_lock:
+        for other in [k for k, entry in _bytes_digests.items() if sys.getrefcount(entry[0]) <= _CACHE_ONLY_REFCOUNT]:
+            del _bytes_digests[other]
+        entry = _bytes_digests.get(key)
+        if entry is not None:
+            _bytes_digests.move_to_end(key)
+            return entry[1]
+    digest = _digest(obj)
+    with _digests_lock:
+        _bytes_digests[key] = (obj, digest)
+        while len(_bytes_digests) > _DIGEST_CACHE_MAX_ENTRIES:
+            _bytes_digests.popitem(last=False)
+    return digest
+
+
+def _chain_future(source, target):
+    """Done callback which copies the outcome of source into target."""
+    if source.cancelled():
+        target.cancel()
+        return
+    e = source.exception()
+    if e is not None:
+        target.set_exception(e)
+    else:
+        target.set_result(source.result())
+
+
 class Memoizer(object):
     """Memoizer is responsible for ensuring that identical work is not repeated.
 
     When a task is repeated, i.e., the same function is called with the same exact arguments, the
     result from a previous execution is reused. `wiki <https://en.wikipedia.org/wiki/Memoization>`_
 
-    The memoizer implementation here does not collapse duplicate calls
-    at call time, but works **only** when the result of a previous
-    call is available at the time the duplicate call is made.
+    The memoizer also collapses duplicate calls which are made while an
+    earlier identical call is still in flight: rather than being launched,
+    the duplicate waits for the earlier call and shares its outcome.
 
     For instance::
 
-       No advantage from                 Memoization helps
-       memoization here:                 here:
+       Duplicates collapsed              Result reused from
+       while in flight:                  the lookup table:
 
         TaskA                            TaskB
           |   TaskA                        |
-          |     |   TaskA                done  (TaskB)
-          |     |     |                                (TaskB)
-        done    |     |
-              done    |
-                    done
+          |     :   TaskA                done  (TaskB)
+          |     :     :                                (TaskB)
+        done  done  done
+
+    Collapsed calls share the final outcome of the call they wait on,
+    including its failure once that call has used up its retries; they
+    are not retried themselves.
 
     The memoizer creates a lookup table by hashing the function name
-    and its inputs, and storing the results of the function.
+    and its inputs, and storing the results of the function. It also
+    keeps an index of the AppFutures of tasks which have been launched
+    but have not yet completed, keyed by the same hash.
 
     When a task is ready for launch, i.e., all of its arguments
     have resolved, we add its hash to the task datastructure.
     """
 
-    def __init__(self, dfk, memoize=True, checkpoint={}):
+    def __init__(self, dfk, memoize=True, checkpoint={}, max_entries=None, max_bytes=None, spill_dir=None):
         """Initialize the memoizer.
 
         Args:
@@ -119,17 +365,29 @@ class Memoizer(object):
 
         KWargs:
             - memoize (Bool): enable memoization or not.
-            - checkpoint (Dict): A checkpoint loaded as a dict.
+            - checkpoint (Dict or CheckpointIndex): Checkpointed results, either as a dict of
+              hashsum to Future, or as a CheckpointIndex which is looked up lazily.
+            - max_entries (int): Maximum number of results to keep in memory. Default None, unlimited.
+            - max_bytes (int): Maximum total pickled size of results to keep in memory. Default None, unlimited.
+            - spill_dir (str): Directory to which results beyond those limits are spilled. Default None,
+              such results are discarded.
         """
         self.dfk = dfk
         self.memoize = memoize
 
+        self.memo_lookup_table = MemoTable(max_entries=max_entries, max_bytes=max_bytes, spill_dir=spill_dir)
         if self.memoize:
             logger.info("App caching initialized")
-            self.memo_lookup_table = checkpoint
+            if isinstance(checkpoint, dict):
+                self.memo_lookup_table.update(checkpoint)
+            else:
+                self.memo_lookup_table.backing = checkpoint
         else:
             logger.info("App caching disabled for all apps")
-            self.memo_lookup_table = {}
+
+        # hashsum -> AppFuture of the task currently computing that hashsum
+        self.inflight_table = {}
+        self.memo_lock = threading.Lock()
 
     def make_hash(self, task):
         """Create a hash of the task inputs.
@@ -139,7 +397,7 @@ class Memoizer(object):
         at serialization.
 
         Args:
-            - task (dict) : Task dictionary from dfk.tasks
+            - task (TaskRecord) : Task record from dfk.tasks
 
         Returns:
             - hash (str) : A unique hash string
@@ -152,25 +410,25 @@ class Memoizer(object):
         # and normalised differently - with output_ref set to True.
         # kwargs listed in ignore_for_cache will also be removed
 
-        filtered_kw = task['kwargs'].copy()
+        filtered_kw = task.kwargs.copy()
 
-        ignore_list = task['ignore_for_cache']
+        ignore_list = task.ignore_for_cache
 
         logger.debug("Ignoring these kwargs for checkpointing: {}".format(ignore_list))
         for k in ignore_list:
             logger.debug("Ignoring kwarg {}".format(k))
             del filtered_kw[k]
 
-        if 'outputs' in task['kwargs']:
-            outputs = task['kwargs']['outputs']
+        if 'outputs' in task.kwargs:
+            outputs = task.kwargs['outputs']
             del filtered_kw['outputs']
             t = t + [id_for_memo(outputs, output_ref=True)]   # TODO: use append?
 
         t = t + [id_for_memo(filtered_kw)]
 
-        t = t + [id_for_memo(task['func_name']),
-                 id_for_memo(task['fn_hash']),
-                 id_for_memo(task['args'])]
+        t = t + [id_for_memo(task.func_name),
+                 id_for_memo(task.fn_hash),
+                 id_for_memo(task.args)]
 
         x = b''.join(t)
         hashedsum = hashlib.md5(x).hexdigest()
@@ -183,29 +441,48 @@ class Memoizer(object):
         exists and the result, since a None result is possible and could be confusing.
         This seems like a reasonable option without relying on a cache_miss exception.
 
+        If there is no result yet, but another task with the same hash is in flight,
+        a future which will complete with the outcome of that task is returned. Otherwise,
+        the task is recorded as in flight for its hash, so that later duplicates wait
+        for it.
+
         Args:
-            - task(task) : task from the dfk.tasks table
+            - task (TaskRecord) : task from the dfk.tasks table
 
         Returns:
-            - Result (Future): A completed future containing the memoized result
+            - Result (Future): A future containing (or which will contain) the memoized result
 
-        This call will also set task['hashsum'] to the unique hashsum for the func+inputs.
+        This call will also set task.hashsum to the unique hashsum for the func+inputs.
         """
-        if not self.memoize or not task['memoize']:
-            task['hashsum'] = None
+        if not self.memoize or not task.memoize:
+            task.hashsum = None
             logger.debug("Task {} will not be memoized".format(task_id))
             return None
 
         hashsum = self.make_hash(task)
         logger.debug("Task {} has memoization hash {}".format(task_id, hashsum))
         result = None
-        if hashsum in self.memo_lookup_table:
-            result = self.memo_lookup_table[hashsum]
-            logger.info("Task %s using result from cache", task_id)
-        else:
-            logger.info("Task %s had no result in cache", task_id)
-
-        task['hashsum'] = hashsum
+        inflight_fu = None
+        with self.memo_lock:
+            result = self.memo_lookup_table.get(hashsum)
+            if result is not None:
+                logger.info("Task %s using result from cache", task_id)
+            else:
+                inflight_fu = self.inflight_table.get(hashsum)
+                # a retry of the in-flight task itself must not wait on itself
+                if inflight_fu is not None and inflight_fu is not task.app_fu:
+                    logger.info("Task %s waiting for result of in-flight task %s", task_id, inflight_fu.tid)
+                    result = Future()
+                else:
+                    logger.info("Task %s had no result in cache", task_id)
+                    self.inflight_table[hashsum] = task.app_fu
+
+        if result is not None and inflight_fu is not None:
+            # Chain outside of the lock, as the callback runs immediately
+            # if the in-flight task has completed in the meantime.
+            inflight_fu.add_done_callback(partial(_chain_future, target=result))
+
+        task.hashsum = hashsum
 
         return result
 
@@ -228,18 +505,27 @@ class Memoizer(object):
 
         Args:
              - task_id (int): Integer task id
-             - task (dict) : A task dict from dfk.tasks
+             - task (TaskRecord) : A task record from dfk.tasks
              - r (Result future): Result future
 
         A warning is issued when a hash collision occurs during the update.
         This is not likely.
         """
-        if not self.memoize or not task['memoize'] or 'hashsum' not in task:
+        if not self.memoize or not task.memoize or task.hashsum is None:
             return
 
-        if task['hashsum'] in self.memo_lookup_table:
-            logger.info('Updating app cache entry with latest %s:%s call' %
-                        (task['func_name'], task_id))
-            self.memo_lookup_table[task['hashsum']] = r
-        else:
-            self.memo_lookup_table[task['hashsum']] = r
+        with self.memo_lock:
+            if self.inflight_table.get(task.hashsum) is task.app_fu:
+                del self.inflight_table[task.hashsum]
+
+            if task.hashsum in self.memo_lookup_table:
+                logger.info('Updating app cache entry with latest %s:%s call' %
+                            (task.func_name, task_id))
+                self.memo_lookup_table[task.hashsum] = r
+            else:
+                self.memo_lookup_table[task.hashsum] = r
+
+    def close(self):
+        """Log the app cache statistics and release any spill store."""
+        logger.info("App cache statistics: {}".format(self.memo_lookup_table.stats()))
+        self.memo_lookup_table.close()
@@ -0,0 +1,255 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MemoTable(object):
+    """The memoizer's lookup table, mapping hashsums to completed futures.
+
+    With no limits, this behaves like a dictionary. If max_entries or max_bytes
+    is set, the table keeps at most that many entries (or bytes of results) in
+    memory, evicting the least recently used entries beyond that. If a spill_dir
+    is given, evicted entries are written to an sqlite database in that directory,
+    and are transparently reloaded when they are next looked up; otherwise they are
+    discarded.
+
+    The size of an entry is the size of its pickled outcome, so setting max_bytes
+    means each result is pickled once when it is added to the table.
+
+    If a backing lookup is given (such as a
+    :class:`~parsl.dataflow.checkpoints.CheckpointIndex`), it is consulted for
+    hashsums which are not in the table, and results found there are added to
+    the table. As they can be looked up again, they are not spilled when evicted.
+
+    The table counts hits and misses (of lookups made with get), evictions, the
+    number of bytes written to the spill store, the number of entries reloaded
+    from it and the number of entries loaded from the backing lookup.
+    See :meth:`stats`.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, spill_dir=None, backing=None):
+        """Initialize the table.
+
+        KWargs:
+            - max_entries (int) : Maximum number of entries to keep in memory. Default None, unlimited.
+            - max_bytes (int) : Maximum total pickled size of the entries kept in memory. Default None, unlimited.
+            - spill_dir (str) : Directory in which to store evicted entries. Default None, evicted entries
+              are discarded.
+            - backing : An object with a get(hashsum) method returning a completed Future or None,
+              consulted for hashsums which are not in the table. Default None.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.backing = backing
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        # hashsums of in-memory entries which are also in the spill store,
+        # or were loaded from the backing lookup, and so need not be spilled
+        # when evicted
+        self._on_disk = set()
+        self._from_backing = set()
+        self._db = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_bytes = 0
+        self.spill_loads = 0
+        self.backing_loads = 0
+
+    @property
+    def bounded(self):
+        return self.max_entries is not None or self.max_bytes is not None
+
+    def get(self, hashsum):
+        """Look up a hashsum, counting a hit or a miss.
+
+        Returns:
+            - The completed future for hashsum, or None if there is none.
+        """
+        with self._lock:
+            fu = self._lookup(hashsum)
+            if fu is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return fu
+
+    def __getitem__(self, hashsum):
+        with self._lock:
+            fu = self._lookup(hashsum)
+        if fu is None:
+            raise KeyError(hashsum)
+        return fu
+
+    def __contains__(self, hashsum):
+        with self._lock:
+            return (hashsum in self._entries or
+                    self._spilled_record(hashsum) is not None or
+                    (self.backing is not None and hashsum in self.backing))
+
+    def __setitem__(self, hashsum, fu):
+        with self._lock:
+            if hashsum in self._entries:
+                self._remove(hashsum)
+            if self._db is not None:
+                self._db.execute("DELETE FROM memo WHERE hash = ?", (hashsum,))
+            self._insert(hashsum, fu)
+            self._evict()
+
+    def __len__(self):
+        with self._lock:
+            count = len(self._entries)
+            if self._db is not None:
+                count += self._db.execute("SELECT COUNT(*) FROM memo").fetchone()[0] - len(self._on_disk)
+            return count
+
+    def update(self, table):
+        for hashsum, fu in table.items():
+            self[hashsum] = fu
+
+    def stats(self):
+        """Return a dictionary of the table's counters."""
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'bytes': self._bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'spill_bytes': self.spill_bytes,
+                    'spill_loads': self.spill_loads,
+                    'backing_loads': self.backing_loads}
+
+    def close(self):
+        """Close and remove the spill store, if one was created, and close
+        the backing lookup."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                try:
+                    os.remove(self._db_path)
+                except OSError:
+                    logger.debug("Could not remove memo spill store {}".format(self._db_path))
+            self._on_disk.clear()
+            self._from_backing.clear()
+            if self.backing is not None and hasattr(self.backing, 'close'):
+                self.backing.close()
+
+    def _lookup(self, hashsum):
+        fu = self._entries.get(hashsum)
+        if fu is not None:
+            self._entries.move_to_end(hashsum)
+            return fu
+
+        record = self._spilled_record(hashsum)
+        if record is None:
+            return self._backing_lookup(hashsum)
+
+        data = pickle.loads(record)
+        fu = Future()
+        if data['exception'] is not None:
+            fu.set_exception(data['exception'])
+        else:
+            fu.set_result(data['result'])
+        self.spill_loads += 1
+
+        self._insert(hashsum, fu, size=len(record))
+        self._on_disk.add(hashsum)
+        self._evict(keep=hashsum)
+        return fu
+
+    def _backing_lookup(self, hashsum):
+        if self.backing is None:
+            return None
+        fu = self.backing.get(hashsum)
+        if fu is None:
+            return None
+        self.backing_loads += 1
+        self._insert(hashsum, fu)
+        self._from_backing.add(hashsum)
+        self._evict(keep=hashsum)
+        return fu
+
+    def _spilled_record(self, hashsum):
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT record FROM memo WHERE hash = ?", (hashsum,)).fetchone()
+        return None if row is None else row[0]
+
+    def _insert(self, hashsum, fu, size=None):
+        if self.max_bytes is not None:
+            if size is None:
+                try:
+                    size = len(self._pickle(fu))
+                except Exception:
+                    size = 0
+            self._sizes[hashsum] = size
+            self._bytes += size
+        self._entries[hashsum] = fu
+
+    def _remove(self, hashsum):
+        fu = self._entries.pop(hashsum)
+        self._bytes -= self._sizes.pop(hashsum, 0)
+        self._on_disk.discard(hashsum)
+        self._from_backing.discard(hashsum)
+        return fu
+
+    def _over_limit(self):
+        return ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes))
+
+    def _evict(self, keep=None):
+        """Evict least recently used entries until the table is within its
+        limits, never evicting the entry for hashsum keep."""
+        while self._over_limit() and len(self._entries) > (0 if keep is None else 1):
+            hashsum = next(iter(self._entries))
+            if hashsum == keep:
+                self._entries.move_to_end(hashsum)
+                continue
+            on_disk = hashsum in self._on_disk or hashsum in self._from_backing
+            fu = self._remove(hashsum)
+            self.evictions += 1
+            if self.spill_dir is not None and not on_disk:
+                self._spill(hashsum, fu)
+
+    def _spill(self, hashsum, fu):
+        try:
+            record = self._pickle(fu)
+        except Exception:
+            logger.debug("Could not pickle outcome for hash {}, discarding it from the app cache".format(hashsum))
+            return
+
+        if self._db is None:
+            self._open_db()
+        self._db.execute("INSERT OR REPLACE INTO memo (hash, record) VALUES (?, ?)", (hashsum, record))
+        self.spill_bytes += len(record)
+
+    def _open_db(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._db_path = os.path.join(self.spill_dir, 'memo_spill.db')
+        if os.path.exists(self._db_path):
+            os.remove(self._db_path)
+        logger.info("Spilling app cache entries to {}".format(self._db_path))
+        # This is a scratch store which is discarded at the end of the run,
+        # so it does not need to survive crashes.
+        self._db = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute("CREATE TABLE memo (hash TEXT PRIMARY KEY, record BLOB)")
+
+    @staticmethod
+    def _pickle(fu):
+        e = fu.exception()
+        return pickle.dumps({'exception': e,
+                             'result': None if e is not None else fu.result()})
@@ -0,0 +1,89 @@
+"""Speculative re-execution of straggling tasks.
+
+A few slow workers can dominate the makespan of a workflow. With speculative
+execution, the DataFlowKernel keeps a window of the recent runtimes of the
+completed tasks of each app, and periodically looks for launched tasks which
+have been running for longer than a given percentile of the runtimes of their
+app. Each such task is submitted to its executor a second time, and whichever
+attempt succeeds first provides the result of the task. The other attempt is
+left to finish, and its outcome is ignored. A failure of one attempt while
+the other is still running is also ignored, so a task only fails (or is
+retried) when its last running attempt fails.
+
+Runtimes are measured from launch to completion, as for critical path
+estimates, so they include time spent queued in the executor.
+"""
+import logging
+import threading
+from collections import deque
+
+from parsl.dataflow.states import States
+
+logger = logging.getLogger(__name__)
+
+# seconds between checks for straggling tasks
+SPECULATION_INTERVAL = 1
+
+
+class Speculator(object):
+    """Decides which launched tasks are straggling, from per-app runtime
+    distributions.
+    """
+
+    def __init__(self, percentile=95.0, min_samples=10, window=100):
+        """Initialize the speculator.
+
+        KWargs:
+            - percentile (float) : Percentile of the runtimes of an app beyond which its tasks are straggling. Default 95.
+            - min_samples (int) : Number of completed tasks of an app needed before its tasks are considered
+              for speculation. Default 10.
+            - window (int) : Number of the most recent runtimes of each app which are kept. Default 100.
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self._runtimes = {}
+        self._lock = threading.Lock()
+
+    def task_completed(self, task_record):
+        """Add the runtime of a successfully completed task to the distribution of its app."""
+        if task_record.time_submitted is None or task_record.time_returned is None:
+            return
+        runtime = (task_record.time_returned - task_record.time_submitted).total_seconds()
+        with self._lock:
+            runtimes = self._runtimes.get(task_record.func_name)
+            if runtimes is None:
+                runtimes = self._runtimes[task_record.func_name] = deque(maxlen=self.window)
+            runtimes.append(runtime)
+
+    def threshold(self, func_name):
+        """The runtime in seconds beyond which tasks of an app are straggling,
+        or None if too few of its tasks have completed to tell."""
+        with self._lock:
+            runtimes = sorted(self._runtimes.get(func_name, ()))
+        if len(runtimes) < max(self.min_samples, 1):
+            return None
+        # nearest rank
+        rank = max(int(round(self.percentile / 100.0 * len(runtimes))), 1)
+        return runtimes[min(rank, len(runtimes)) - 1]
+
+    def stragglers(self, task_records, now):
+        """The records of the launched tasks which have run for longer than
+        the threshold of their app, and have not been speculated on.
+
+        Args:
+            - task_records (iterable of TaskRecord) : Records of incomplete tasks
+            - now (datetime.datetime) : The current time
+        """
+        thresholds = {}
+        stragglers = []
+        for task_record in task_records:
+            if task_record.status != States.launched or task_record.speculated or task_record.time_submitted is None:
+                continue
+            func_name = task_record.func_name
+            if func_name not in thresholds:
+                thresholds[func_name] = self.threshold(func_name)
+            threshold = thresholds[func_name]
+            if threshold is not None and (now - task_record.time_submitted).total_seconds() > threshold:
+                stragglers.append(task_record)
+        return stragglers
@@ -0,0 +1,114 @@
+import threading
+
+from parsl.dataflow.states import States
+
+
+class TaskRecord(object):
+    """The DataFlowKernel's record of a single task.
+
+    This replaces the per-task dictionary which the DFK previously used,
+    and uses __slots__ so that a record costs a fixed, small amount of
+    memory. This matters because the DFK holds a record for every task
+    which has not yet completed (or, when checkpointing, which has not
+    yet been checkpointed).
+
+    The failure history is only needed by tasks which fail, and so is
+    created lazily on first use.
+
+    For compatibility with code which treated task records as
+    dictionaries, fields can also be accessed with subscript syntax,
+    for example ``record['status']``.
+    """
+
+    __slots__ = ('id',
+                 'func',
+                 'func_name',
+                 'fn_hash',
+                 'args',
+                 'kwargs',
+                 'executor',
+                 'choices',
+                 'memoize',
+                 'hashsum',
+                 'ignore_for_cache',
+                 'priority',
+                 'critical_path',
+                 'status',
+                 'depends',
+                 'outstanding_deps',
+                 'consumers',
+                 'app_fu',
+                 'exec_fu',
+                 'speculative_fu',
+                 'speculated',
+                 'fail_count',
+                 'retries_left',
+                 'time_submitted',
+                 'time_returned',
+                 '_fail_history',
+                 'task_launch_lock')
+
+    def __init__(self, task_id, func, func_name, fn_hash, executor, memoize=False, ignore_for_cache=None, priority=0,
+                 choices=None):
+        self.id = task_id
+        self.func = func
+        self.func_name = func_name
+        self.fn_hash = fn_hash
+        self.args = None
+        self.kwargs = None
+        self.executor = executor
+        self.choices = choices
+        self.memoize = memoize
+        self.hashsum = None
+        self.ignore_for_cache = ignore_for_cache
+        self.priority = priority
+        self.critical_path = 0.0
+        self.status = States.unsched
+        self.depends = None
+        self.outstanding_deps = 0
+        self.consumers = 0
+        self.app_fu = None
+        self.exec_fu = None
+        self.speculative_fu = None
+        self.speculated = False
+        self.fail_count = 0
+        self.retries_left = 0
+        self.time_submitted = None
+        self.time_returned = None
+        self._fail_history = None
+        # held while testing the state of the task and launching it
+        self.task_launch_lock = threading.Lock()
+
+    @property
+    def fail_history(self):
+        """List of string descriptions of failed execution attempts."""
+        if self._fail_history is None:
+            self._fail_history = []
+        return self._fail_history
+
+    def release_arguments(self, keep=()):
+        """Drop references to the arguments of this task, so that they can be
+        garbage collected once the task has been dispatched.
+
+        Args:
+            - keep (iterable of str): kwargs which should be retained, for
+              example because they describe the task for logging or monitoring.
+        """
+        self.args = None
+        if self.kwargs:
+            self.kwargs = {k: self.kwargs[k] for k in keep if k in self.kwargs}
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __repr__(self):
+        return "<TaskRecord id={} func_name={} status={}>".format(self.id, self.func_name, self.status.name)
@@ -180,7 +180,7 @@ class UsageTracker (object):
         site_count = len([x for x in self.dfk.config.executors if x.managed])
 
         app_fails = len([t for t in self.dfk.tasks if
-                         self.dfk.tasks[t]['status'] in FINAL_FAILURE_STATES])
+                         self.dfk.tasks[t].status in FINAL_FAILURE_STATES])
 
         message = {'uuid': self.uuid,
                    'end': time.time(),
@@ -1,6 +1,6 @@
 from abc import ABCMeta, abstractmethod, abstractproperty
 from concurrent.futures import Future
-from typing import Any, Callable, Dict, Optional, List
+from typing import Any, Callable, Dict, Optional, List, Sequence, Tuple
 
 from parsl.providers.provider_base import JobStatus
 
@@ -30,8 +30,15 @@ class ParslExecutor(metaclass=ABCMeta):
               invariant, not co-variant, and it looks like @typeguard cannot be
               persuaded otherwise. So if you're implementing an executor and want to
               @typeguard the constructor, you'll have to use List[Any] here.
+
+       resolves_broadcasts: bool - whether the executor accepts tasks whose arguments
+              include parsl.dataflow.broadcast.Broadcast objects, and replaces them with
+              their objects where the tasks run. If not, the DFK replaces them before
+              submitting tasks to the executor.
     """
 
+    resolves_broadcasts = False
+
     @abstractmethod
     def start(self) -> None:
         """Start the executor.
@@ -46,6 +53,46 @@ class ParslExecutor(metaclass=ABCMeta):
         """
         pass
 
+    def submit_with_priority(self, priority: float, func: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Submit a task with a priority.
+
+        Executors which queue tasks should run queued tasks with higher
+        priorities before those with lower ones, and should override this.
+        The default implementation ignores the priority and calls submit.
+
+        :param priority: The priority of the task. Higher values run first; the default priority is 0.
+        """
+        return self.submit(func, *args, **kwargs)
+
+    def reprioritize(self, future: Future, priority: float) -> None:
+        """Change the priority of a task submitted with submit_with_priority,
+        if it has not yet started to run.
+
+        The default implementation does nothing.
+
+        :param future: The future returned when the task was submitted.
+        :param priority: The new priority of the task.
+        """
+        pass
+
+    def submit_batch(self, tasks: List[Tuple[Callable, Sequence[Any], Dict[str, Any]]],
+                     priorities: Optional[Sequence[float]] = None) -> List[Future]:
+        """Submit a batch of tasks.
+
+        Executors which can submit many tasks more cheaply than by calling
+        submit once per task should override this. The default implementation
+        calls submit (or submit_with_priority) for each task in turn.
+
+        :param tasks: A list of (func, args, kwargs) tuples, one per task.
+        :param priorities: The priority of each task, as for submit_with_priority, or None
+            if all of the tasks have the default priority.
+        :return: A list of Futures, one per task, in the same order as tasks.
+        """
+        if priorities is None:
+            return [self.submit(func, *args, **kwargs) for (func, args, kwargs) in tasks]
+        return [self.submit_with_priority(priority, func, *args, **kwargs)
+                for ((func, args, kwargs), priority) in zip(tasks, priorities)]
+
     @abstractmethod
     def scale_out(self, blocks: int) -> List[object]:
         """Scale out method.
@@ -0,0 +1,145 @@
+"""Node-local store of the broadcasts received by an HTEX manager.
+
+A manager fetches each broadcast which its tasks refer to from the
+interchange once, and writes it to a file in a directory of its own, which
+is in /dev/shm where that exists, so that the file is held in shared memory.
+The file of a broadcast is named by the hex of its id, and holds the
+buffers of the serialized broadcast::
+
+    count, length of each buffer, buffers
+
+where the count and lengths are 8 byte little-endian integers, and each
+buffer starts at a multiple of ALIGNMENT bytes. Files are written under a
+temporary name and renamed into place, so that workers never see a partly
+written broadcast.
+
+Workers map the files read-only and deserialize broadcasts from memoryviews
+of the mappings. Large buffers, such as the data of NumPy arrays, are used
+in place, so the workers of a node share a single copy of them; other
+objects are unpickled once by each worker which uses them. Broadcasts are
+kept until they are released, or until the manager exits, when the
+directory is removed. The memory of a released broadcast is freed once the
+workers which have mapped it have dropped it from their caches.
+"""
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from ipyparallel.serialize import deserialize_object
+
+from parsl.dataflow.broadcast import replace_broadcasts
+from parsl.executors.high_throughput.errors import BroadcastError
+from parsl.executors.high_throughput.function_registry import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Buffers are aligned for the widest vector loads
+ALIGNMENT = 64
+
+# Number of broadcasts each worker keeps deserialized
+BROADCAST_CACHE_SIZE = 16
+
+_LENGTH = struct.Struct("<Q")
+
+# the store of the manager of this worker process, set in HTEX workers
+_worker_store = None
+
+
+def _path(directory, broadcast_id):
+    return os.path.join(directory, broadcast_id.hex())
+
+
+def make_directory():
+    """Make a directory to hold the broadcasts of a manager."""
+    shm = '/dev/shm'
+    return tempfile.mkdtemp(prefix='parsl-broadcast-', dir=shm if os.path.isdir(shm) else None)
+
+
+def remove_directory(directory):
+    """Remove a directory made by make_directory, with the broadcasts in it."""
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def write(directory, broadcast_id, buffers):
+    """Write the buffers of a broadcast to the store."""
+    views = [memoryview(buf) for buf in buffers]
+    path = _path(directory, broadcast_id)
+    with open(path + '.tmp', 'wb') as f:
+        offset = f.write(_LENGTH.pack(len(views)) + b''.join(_LENGTH.pack(view.nbytes) for view in views))
+        for view in views:
+            padding = -offset % ALIGNMENT
+            offset += f.write(b'\0' * padding) + f.write(view)
+    os.rename(path + '.tmp', path)
+
+
+def remove(directory, broadcast_id):
+    """Remove a broadcast from the store, if it holds it."""
+    try:
+        os.remove(_path(directory, broadcast_id))
+    except FileNotFoundError:
+        pass
+
+
+def contains(directory, broadcast_id):
+    """Whether the store holds a broadcast."""
+    return os.path.exists(_path(directory, broadcast_id))
+
+
+def load(directory, broadcast_id):
+    """Load a broadcast from the store, without copying its buffers."""
+    try:
+        with open(_path(directory, broadcast_id), 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        raise BroadcastError("broadcast {} is not held on this node: {}".format(broadcast_id.hex(), e))
+
+    view = memoryview(mapping)
+    count, = _LENGTH.unpack_from(view)
+    lengths = [_LENGTH.unpack_from(view, _LENGTH.size * (i + 1))[0] for i in range(count)]
+    offset = _LENGTH.size * (count + 1)
+    buffers = []
+    for length in lengths:
+        offset += -offset % ALIGNMENT
+        buffers.append(view[offset:offset + length])
+        offset += length
+    obj, _ = deserialize_object(buffers)
+    return obj
+
+
+class WorkerStore(object):
+    """The view of an HTEX worker of the broadcasts held by its manager."""
+
+    def __init__(self, directory, size=BROADCAST_CACHE_SIZE):
+        """
+        Args:
+            - directory (str) : Directory in which the manager writes broadcasts
+            - size (int) : Number of broadcasts kept deserialized
+        """
+        self.directory = directory
+        self._loaded = LRUCache(size)
+
+    def get(self, broadcast):
+        """The object of a Broadcast."""
+        obj = self._loaded.get(broadcast.broadcast_id, self)
+        if obj is self:
+            obj = load(self.directory, broadcast.broadcast_id)
+            self._loaded.put(broadcast.broadcast_id, obj)
+        return obj
+
+
+def start_worker_store(directory):
+    """Make the broadcasts held by its manager available to a worker."""
+    global _worker_store
+    _worker_store = WorkerStore(directory)
+
+
+def resolve_broadcasts(args, kwargs):
+    """Replace the Broadcasts in the arguments of a task with their objects."""
+    def get(broadcast):
+        if _worker_store is None:
+            raise BroadcastError("no broadcast store in this process")
+        return _worker_store.get(broadcast)
+    return replace_broadcasts(args, kwargs, get)
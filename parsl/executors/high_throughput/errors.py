@@ -10,3 +10,29 @@ class WorkerLost(Exception):
 
     def __str__(self):
         return self.__repr__()
+
+
+class RemoteReferenceError(Exception):
+    """Exception raised when the object a RemoteReference refers to cannot be fetched
+    """
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __repr__(self):
+        return "Failed to fetch object by reference: {}".format(self.reason)
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class BroadcastError(Exception):
+    """Exception raised when a broadcast cannot be loaded on a worker
+    """
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __repr__(self):
+        return "Failed to load broadcast: {}".format(self.reason)
+
+    def __str__(self):
+        return self.__repr__()
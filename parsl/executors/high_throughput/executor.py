@@ -3,7 +3,6 @@ import typeguard
 import logging
 import threading
 import queue
-import pickle
 from multiprocessing import Process, Queue
 from typing import Dict, List, Optional, Tuple, Union
 import math
@@ -14,6 +13,10 @@ from ipyparallel.serialize import deserialize_object
 from parsl.app.errors import RemoteExceptionWrapper
 from parsl.executors.high_throughput import zmq_pipes
 from parsl.executors.high_throughput import interchange
+from parsl.executors.high_throughput.function_registry import FunctionRegistry
+from parsl.executors.high_throughput import messages
+from parsl.executors.high_throughput.object_store import preferred_manager
+from parsl.dataflow.broadcast import find_broadcasts
 from parsl.executors.errors import BadMessage, ScalingFailed, DeserializationError, SerializationError
 from parsl.executors.status_handling import StatusHandlingExecutor
 from parsl.providers.provider_base import ExecutionProvider
@@ -155,8 +158,58 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
 
     worker_logdir_root : string
         In case of a remote file system, specify the path to where logs will be kept.
+
+    object_store : Bool
+        If set, each manager keeps the results of apps decorated with
+        :func:`~parsl.executors.high_throughput.object_store.by_reference` in an object store
+        on its node, and those apps return references to their results. Tasks which are passed
+        references are preferably sent to the manager which holds the objects. Default: False
+
+    object_store_max_bytes : int
+        Most bytes of objects held by the object store of each manager. Beyond that, the least
+        recently used objects are evicted, and tasks which are passed references to them fail.
+        Default: None, a quarter of the memory available on the node when the manager starts
+
+    submit_batch_size : int
+        Tasks are sent to the interchange in batches. A task submitted while none have been
+        sent for submit_batch_period is sent at once; others wait to be sent in a batch, until
+        submit_batch_size tasks or submit_batch_bytes bytes are waiting, or submit_batch_period
+        has passed. Set to 1 to send every task at once. Default: 1024
+
+    submit_batch_bytes : int
+        Size in bytes of the serialized tasks at which a batch is sent. Default: 1MB
+
+    submit_batch_period : float
+        Milliseconds for which a batch is held waiting for more tasks. Default: 0.5ms
+
+    function_registry : Bool
+        If set, a function submitted more than once is sent to the interchange once, and its
+        tasks refer to it by a digest of its serialized form. Managers fetch functions from the
+        interchange when they first need them, and managers and workers keep the functions they
+        have fetched and deserialized in bounded caches. Functions are serialized with every task,
+        and identified by a sha256 digest of the result, so a function whose closure or defaults
+        change between submissions is sent again. The interchange holds up to 1024 registered
+        functions, dropping the least recently used once no task refers to it. Default: True
+
+    shared_memory_transport : Bool
+        If set, each manager passes tasks and results to and from each of its workers through
+        a pair of ring buffers in shared memory, signalled through pipes, rather than through
+        multiprocessing queues. Large buffers, such as the data of NumPy arrays, are then copied
+        once into shared memory, and the arrays passed to apps are views of it, which are valid
+        only until the app returns. Requires Python 3.8 or later on the workers. Default: False
+
+    shared_memory_size : int
+        Size in bytes of each ring buffer of the shared memory transport. Messages which do not
+        fit in the free space of a ring are pickled through its pipe instead. Default: 16MB
+
+    Objects wrapped with :func:`parsl.broadcast` are sent to the interchange once, and each
+    manager fetches them from the interchange once and keeps them in node-local shared memory,
+    from which its workers map them without copying their buffers, until they are released
+    with :meth:`parsl.dataflow.broadcast.Broadcast.release`.
     """
 
+    resolves_broadcasts = True
+
     @typeguard.typechecked
     def __init__(self,
                  label: str = 'HighThroughputExecutor',
@@ -179,7 +232,15 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                  address_probe_timeout: int = 30,
                  suppress_failure: bool = True,
                  managed: bool = True,
-                 worker_logdir_root: Optional[str] = None):
+                 worker_logdir_root: Optional[str] = None,
+                 object_store: bool = False,
+                 object_store_max_bytes: Optional[int] = None,
+                 submit_batch_size: int = 1024,
+                 submit_batch_bytes: int = 1024 * 1024,
+                 submit_batch_period: float = 0.5,
+                 function_registry: bool = True,
+                 shared_memory_transport: bool = False,
+                 shared_memory_size: int = 16 * 1024 * 1024):
 
         logger.debug("Initializing HighThroughputExecutor")
 
@@ -229,6 +290,20 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         self.suppress_failure = suppress_failure
         self.run_dir = '.'
         self.worker_logdir_root = worker_logdir_root
+        self.object_store = object_store
+        self.object_store_max_bytes = object_store_max_bytes
+        self.submit_batch_size = submit_batch_size
+        self.submit_batch_bytes = submit_batch_bytes
+        self.submit_batch_period = submit_batch_period
+        self.function_registry = function_registry
+        self._function_registry = FunctionRegistry() if function_registry else None
+        self.shared_memory_transport = shared_memory_transport
+        self.shared_memory_size = shared_memory_size
+        # Ids of the broadcasts which have been sent to the interchange, and a lock
+        # held while deciding what to send with a task and sending it, so that the
+        # interchange receives registrations and releases in the order they are made
+        self._broadcasts_sent = set()
+        self._send_lock = threading.Lock()
 
         if not launch_cmd:
             self.launch_cmd = ("process_worker_pool.py {debug} {max_workers} "
@@ -243,7 +318,17 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                                "--block_id={{block_id}} "
                                "--hb_period={heartbeat_period} "
                                "--address_probe_timeout={address_probe_timeout} "
-                               "--hb_threshold={heartbeat_threshold} ")
+                               "--hb_threshold={heartbeat_threshold} "
+                               "{object_store} "
+                               "{shared_memory} ")
+
+    def _object_store_options(self):
+        """The options of process_worker_pool.py for the object store."""
+        if not self.object_store:
+            return ""
+        if self.object_store_max_bytes is None:
+            return "--object_store"
+        return "--object_store --object_store_max_bytes={}".format(self.object_store_max_bytes)
 
     def initialize_scaling(self):
         """ Compose the launch command and call the scale_out
@@ -271,6 +356,9 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                                        heartbeat_period=self.heartbeat_period,
                                        heartbeat_threshold=self.heartbeat_threshold,
                                        poll_period=self.poll_period,
+                                       object_store=self._object_store_options(),
+                                       shared_memory=("--shared_memory_size={}".format(self.shared_memory_size)
+                                                      if self.shared_memory_transport else ""),
                                        logdir=worker_logdir)
         self.launch_cmd = l_cmd
         logger.debug("Launch command: {}".format(self.launch_cmd))
@@ -287,7 +375,10 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
     def start(self):
         """Create the Interchange process and connect to it.
         """
-        self.outgoing_q = zmq_pipes.TasksOutgoing("127.0.0.1", self.interchange_port_range)
+        self.outgoing_q = zmq_pipes.TasksOutgoing("127.0.0.1", self.interchange_port_range,
+                                                  batch_size=self.submit_batch_size,
+                                                  batch_bytes=self.submit_batch_bytes,
+                                                  batch_period=self.submit_batch_period)
         self.incoming_q = zmq_pipes.ResultsIncoming("127.0.0.1", self.interchange_port_range)
         self.command_client = zmq_pipes.CommandClient("127.0.0.1", self.interchange_port_range)
 
@@ -304,33 +395,14 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
     def _queue_management_worker(self):
         """Listen to the queue for task status messages and handle them.
 
-        Depending on the message, tasks will be updated with results, exceptions,
-        or updates. It expects the following messages:
-
-        .. code:: python
-
-            {
-               "task_id" : <task_id>
-               "result"  : serialized result object, if task succeeded
-               ... more tags could be added later
-            }
-
-            {
-               "task_id" : <task_id>
-               "exception" : serialized exception object, on failure
-            }
-
-        We do not support these yet, but they could be added easily.
-
-        .. code:: python
+        Depending on the message, tasks will be updated with results or exceptions.
+        Batches of messages arrive in the format of the messages module: each
+        message is a header frame, holding the task id and whether the task
+        succeeded, followed by the frames of the serialized result object or
+        exception object.
 
-            {
-               "task_id" : <task_id>
-               "cpu_stat" : <>
-               "mem_stat" : <>
-               "io_stat"  : <>
-               "started"  : tstamp
-            }
+        A message for task -1 carrying an exception is a failure of the
+        interchange, which fails all tasks.
 
         The `None` message is a die request.
         """
@@ -360,31 +432,27 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                     return
 
                 else:
-                    for serialized_msg in msgs:
-                        try:
-                            msg = pickle.loads(serialized_msg)
-                            tid = msg['task_id']
-                        except pickle.UnpicklingError:
-                            raise BadMessage("Message received could not be unpickled")
+                    try:
+                        results = list(messages.split(msgs))
+                    except Exception:
+                        raise BadMessage("Message received does not have a valid header")
 
-                        except Exception:
-                            raise BadMessage("Message received does not contain 'task_id' field")
-
-                        if tid == -1 and 'exception' in msg:
+                    for kind, tid, _, frames in results:
+                        if tid == -1 and kind == messages.EXCEPTION:
                             logger.warning("Executor shutting down due to exception from interchange")
-                            exception, _ = deserialize_object(msg['exception'])
+                            exception, _ = deserialize_object(frames[1:])
                             self.set_bad_state_and_fail_all(exception)
                             break
 
                         task_fut = self.tasks[tid]
 
-                        if 'result' in msg:
-                            result, _ = deserialize_object(msg['result'])
+                        if kind == messages.RESULT:
+                            result, _ = deserialize_object(frames[1:])
                             task_fut.set_result(result)
 
-                        elif 'exception' in msg:
+                        elif kind == messages.EXCEPTION:
                             try:
-                                s, _ = deserialize_object(msg['exception'])
+                                s, _ = deserialize_object(frames[1:])
                                 # s should be a RemoteExceptionWrapper... so we can reraise it
                                 if isinstance(s, RemoteExceptionWrapper):
                                     try:
@@ -507,6 +575,28 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
                 logger.debug("[HOLD_BLOCK]: Sending hold to manager: {}".format(manager['manager']))
                 self.hold_worker(manager['manager'])
 
+    def _send_broadcast(self, broadcast_id):
+        """Whether a broadcast is to be sent to the interchange, which it is only
+        the first time it is submitted after being released. Must be called
+        holding _send_lock."""
+        if broadcast_id in self._broadcasts_sent:
+            return False
+        self._broadcasts_sent.add(broadcast_id)
+        return True
+
+    def release_broadcast(self, broadcast_id):
+        """Releases a broadcast, so that the interchange and the managers drop it
+        once the tasks submitted with it have finished. It is sent again with
+        the next task which uses it.
+
+        Args:
+            - broadcast_id (bytes) : Id of the broadcast
+        """
+        with self._send_lock:
+            if broadcast_id in self._broadcasts_sent:
+                self._broadcasts_sent.discard(broadcast_id)
+                self.outgoing_q.put(messages.pack_release(broadcast_id))
+
     def submit(self, func, *args, **kwargs):
         """Submits work to the the outgoing_q.
 
@@ -521,6 +611,73 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         Kwargs:
             - **kwargs (dict) : A dictionary of arbitrary keyword args for func.
 
+        Returns:
+              Future
+        """
+        return self.submit_with_priority(0, func, *args, **kwargs)
+
+    def submit_with_priority(self, priority, func, *args, **kwargs):
+        """Submits work to the the outgoing_q, with a priority.
+
+        The interchange sends queued tasks to workers in order of
+        descending priority, and in order of submission among tasks of
+        the same priority.
+
+        Args:
+            - priority (int or float) : Priority of the task. Higher values run first.
+            - func (callable) : Callable function
+            - *args (list) : List of arbitrary positional arguments.
+
+        Kwargs:
+            - **kwargs (dict) : A dictionary of arbitrary keyword args for func.
+
+        Returns:
+              Future
+        """
+        return self._submit_task(priority, None, func, args, kwargs)
+
+    def reprioritize(self, future, priority):
+        """Changes the priority of a task, if it is still queued by the interchange.
+        A task which has been sent to a manager keeps its priority.
+
+        Args:
+            - future (Future) : Future returned by this executor for the task
+            - priority (int or float) : New priority of the task
+        """
+        task_id = getattr(future, 'parsl_executor_task_id', None)
+        if task_id is None or future.done():
+            return
+        self.outgoing_q.put(messages.pack_reprioritize(task_id, priority))
+
+    def submit_elsewhere(self, future, priority, func, *args, **kwargs):
+        """Submits a copy of a task, which the interchange does not send to the
+        manager running the task of future while it is running, as for a
+        speculative copy of a straggling task.
+
+        Args:
+            - future (Future) : Future returned by this executor for the task to avoid
+            - priority (int or float) : Priority of the task. Higher values run first.
+            - func (callable) : Callable function
+            - *args (list) : List of arbitrary positional arguments.
+
+        Kwargs:
+            - **kwargs (dict) : A dictionary of arbitrary keyword args for func.
+
+        Returns:
+              Future
+        """
+        return self._submit_task(priority, getattr(future, 'parsl_executor_task_id', None), func, args, kwargs)
+
+    def _submit_task(self, priority, avoid_task, func, args, kwargs):
+        """Submits work to the the outgoing_q, as for submit_with_priority.
+
+        Args:
+            - priority (int or float) : Priority of the task. Higher values run first.
+            - avoid_task (int) : Id of the task whose manager the task should avoid, or None
+            - func (callable) : Callable function
+            - args (tuple) : Positional arguments of func
+            - kwargs (dict) : Keyword arguments of func
+
         Returns:
               Future
         """
@@ -537,19 +694,46 @@ class HighThroughputExecutor(StatusHandlingExecutor, RepresentationMixin):
         logger.debug("Pushing function {} to queue with args {}".format(func, args_to_print))
 
         self.tasks[task_id] = Future()
+        self.tasks[task_id].parsl_executor_task_id = task_id
 
+        broadcasts = find_broadcasts(args, kwargs)
         try:
-            fn_buf = pack_apply_message(func, args, kwargs,
+            # With the function registry, the function is packed as None, and
+            # replaced by the serialized function unless the task refers to it by its id
+            fn_buf = pack_apply_message(func if self._function_registry is None else None, args, kwargs,
                                         buffer_threshold=1024 * 1024,
                                         item_threshold=1024)
         except TypeError:
             raise SerializationError(func.__name__)
 
-        msg = {"task_id": task_id,
-               "buffer": fn_buf}
-
-        # Post task to the the outgoing queue
-        self.outgoing_q.put(msg)
+        with self._send_lock:
+            function_id = None
+            released = []
+            if self._function_registry is not None:
+                try:
+                    function_id, function_buf, new_function = self._function_registry.register(func)
+                except TypeError:
+                    raise SerializationError(func.__name__)
+                if function_id is None:
+                    fn_buf = function_buf + fn_buf[1:]
+                released = self._function_registry.take_released()
+
+            frames = messages.pack_task(task_id, fn_buf,
+                                        priority=priority,
+                                        locality=preferred_manager(args, kwargs),
+                                        function_id=function_id,
+                                        broadcast_ids=[b.broadcast_id for b in broadcasts],
+                                        avoid_task=avoid_task)
+            if function_id is not None and new_function:
+                frames = messages.pack_function(function_id, function_buf) + frames
+            for b in broadcasts:
+                if self._send_broadcast(b.broadcast_id):
+                    frames = messages.pack_broadcast(b.broadcast_id, b.buffers) + frames
+            for object_id in released:
+                frames = frames + messages.pack_release(object_id)
+
+            # Post task to the the outgoing queue
+            self.outgoing_q.put(frames)
 
         # Return the future
         return self.tasks[task_id]
@@ -0,0 +1,120 @@
+"""Registry of the functions of HighThroughputExecutor tasks.
+
+When one function is called many times, serializing it with every task makes
+it dominate the size of task messages, and deserializing it with every task
+costs the workers time. Instead, the executor identifies each function by a
+sha256 digest of its serialized form, and sends the function itself only once, to
+the interchange. Tasks then carry the digest in place of the function. A
+manager which receives a task for a function it does not hold fetches the
+function from the interchange once, and keeps it in a bounded LRU cache, and
+each worker keeps the functions it has deserialized in a cache of its own.
+
+A function is registered the second time it is submitted, so that functions
+which are only submitted once, such as the per-task wrappers added by
+resource monitoring, are sent with their tasks and never held by the
+interchange.
+
+Functions are serialized afresh with every task, so a function whose closure
+or defaults have changed since it was last submitted gets a new digest, and
+is sent again, rather than running with its old state.
+
+Up to FUNCTION_CACHE_SIZE functions are registered at once. The least
+recently used function is released when another is registered, so that the
+interchange drops it once no task refers to it, and it is registered again
+if it is submitted twice more.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from ipyparallel.serialize import serialize_object
+
+# Number of functions held by each cache
+FUNCTION_CACHE_SIZE = 1024
+
+
+def function_id(buffers):
+    """Digest identifying a serialized function."""
+    digest = hashlib.sha256()
+    for buf in buffers:
+        digest.update(buf)
+    return digest.digest()
+
+
+class LRUCache(object):
+    """A mapping which holds up to size entries, evicting the least recently used."""
+
+    def __init__(self, size=FUNCTION_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return default
+        return self._entries[key]
+
+    def put(self, key, value):
+        """Add an entry, returning the keys of the entries evicted to make room for it."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        evicted = []
+        while len(self._entries) > self.size:
+            evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FunctionRegistry(object):
+    """Executor side of the registry, which decides how the function of each
+    task is sent."""
+
+    def __init__(self, size=FUNCTION_CACHE_SIZE):
+        """
+        Args:
+            - size (int) : Number of functions submitted once which are remembered,
+              to be registered if they are submitted again, and number of
+              functions registered at once
+        """
+        self._seen = LRUCache(size)
+        self._registered = LRUCache(size)
+        self._released = []
+        self._lock = threading.Lock()
+
+    def serialize(self, func):
+        """Serialize a function, returning the digest of its serialized form and the buffers."""
+        buffers = serialize_object(func)
+        return function_id(buffers), buffers
+
+    def register(self, func):
+        """Decide how the function of a task is sent.
+
+        Returns:
+            - (function_id, buffers, new): function_id is None if the function
+              is to be sent with the task, in buffers. Otherwise the task refers
+              to the function by function_id, and new is True if the function
+              must first be sent to the interchange, in buffers.
+        """
+        fid, buffers = self.serialize(func)
+        with self._lock:
+            if self._registered.get(fid):
+                return fid, buffers, False
+            elif fid in self._seen:
+                self._released.extend(self._registered.put(fid, True))
+                return fid, buffers, True
+            else:
+                self._seen.put(fid, True)
+                return None, buffers, False
+
+    def take_released(self):
+        """The ids of the functions released since this was last called, which
+        the interchange no longer needs to hold."""
+        with self._lock:
+            released, self._released = self._released, []
+        return released
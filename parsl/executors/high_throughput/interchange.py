@@ -7,22 +7,22 @@ import platform
 import random
 import time
 import datetime
-import pickle
 import logging
 import queue
 import threading
+import itertools
 import json
 
 from parsl.version import VERSION as PARSL_VERSION
 from ipyparallel.serialize import serialize_object
 
 from parsl.app.errors import RemoteExceptionWrapper
+from parsl.executors.high_throughput import messages
 from parsl.monitoring.message_type import MessageType
 
 
 LOOP_SLOWDOWN = 0.0  # in seconds
 HEARTBEAT_CODE = (2 ** 32) - 1
-PKL_HEARTBEAT_CODE = pickle.dumps((2 ** 32) - 1)
 
 
 class ShutdownRequest(Exception):
@@ -175,7 +175,34 @@ class Interchange(object):
             self.monitoring_enabled = True
             logger.info("Monitoring enabled and connected to hub")
 
-        self.pending_task_queue = queue.Queue(maxsize=10 ** 6)
+        # Tasks are ordered by descending priority, then by arrival. Entries
+        # are (-priority, arrival number, entry number, task), so that tasks
+        # themselves are never compared.
+        self.pending_task_queue = queue.PriorityQueue(maxsize=10 ** 6)
+        self._task_sequence = itertools.count()
+        # Tasks whose arguments refer to objects held by a manager are queued
+        # for that manager, keyed by its identity, and taken by other managers
+        # only when they have nothing else to do.
+        self._affinity_queues = {}
+        # The entry of each queued task, by task id. A reprioritized task is queued
+        # again with a new entry, and the frames of its old entry are set to None,
+        # to be skipped when it is taken. Counts of such stale entries are kept.
+        self._queued = {}
+        self._stale_count = 0
+        self._queue_lock = threading.Lock()
+        # Frames of the functions and broadcasts registered by the executor, keyed
+        # by their ids, and the managers waiting for those which have not arrived yet.
+        self._registered = {}
+        self._requests = {}
+        # Counts of the queued and running tasks which refer to each function or
+        # broadcast, and the ids of those each such task refers to. One which the
+        # executor has released is dropped once no task refers to it, and the
+        # managers are then told to drop their copies.
+        self._references = {}
+        self._task_objects = {}
+        self._released = set()
+        self._dropped = []
+        self._registered_lock = threading.Lock()
 
         self.worker_ports = worker_ports
         self.worker_port_range = worker_port_range
@@ -217,30 +244,178 @@ class Interchange(object):
 
         logger.info("Platform info: {}".format(self.current_platform))
 
-    def get_tasks(self, count):
-        """ Obtains a batch of tasks from the internal pending_task_queue
+    def get_tasks(self, count, manager=None):
+        """ Obtains a batch of tasks from the internal pending_task_queue,
+        highest priority first
+
+        Tasks queued for the manager, because it holds objects they refer
+        to, are taken first, then unplaced tasks, and then tasks queued
+        for other managers. A task which should avoid the manager running
+        another task, as a speculative copy avoids the manager running
+        the original, is left queued while the manager runs that task.
 
         Parameters
         ----------
         count: int
             Count of tasks to get from the queue
 
+        manager: bytes
+            Identity of the manager the tasks are for
+
         Returns
         -------
         List of upto count tasks. May return fewer than count down to an empty list
-            eg. [{'task_id':<x>, 'buffer':<buf>} ... ]
+            eg. [{'task_id':<x>, 'frames':<frames>} ... ]
         """
+        queues = [self.pending_task_queue]
+        if manager in self._affinity_queues:
+            queues.insert(0, self._affinity_queues[manager])
+        queues.extend(q for m, q in list(self._affinity_queues.items()) if m != manager)
+
         tasks = []
-        for i in range(0, count):
-            try:
-                x = self.pending_task_queue.get(block=False)
-            except queue.Empty:
-                break
-            else:
+        avoided = []
+        for q in queues:
+            while len(tasks) < count:
+                try:
+                    entry = q.get(block=False)
+                except queue.Empty:
+                    break
+                x = entry[-1]
+                with self._queue_lock:
+                    if x['frames'] is None:
+                        self._stale_count -= 1
+                        continue
+                    if x['avoid'] is not None and manager in self._ready_manager_queue and \
+                            x['avoid'] in self._ready_manager_queue[manager]['tasks']:
+                        avoided.append((q, entry))
+                        continue
+                    del self._queued[x['task_id']]
                 tasks.append(x)
 
+        # Avoided tasks are queued again in their places, for other managers
+        for q, entry in avoided:
+            q.put(entry)
         return tasks
 
+    def pending_task_count(self):
+        """ Count of the tasks in the internal queues
+        """
+        return (self.pending_task_queue.qsize() + sum(q.qsize() for q in list(self._affinity_queues.values())) -
+                self._stale_count)
+
+    def queue_task(self, task_id, priority, frames):
+        """ Puts a task on the internal queue of the manager it should preferably
+        run on, or on the pending_task_queue if it has no preference
+
+        Parameters
+        ----------
+        task_id: int
+            Id of the task, from its header
+
+        priority: float
+            Priority of the task, from its header
+
+        frames: list
+            Frames of the task message, which are kept to be forwarded as they are
+        """
+        sequence = next(self._task_sequence)
+        entry = (-priority, sequence, sequence, {'task_id': task_id,
+                                                 'avoid': messages.unpack_avoid_task(frames[4]),
+                                                 'frames': frames})
+        object_ids = [_bytes(frames[2])] if _bytes(frames[2]) else []
+        object_ids.extend(messages.unpack_broadcast_ids(_bytes(frames[3])))
+        if object_ids:
+            with self._registered_lock:
+                self._task_objects[task_id] = object_ids
+                for object_id in object_ids:
+                    self._references[object_id] = self._references.get(object_id, 0) + 1
+        with self._queue_lock:
+            self._queued[task_id] = entry
+        self._put(entry)
+
+    def _put(self, entry):
+        manager = _bytes(entry[-1]['frames'][1])
+        if not manager:
+            self.pending_task_queue.put(entry)
+        else:
+            if manager not in self._affinity_queues:
+                self._affinity_queues[manager] = queue.PriorityQueue()
+            self._affinity_queues[manager].put(entry)
+
+    def reprioritize(self, task_id, priority):
+        """ Changes the priority of a task, if it is still queued. One which has
+        been sent to a manager keeps the priority it was sent with
+
+        Parameters
+        ----------
+        task_id: int
+            Id of the task
+
+        priority: float
+            New priority of the task
+        """
+        with self._queue_lock:
+            entry = self._queued.get(task_id)
+            if entry is None or entry[0] == -priority:
+                return
+            task = entry[-1]
+            new_entry = (-priority, entry[1], next(self._task_sequence), dict(task))
+            task['frames'] = None
+            self._stale_count += 1
+            self._queued[task_id] = new_entry
+        self._put(new_entry)
+
+    def task_finished(self, task_id):
+        """ Records that a task no longer refers to the functions and broadcasts
+        it used, and drops those which have been released and are no longer used
+        """
+        with self._registered_lock:
+            for object_id in self._task_objects.pop(task_id, ()):
+                self._references[object_id] -= 1
+                if not self._references[object_id]:
+                    del self._references[object_id]
+                    if object_id in self._released:
+                        self._drop(object_id)
+
+    def release(self, object_id):
+        """ Drops a function or broadcast released by the executor, at once if no
+        task refers to it, and otherwise once the tasks which do have finished
+        """
+        with self._registered_lock:
+            if object_id in self._references:
+                self._released.add(object_id)
+            elif object_id in self._registered:
+                self._drop(object_id)
+
+    def _drop(self, object_id):
+        """ Drops a released object. Must be called holding _registered_lock
+        """
+        self._released.discard(object_id)
+        self._registered.pop(object_id, None)
+        self._dropped.append(object_id)
+        logger.debug("[MAIN] Dropped {}".format(object_id.hex()))
+
+    def send_dropped(self):
+        """ Tells the managers to drop their copies of the dropped objects
+        """
+        with self._registered_lock:
+            dropped, self._dropped = self._dropped, []
+        frames = []
+        for object_id in dropped:
+            frames.extend(messages.pack_release(object_id))
+        for manager in self._ready_manager_queue:
+            self.task_outgoing.send_multipart([manager, b''] + frames)
+
+    def requeue_affinity_tasks(self, manager):
+        """ Moves the tasks queued for a lost manager to the pending_task_queue
+        """
+        affinity_queue = self._affinity_queues.pop(manager, None)
+        while affinity_queue is not None:
+            try:
+                self.pending_task_queue.put(affinity_queue.get(block=False))
+            except queue.Empty:
+                break
+
     def migrate_tasks_to_internal(self, kill_event):
         """Pull tasks from the incoming tasks 0mq pipe onto the internal
         pending task queue
@@ -257,19 +432,51 @@ class Interchange(object):
 
         while not kill_event.is_set():
             try:
-                msg = self.task_incoming.recv_pyobj()
+                frames = self.task_incoming.recv_multipart(copy=False)
             except zmq.Again:
                 # We just timed out while attempting to receive
-                logger.debug("[TASK_PULL_THREAD] {} tasks in internal queue".format(self.pending_task_queue.qsize()))
+                logger.debug("[TASK_PULL_THREAD] {} tasks in internal queue".format(self.pending_task_count()))
                 continue
 
-            if msg == 'STOP':
-                kill_event.set()
-                break
-            else:
-                self.pending_task_queue.put(msg)
-                task_counter += 1
-                logger.debug("[TASK_PULL_THREAD] Fetched task:{}".format(task_counter))
+            # The executor sends batches of tasks. Only their headers are read;
+            # the payload frames are queued as they are
+            for kind, task_id, priority, task_frames in messages.split(frames):
+                if kind == messages.STOP:
+                    kill_event.set()
+                    break
+                elif kind in (messages.FUNCTION, messages.BROADCAST):
+                    object_id = task_frames[1].bytes
+                    with self._registered_lock:
+                        self._released.discard(object_id)
+                        self._registered[object_id] = task_frames
+                    logger.debug("[TASK_PULL_THREAD] Registered {} {}".format(
+                        'function' if kind == messages.FUNCTION else 'broadcast', object_id.hex()))
+                elif kind == messages.REPRIORITIZE:
+                    self.reprioritize(task_id, priority)
+                elif kind == messages.RELEASE:
+                    logger.debug("[TASK_PULL_THREAD] Released {}".format(task_frames[1].bytes.hex()))
+                    self.release(task_frames[1].bytes)
+                else:
+                    self.queue_task(task_id, priority, task_frames)
+                    task_counter += 1
+            logger.debug("[TASK_PULL_THREAD] Fetched task:{}".format(task_counter))
+
+    def request(self, manager, object_id):
+        """ Records that a manager needs a function or broadcast, to be sent by send_requested
+        """
+        self._requests.setdefault(object_id, []).append(manager)
+
+    def send_requested(self):
+        """ Sends the functions and broadcasts which have been requested to the
+        managers which requested them. One which has not yet arrived from the
+        executor stays requested
+        """
+        for object_id in list(self._requests):
+            frames = self._registered.get(object_id)
+            if frames is not None:
+                for manager in self._requests.pop(object_id):
+                    logger.debug("[MAIN] Sending {} to manager {}".format(object_id.hex(), manager))
+                    self.task_outgoing.send_multipart([manager, b''] + frames, copy=False)
 
     def _command_server(self, kill_event):
         """ Command server to run async command to the interchange
@@ -280,7 +487,7 @@ class Interchange(object):
                 command_req = self.command_channel.recv_pyobj()
                 logger.debug("[COMMAND] Received command request: {}".format(command_req))
                 if command_req == "OUTSTANDING_C":
-                    outstanding = self.pending_task_queue.qsize()
+                    outstanding = self.pending_task_count()
                     for manager in self._ready_manager_queue:
                         outstanding += len(self._ready_manager_queue[manager]['tasks'])
                     reply = outstanding
@@ -409,9 +616,7 @@ class Interchange(object):
                                 logger.debug("Setting kill event")
                                 self._kill_event.set()
                                 e = ManagerLost(manager, self._ready_manager_queue[manager]['hostname'])
-                                result_package = {'task_id': -1, 'exception': serialize_object(e)}
-                                pkl_package = pickle.dumps(result_package)
-                                self.results_outgoing.send(pkl_package)
+                                self.results_outgoing.send_multipart(messages.pack_exception(-1, serialize_object(e)))
                                 logger.warning("[MAIN] Sent failure reports, unregistering manager")
                             else:
                                 logger.debug("[MAIN] Suppressing shutdown due to version incompatibility")
@@ -424,44 +629,56 @@ class Interchange(object):
                         if self.suppress_failure is False:
                             self._kill_event.set()
                             e = BadRegistration(manager, critical=True)
-                            result_package = {'task_id': -1, 'exception': serialize_object(e)}
-                            pkl_package = pickle.dumps(result_package)
-                            self.results_outgoing.send(pkl_package)
+                            self.results_outgoing.send_multipart(messages.pack_exception(-1, serialize_object(e)))
                         else:
                             logger.debug("[MAIN] Suppressing bad registration from manager:{}".format(
                                 manager))
 
+                elif len(message) > 2:
+                    self._ready_manager_queue[manager]['last'] = time.time()
+                    for kind, _, _, frames in messages.split(message[1:]):
+                        if kind == messages.REQUEST:
+                            logger.debug("[MAIN] Manager {} requested {}".format(manager, frames[1].hex()))
+                            self.request(manager, frames[1])
                 else:
                     tasks_requested = int.from_bytes(message[1], "little")
                     self._ready_manager_queue[manager]['last'] = time.time()
                     if tasks_requested == HEARTBEAT_CODE:
                         logger.debug("[MAIN] Manager {} sent heartbeat".format(manager))
-                        self.task_outgoing.send_multipart([manager, b'', PKL_HEARTBEAT_CODE])
+                        self.task_outgoing.send_multipart([manager, b'', messages.pack_header(messages.HEARTBEAT)])
                     else:
                         logger.debug("[MAIN] Manager {} requested {} tasks".format(manager, tasks_requested))
                         self._ready_manager_queue[manager]['free_capacity'] = tasks_requested
                         interesting_managers.add(manager)
                 logger.debug("[MAIN] leaving task_outgoing section")
 
+            if self._requests:
+                self.send_requested()
+            if self._dropped:
+                self.send_dropped()
+
             # If we had received any requests, check if there are tasks that could be passed
 
             logger.debug("Managers count (total/interesting): {}/{}".format(len(self._ready_manager_queue),
                                                                             len(interesting_managers)))
 
-            if interesting_managers and not self.pending_task_queue.empty():
+            if interesting_managers and self.pending_task_count():
                 shuffled_managers = list(interesting_managers)
                 random.shuffle(shuffled_managers)
 
-                while shuffled_managers and not self.pending_task_queue.empty():  # cf. the if statement above...
+                while shuffled_managers and self.pending_task_count():  # cf. the if statement above...
                     manager = shuffled_managers.pop()
                     tasks_inflight = len(self._ready_manager_queue[manager]['tasks'])
                     real_capacity = min(self._ready_manager_queue[manager]['free_capacity'],
                                         self._ready_manager_queue[manager]['max_capacity'] - tasks_inflight)
 
                     if (real_capacity and self._ready_manager_queue[manager]['active']):
-                        tasks = self.get_tasks(real_capacity)
+                        tasks = self.get_tasks(real_capacity, manager)
                         if tasks:
-                            self.task_outgoing.send_multipart([manager, b'', pickle.dumps(tasks)])
+                            frames = [manager, b'']
+                            for task in tasks:
+                                frames.extend(task['frames'])
+                            self.task_outgoing.send_multipart(frames, copy=False)
                             task_count = len(tasks)
                             count += task_count
                             tids = [t['task_id'] for t in tasks]
@@ -483,16 +700,19 @@ class Interchange(object):
             # Receive any results and forward to client
             if self.results_incoming in self.socks and self.socks[self.results_incoming] == zmq.POLLIN:
                 logger.debug("[MAIN] entering results_incoming section")
-                manager, *b_messages = self.results_incoming.recv_multipart()
+                manager, *frames = self.results_incoming.recv_multipart(copy=False)
+                manager = manager.bytes
                 if manager not in self._ready_manager_queue:
                     logger.warning("[MAIN] Received a result from a un-registered manager: {}".format(manager))
                 else:
-                    logger.debug("[MAIN] Got {} result items in batch".format(len(b_messages)))
-                    for b_message in b_messages:
-                        r = pickle.loads(b_message)
-                        # logger.debug("[MAIN] Received result for task {} from {}".format(r['task_id'], manager))
-                        self._ready_manager_queue[manager]['tasks'].remove(r['task_id'])
-                    self.results_outgoing.send_multipart(b_messages)
+                    # Only the headers are read; the results are forwarded as they are
+                    result_count = 0
+                    for _, task_id, _, _ in messages.split(frames):
+                        self._ready_manager_queue[manager]['tasks'].remove(task_id)
+                        self.task_finished(task_id)
+                        result_count += 1
+                    logger.debug("[MAIN] Got {} result items in batch".format(result_count))
+                    self.results_outgoing.send_multipart(frames, copy=False)
                     logger.debug("[MAIN] Current tasks: {}".format(self._ready_manager_queue[manager]['tasks']))
                 logger.debug("[MAIN] leaving results_incoming section")
 
@@ -506,11 +726,12 @@ class Interchange(object):
                     try:
                         raise ManagerLost(manager, self._ready_manager_queue[manager]['hostname'])
                     except Exception:
-                        result_package = {'task_id': tid, 'exception': serialize_object(RemoteExceptionWrapper(*sys.exc_info()))}
-                        pkl_package = pickle.dumps(result_package)
-                        self.results_outgoing.send(pkl_package)
+                        exception = serialize_object(RemoteExceptionWrapper(*sys.exc_info()))
+                        self.results_outgoing.send_multipart(messages.pack_exception(tid, exception))
                         logger.warning("[MAIN] Sent failure reports, unregistering manager")
+                    self.task_finished(tid)
                 self._ready_manager_queue.pop(manager, 'None')
+                self.requeue_affinity_tasks(manager)
                 if manager in interesting_managers:
                     interesting_managers.remove(manager)
 
@@ -519,6 +740,10 @@ class Interchange(object):
         logger.warning("Exiting")
 
 
+def _bytes(frame):
+    return frame.bytes if isinstance(frame, zmq.Frame) else frame
+
+
 def start_file_logger(filename, name='interchange', level=logging.DEBUG, format_string=None):
     """Add a stream log handler.
 
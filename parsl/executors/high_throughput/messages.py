@@ -0,0 +1,153 @@
+"""Wire format of the task and result messages of the HighThroughputExecutor.
+
+Tasks and results pass from the executor through the interchange to the
+managers and back. Each message is sent as a small header frame followed by
+its payload frames::
+
+    [header, payload frame, payload frame, ...]
+
+The header is a fixed size struct holding what the interchange needs to
+route the message: the task id, the priority of the task, the kind of the
+message and the number of payload frames which follow it. The payload frames
+are the serialized buffers of the task or result, which the interchange
+forwards without unpickling or copying them. Several messages may be sent
+in one multipart message, one after another.
+
+The first payload frame of a task is the identity of the manager the task
+should preferably run on, or empty if it has none. The second is the id of
+the function of the task in the function registry, or empty if the function
+is sent with the task. The third is the ids of the broadcasts in the
+arguments of the task, one after another, each BROADCAST_ID_SIZE bytes
+long. The fourth is the id of another task, packed as TASK_ID, whose
+manager the task should not run on, or empty if it may run on any
+manager: a speculative copy of a task avoids the manager running the
+original. The rest are the buffers of pack_apply_message, which hold None
+in place of the function if it is registered. The payload frames of results
+and exceptions are the buffers of serialize_object.
+
+Functions and broadcasts are sent to the interchange, and from the
+interchange to managers which request them, as function and broadcast
+messages, whose payload frames are the id of the function or broadcast and
+its serialized buffers. A request has the id of the function or broadcast
+which is requested as its only payload frame, as does a release, which the
+executor sends to the interchange when it no longer needs a function or
+broadcast to be held, and the interchange sends on to managers once no
+queued or running task refers to it. A reprioritization has no payload
+frames: its header holds the id of a task and its new priority.
+"""
+import struct
+
+# task id, priority, kind, count of payload frames. The priority is a double,
+# so that it holds float priorities, and integer priorities up to 2**53 exactly.
+HEADER = struct.Struct("<qdBI")
+
+TASK = 0
+RESULT = 1
+EXCEPTION = 2
+HEARTBEAT = 3
+STOP = 4
+FUNCTION = 5
+REQUEST = 6
+BROADCAST = 7
+RELEASE = 8
+REPRIORITIZE = 9
+
+# A task id, as in the frame of the task a task should avoid
+TASK_ID = struct.Struct("<q")
+
+# Size of the sha256 digests which identify functions and broadcasts
+BROADCAST_ID_SIZE = 32
+
+
+def pack_header(kind, task_id=0, priority=0, frame_count=0):
+    """Make a header frame."""
+    return HEADER.pack(task_id, priority, kind, frame_count)
+
+
+def unpack_header(frame):
+    """Read a header frame, which may be bytes or a zmq.Frame.
+
+    Returns:
+        - (kind, task_id, priority, frame_count)
+    """
+    if not isinstance(frame, bytes):
+        frame = frame.bytes
+    task_id, priority, kind, frame_count = HEADER.unpack(frame)
+    return kind, task_id, priority, frame_count
+
+
+def pack_task(task_id, buffers, priority=0, locality=None, function_id=None, broadcast_ids=(), avoid_task=None):
+    """Make the frames of a task message."""
+    locality = locality.encode('utf-8') if locality else b''
+    function_id = function_id or b''
+    avoid_task = TASK_ID.pack(avoid_task) if avoid_task is not None else b''
+    return [pack_header(TASK, task_id, priority, len(buffers) + 4),
+            locality, function_id, b''.join(broadcast_ids), avoid_task] + list(buffers)
+
+
+def unpack_avoid_task(frame):
+    """Read the frame of the task a task should avoid.
+
+    Returns:
+        - The id of the task, or None if the task may run on any manager
+    """
+    if not isinstance(frame, bytes):
+        frame = frame.bytes
+    return TASK_ID.unpack(frame)[0] if frame else None
+
+
+def unpack_broadcast_ids(frame):
+    """Read the broadcast ids frame of a task."""
+    return [frame[i:i + BROADCAST_ID_SIZE] for i in range(0, len(frame), BROADCAST_ID_SIZE)]
+
+
+def pack_result(task_id, buffers):
+    """Make the frames of a result message."""
+    return [pack_header(RESULT, task_id, frame_count=len(buffers))] + list(buffers)
+
+
+def pack_exception(task_id, buffers):
+    """Make the frames of an exception message."""
+    return [pack_header(EXCEPTION, task_id, frame_count=len(buffers))] + list(buffers)
+
+
+def pack_function(function_id, buffers):
+    """Make the frames of a function message."""
+    return [pack_header(FUNCTION, frame_count=len(buffers) + 1), function_id] + list(buffers)
+
+
+def pack_broadcast(broadcast_id, buffers):
+    """Make the frames of a broadcast message."""
+    return [pack_header(BROADCAST, frame_count=len(buffers) + 1), broadcast_id] + list(buffers)
+
+
+def pack_request(object_id):
+    """Make the frames of a request for a function or broadcast."""
+    return [pack_header(REQUEST, frame_count=1), object_id]
+
+
+def pack_release(object_id):
+    """Make the frames of a release of a function or broadcast."""
+    return [pack_header(RELEASE, frame_count=1), object_id]
+
+
+def pack_reprioritize(task_id, priority):
+    """Make the frames of a reprioritization of a task."""
+    return [pack_header(REPRIORITIZE, task_id, priority)]
+
+
+def split(frames):
+    """Split the frames of a multipart message into its messages.
+
+    Yields:
+        - (kind, task_id, priority, frames), where frames are the frames of
+          the message, including its header
+    """
+    i = 0
+    while i < len(frames):
+        kind, task_id, priority, frame_count = unpack_header(frames[i])
+        end = i + 1 + frame_count
+        if end > len(frames):
+            raise ValueError("Message for task {} is missing {} frames".format(task_id, end - len(frames)))
+        yield kind, task_id, priority, frames[i:end]
+        i = end
@@ -0,0 +1,337 @@
+"""Per-manager object stores, which let task results stay on worker nodes.
+
+The result of an app decorated with :func:`by_reference` is kept in the
+object store of the manager whose worker ran the task, and the task returns
+a :class:`RemoteReference` to it in place of the result. When the reference
+is passed to another task, the HighThroughputExecutor asks the interchange
+to prefer the manager which holds the object, and the worker which runs the
+task replaces the reference with the object, fetching it from the holding
+manager only if it is held by another manager.
+
+Each manager serves its store on a ZMQ ROUTER socket, bound to the loopback
+interface for its own workers, and to the interface through which it reaches
+the interchange for other nodes. Requests and replies are multipart messages
+of raw frames, which the store never unpickles:
+
+    [b'put', ref_id, buf] -> [b'ok']
+    [b'get', ref_id]      -> [b'ok', buf] or [b'missing']
+    [b'release', ref_id]  -> [b'ok']
+
+where buf is the pickled object. Objects are kept until they are released,
+or until the manager exits. The store holds at most max_bytes of objects:
+beyond that, the least recently used objects are evicted, and tasks which
+refer to them fail with a RemoteReferenceError.
+"""
+import logging
+import os
+import pickle
+import random
+import socket
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from functools import wraps
+
+import zmq
+
+from parsl.executors.high_throughput.errors import RemoteReferenceError
+
+logger = logging.getLogger(__name__)
+
+# the store of the manager of this worker process, set in HTEX workers
+_worker_store = None
+
+# ZMQ contexts cannot be shared across fork, so each process makes its own
+_context = None
+_context_pid = None
+
+
+def _get_context():
+    global _context, _context_pid
+    if _context is None or _context_pid != os.getpid():
+        _context = zmq.Context()
+        _context_pid = os.getpid()
+    return _context
+
+
+def _request(address, frames, timeout):
+    """Send a request to the object store at address and return the frames of the reply."""
+    sock = _get_context().socket(zmq.REQ)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+    try:
+        sock.connect(address)
+        sock.send_multipart(frames)
+        try:
+            reply = sock.recv_multipart()
+        except zmq.Again:
+            raise RemoteReferenceError("No reply from object store at {} within {}s".format(address, timeout))
+    finally:
+        sock.close()
+    if reply[0] == b'error':
+        raise RemoteReferenceError("Object store at {} failed: {}".format(address, reply[1].decode('utf-8', 'replace')))
+    return reply
+
+
+class RemoteReference(object):
+    """A reference to an object held in the object store of an HTEX manager.
+
+    References are small, and can be passed to other apps in place of the
+    objects they refer to.
+    """
+
+    def __init__(self, ref_id, manager_id, address):
+        """
+        Args:
+            - ref_id (str) : Identifier of the object in the store
+            - manager_id (str) : Identifier of the manager which holds the object
+            - address (str) : ZMQ address of the object store of that manager
+        """
+        self.ref_id = ref_id
+        self.manager_id = manager_id
+        self.address = address
+
+    def get(self, timeout=60):
+        """Fetch the object from the manager which holds it.
+
+        Raises:
+            - RemoteReferenceError if the object cannot be fetched
+        """
+        if _worker_store is not None:
+            return _worker_store.get(self, timeout=timeout)
+        return _fetch(self, self.address, timeout)
+
+    def release(self, timeout=60):
+        """Remove the object from the store of the manager which holds it."""
+        _request(self.address, [b'release', self.ref_id.encode('utf-8')], timeout)
+
+    def __eq__(self, other):
+        return isinstance(other, RemoteReference) and self.ref_id == other.ref_id
+
+    def __hash__(self):
+        return hash(self.ref_id)
+
+    def __repr__(self):
+        return "<RemoteReference {} on manager {}>".format(self.ref_id, self.manager_id)
+
+
+def _fetch(ref, address, timeout):
+    reply = _request(address, [b'get', ref.ref_id.encode('utf-8')], timeout)
+    if reply[0] != b'ok':
+        raise RemoteReferenceError("Object {} is not held by manager {}: it was released or evicted".format(
+            ref.ref_id, ref.manager_id))
+    return pickle.loads(reply[1])
+
+
+def by_reference(func):
+    """Decorator which makes an app return a RemoteReference to its result,
+    keeping the result in the object store of the HTEX manager which ran it.
+
+    It should be applied beneath the app decorator::
+
+        @python_app
+        @by_reference
+        def simulate(x):
+            ...
+
+    Outside of an HTEX worker, for example when the app runs on a
+    ThreadPoolExecutor, results are returned as usual.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        from parsl.executors.high_throughput import object_store
+        if object_store._worker_store is None:
+            return result
+        return object_store._worker_store.put(result)
+    return wrapper
+
+
+def _replace(args, kwargs, replace):
+    """Copies of args and kwargs with the references replaced by replace(ref),
+    looking in the same places as the DFK looks for dependencies."""
+    new_args = [replace(a) if isinstance(a, RemoteReference) else a for a in args]
+    new_kwargs = {k: replace(v) if isinstance(v, RemoteReference) else v for k, v in kwargs.items()}
+    if isinstance(new_kwargs.get('inputs'), list):
+        new_kwargs['inputs'] = [replace(i) if isinstance(i, RemoteReference) else i for i in new_kwargs['inputs']]
+    return new_args, new_kwargs
+
+
+def find_references(args, kwargs):
+    """The RemoteReferences in the arguments of a task."""
+    refs = []
+
+    def collect(ref):
+        refs.append(ref)
+        return ref
+
+    _replace(args, kwargs, collect)
+    return refs
+
+
+def preferred_manager(args, kwargs):
+    """The id of the manager which holds the most objects referred to by the
+    arguments of a task, or None if they refer to none."""
+    refs = find_references(args, kwargs)
+    if not refs:
+        return None
+    return Counter(ref.manager_id for ref in refs).most_common(1)[0][0]
+
+
+def resolve_references(args, kwargs, timeout=60):
+    """Replace the RemoteReferences in the arguments of a task with the
+    objects they refer to."""
+    return _replace(args, kwargs, lambda ref: ref.get(timeout=timeout))
+
+
+class WorkerStore(object):
+    """The view of an HTEX worker of the object store of its manager."""
+
+    def __init__(self, manager_id, local_address, address):
+        """
+        Args:
+            - manager_id (str) : Identifier of the manager
+            - local_address (str) : Address at which the worker reaches the store
+            - address (str) : Address at which other nodes reach the store
+        """
+        self.manager_id = manager_id
+        self.local_address = local_address
+        self.address = address
+
+    def put(self, obj, timeout=60):
+        """Keep obj in the store of the manager, and return a reference to it."""
+        ref_id = uuid.uuid4().hex
+        _request(self.local_address, [b'put', ref_id.encode('utf-8'), pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)], timeout)
+        return RemoteReference(ref_id, self.manager_id, self.address)
+
+    def get(self, ref, timeout=60):
+        """Fetch the object ref refers to, from this manager if it holds it,
+        otherwise from the manager which does."""
+        if ref.manager_id == self.manager_id:
+            return _fetch(ref, self.local_address, timeout)
+        logger.debug("Fetching object {} from manager {}".format(ref.ref_id, ref.manager_id))
+        return _fetch(ref, ref.address, timeout)
+
+
+def start_worker_store(manager_id, local_address, address):
+    """Make the store of its manager available to the apps run by a worker."""
+    global _worker_store
+    _worker_store = WorkerStore(manager_id, local_address, address)
+
+
+def interface_address(host, port):
+    """The address of the interface of this node through which it reaches host."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # connecting a UDP socket sends nothing, but chooses the route
+        sock.connect((host, int(port)))
+        return sock.getsockname()[0]
+    finally:
+        sock.close()
+
+
+class ObjectStoreServer(object):
+    """The object store of a manager, served to its workers and to the workers
+    and clients on other nodes."""
+
+    def __init__(self, manager_id, address, port_range=(56000, 57000), max_bytes=None):
+        """
+        Args:
+            - manager_id (str) : Identifier of the manager
+            - address (str) : Address of the interface of this node on which other nodes reach the store
+            - port_range (int, int) : Range of ports from which to choose the port to serve on
+            - max_bytes (int) : Most bytes of objects to hold, evicting the least recently
+              used objects beyond that. Default None, unbounded
+        """
+        self.manager_id = manager_id
+        self.max_bytes = max_bytes
+        self.objects = OrderedDict()
+        self.nbytes = 0
+        self.evicted = 0
+        self.context = zmq.Context()
+        interfaces = ['127.0.0.1'] if address == '127.0.0.1' else ['127.0.0.1', address]
+        self.socket, self.port = self._bind(interfaces, port_range)
+        self.local_address = "tcp://127.0.0.1:{}".format(self.port)
+        self.address = "tcp://{}:{}".format(address, self.port)
+        self._thread = None
+
+    def _bind(self, interfaces, port_range, max_tries=100):
+        """Bind a socket to the same port on each of interfaces."""
+        for _ in range(max_tries):
+            port = random.randint(*port_range)
+            sock = self.context.socket(zmq.ROUTER)
+            sock.setsockopt(zmq.LINGER, 0)
+            try:
+                for interface in interfaces:
+                    sock.bind("tcp://{}:{}".format(interface, port))
+                return sock, port
+            except zmq.ZMQError:
+                sock.close()
+        raise RemoteReferenceError("Could not bind the object store to a port in {} on {}".format(port_range, interfaces))
+
+    def start(self, kill_event):
+        """Serve requests in a thread until kill_event is set."""
+        self._thread = threading.Thread(target=self._serve, args=(kill_event,), name="Object-Store")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+        self.socket.close()
+        self.context.term()
+
+    def _serve(self, kill_event):
+        logger.info("[OBJECT_STORE] Serving on {}".format(self.address))
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        while not kill_event.is_set():
+            if not poller.poll(timeout=100):
+                continue
+            frames = self.socket.recv_multipart(copy=False)
+            # the ROUTER prepends the identity of the client, and REQ sockets an empty delimiter
+            envelope, request = frames[:2], [frame.bytes if i < 2 else frame for i, frame in enumerate(frames[2:])]
+            try:
+                reply = self.handle(request)
+            except Exception as e:
+                logger.warning("[OBJECT_STORE] Bad request: {}".format(e))
+                reply = [b'error', str(e).encode('utf-8')]
+            self.socket.send_multipart(envelope + reply, copy=False)
+        logger.info("[OBJECT_STORE] Exiting with {} objects of {} bytes, after evicting {}".format(
+            len(self.objects), self.nbytes, self.evicted))
+
+    def handle(self, request):
+        """Carry out a request, and return the frames of the reply."""
+        if len(request) < 2:
+            raise ValueError("Object store requests have at least 2 frames, got {}".format(len(request)))
+        op, ref_id = request[0], request[1]
+        if op == b'put' and len(request) == 3:
+            self._put(ref_id, request[2])
+            return [b'ok']
+        elif op == b'get' and len(request) == 2:
+            buf = self.objects.get(ref_id)
+            if buf is None:
+                return [b'missing']
+            self.objects.move_to_end(ref_id)
+            return [b'ok', buf]
+        elif op == b'release' and len(request) == 2:
+            buf = self.objects.pop(ref_id, None)
+            if buf is not None:
+                self.nbytes -= len(buf)
+            return [b'ok']
+        raise ValueError("Unknown object store operation {!r} with {} frames".format(op[:16], len(request)))
+
+    def _put(self, ref_id, buf):
+        previous = self.objects.pop(ref_id, None)
+        if previous is not None:
+            self.nbytes -= len(previous)
+        self.objects[ref_id] = buf
+        self.nbytes += len(buf)
+        if self.max_bytes is None:
+            return
+        while self.nbytes > self.max_bytes and len(self.objects) > 1:
+            evicted_id, evicted = self.objects.popitem(last=False)
+            self.nbytes -= len(evicted)
+            self.evicted += 1
+            logger.warning("[OBJECT_STORE] Evicted object {} of {} bytes, holding {} of at most {} bytes".format(
+                evicted_id.decode('utf-8', 'replace'), len(evicted), self.nbytes, self.max_bytes))
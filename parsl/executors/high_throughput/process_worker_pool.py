@@ -5,9 +5,9 @@ import logging
 import os
 import sys
 import platform
+import signal
 # import random
 import threading
-import pickle
 import time
 import datetime
 import queue
@@ -17,10 +17,15 @@ import math
 import json
 import psutil
 import multiprocessing
+import multiprocessing.connection
 
 from parsl.version import VERSION as PARSL_VERSION
 from parsl.app.errors import RemoteExceptionWrapper
 from parsl.executors.high_throughput.errors import WorkerLost
+from parsl.executors.high_throughput import broadcast_store, messages
+from parsl.executors.high_throughput.function_registry import LRUCache
+from parsl.executors.high_throughput import object_store
+from parsl.executors.high_throughput.ring_buffer import WorkerChannel
 from parsl.executors.high_throughput.probe import probe_addresses
 if platform.system() == 'Darwin':
     from parsl.executors.high_throughput.mac_safe_queue import MacSafeQueue as mpQueue
@@ -28,7 +33,7 @@ else:
     from multiprocessing import Queue as mpQueue
 
 from ipyparallel.serialize import unpack_apply_message  # pack_apply_message,
-from ipyparallel.serialize import serialize_object
+from ipyparallel.serialize import deserialize_object, serialize_object
 
 RESULT_TAG = 10
 TASK_REQUEST_TAG = 11
@@ -65,7 +70,11 @@ class Manager(object):
                  block_id=None,
                  heartbeat_threshold=120,
                  heartbeat_period=30,
-                 poll_period=10):
+                 poll_period=10,
+                 enable_object_store=False,
+                 object_store_address=None,
+                 object_store_max_bytes=None,
+                 shared_memory_size=0):
         """
         Parameters
         ----------
@@ -117,6 +126,24 @@ class Manager(object):
 
         poll_period : int
              Timeout period used by the manager in milliseconds. Default: 10ms
+
+        enable_object_store : bool
+             If set, the manager keeps the results of apps decorated with by_reference in an
+             object store. Default: False
+
+        object_store_address : str
+             Address of the interface of this node on which other nodes reach the object store.
+             Default: None, the interface through which the manager reaches the interchange
+
+        object_store_max_bytes : int
+             Most bytes of objects the object store holds, evicting the least recently used
+             objects beyond that. Default: None, a quarter of the memory available on the node
+             when the manager starts
+
+        shared_memory_size : int
+             If set, tasks and results pass between the manager and each worker through
+             ring buffers of this many bytes in shared memory, rather than through queues.
+             Default: 0, use queues
         """
 
         logger.info("Manager started")
@@ -176,9 +203,18 @@ class Manager(object):
                                 math.floor(cores_on_node / cores_per_worker))
         logger.info("Manager will spawn {} workers".format(self.worker_count))
 
-        self.pending_task_queue = mpQueue()
-        self.pending_result_queue = mpQueue()
-        self.ready_worker_queue = mpQueue()
+        self.shared_memory_size = shared_memory_size
+        if shared_memory_size:
+            # Tasks are handed to idle workers, and their results collected, by threads
+            # of the manager, so the queues are local to it. The ready worker queue holds
+            # (worker id, channel) for each idle worker.
+            self.pending_task_queue = queue.Queue()
+            self.pending_result_queue = queue.Queue()
+            self.ready_worker_queue = queue.Queue()
+        else:
+            self.pending_task_queue = mpQueue()
+            self.pending_result_queue = mpQueue()
+            self.ready_worker_queue = mpQueue()
 
         self.max_queue_size = self.prefetch_capacity + self.worker_count
 
@@ -188,6 +224,80 @@ class Manager(object):
         self.heartbeat_threshold = heartbeat_threshold
         self.poll_period = poll_period
 
+        # Serialized functions fetched from the interchange, the directory holding the
+        # broadcasts fetched from it, and the tasks waiting for either, keyed by the id
+        # they are waiting for
+        self.functions = LRUCache()
+        self.broadcast_dir = broadcast_store.make_directory()
+        self.tasks_waiting = {}
+
+        self.object_store = None
+        self.object_store_addresses = None
+        if enable_object_store:
+            if object_store_address is None:
+                object_store_address = object_store.interface_address(ix_address, task_port)
+            if object_store_max_bytes is None:
+                object_store_max_bytes = psutil.virtual_memory().available // 4
+            self.object_store = object_store.ObjectStoreServer(uid, object_store_address,
+                                                               max_bytes=object_store_max_bytes)
+            self.object_store_addresses = (self.object_store.local_address, self.object_store.address)
+            logger.info("Object store at {}, holding at most {} bytes".format(
+                self.object_store.address, object_store_max_bytes))
+
+    def queue_task(self, task, function_id=None, broadcast_ids=()):
+        """ Queues a task for the workers, with its registered function if it refers
+        to one, or holds it while the function and broadcasts it refers to are fetched
+        from the interchange
+        """
+        missing = set()
+        if function_id:
+            task['function_id'] = function_id
+            function = self.functions.get(function_id)
+            if function is None:
+                missing.add(function_id)
+            else:
+                task['function'] = function
+        for broadcast_id in broadcast_ids:
+            if not broadcast_store.contains(self.broadcast_dir, broadcast_id):
+                missing.add(broadcast_id)
+
+        if not missing:
+            self.pending_task_queue.put(task)
+            return
+        waiting = (task, missing)
+        for object_id in missing:
+            if object_id not in self.tasks_waiting:
+                logger.debug("[TASK_PULL_THREAD] Requesting {}".format(object_id.hex()))
+                self.tasks_waiting[object_id] = []
+                self.task_incoming.send_multipart(messages.pack_request(object_id))
+            self.tasks_waiting[object_id].append(waiting)
+
+    def _received(self, object_id):
+        """ Queues the tasks which were waiting only for object_id
+        """
+        for task, missing in self.tasks_waiting.pop(object_id, []):
+            missing.discard(object_id)
+            if not missing:
+                self.pending_task_queue.put(task)
+
+    def function_received(self, function_id, function):
+        """ Caches a function fetched from the interchange, and queues the tasks which
+        were waiting for it
+        """
+        logger.debug("[TASK_PULL_THREAD] Received function {}".format(function_id.hex()))
+        self.functions.put(function_id, function)
+        for task, _ in self.tasks_waiting.get(function_id, []):
+            task['function'] = function
+        self._received(function_id)
+
+    def broadcast_received(self, broadcast_id, buffers):
+        """ Writes a broadcast fetched from the interchange to the store of this node,
+        and queues the tasks which were waiting for it
+        """
+        logger.debug("[TASK_PULL_THREAD] Received broadcast {}".format(broadcast_id.hex()))
+        broadcast_store.write(self.broadcast_dir, broadcast_id, buffers)
+        self._received(broadcast_id)
+
     def create_reg_message(self):
         """ Creates a registration message to identify the worker to the interchange
         """
@@ -259,27 +369,45 @@ class Manager(object):
 
             if self.task_incoming in socks and socks[self.task_incoming] == zmq.POLLIN:
                 poll_timer = 0
-                _, pkl_msg = self.task_incoming.recv_multipart()
-                tasks = pickle.loads(pkl_msg)
+                _, *frames = self.task_incoming.recv_multipart(copy=False)
                 last_interchange_contact = time.time()
 
-                if tasks == 'STOP':
-                    logger.critical("[TASK_PULL_THREAD] Received stop request")
-                    kill_event.set()
+                tids = []
+                for kind, task_id, _, task_frames in messages.split(frames):
+                    if kind == messages.STOP:
+                        logger.critical("[TASK_PULL_THREAD] Received stop request")
+                        kill_event.set()
+                        break
+
+                    elif kind == messages.HEARTBEAT:
+                        logger.debug("Got heartbeat from interchange")
+
+                    elif kind == messages.FUNCTION:
+                        self.function_received(task_frames[1].bytes, [f.bytes for f in task_frames[2:]])
+
+                    elif kind == messages.BROADCAST:
+                        self.broadcast_received(task_frames[1].bytes, [f.buffer for f in task_frames[2:]])
+
+                    elif kind == messages.RELEASE:
+                        # Functions are held in a bounded cache, so only broadcasts are removed
+                        logger.debug("Releasing {}".format(task_frames[1].bytes.hex()))
+                        broadcast_store.remove(self.broadcast_dir, task_frames[1].bytes)
+
+                    else:
+                        # The frames after the header, locality, function id, broadcast ids
+                        # and avoided task frames are the task buffers
+                        task = {'task_id': task_id,
+                                'buffer': [f.bytes for f in task_frames[5:]]}
+                        self.queue_task(task,
+                                        function_id=task_frames[2].bytes,
+                                        broadcast_ids=messages.unpack_broadcast_ids(task_frames[3].bytes))
+                        tids.append(task_id)
+
+                if kill_event.is_set():
                     break
-
-                elif tasks == HEARTBEAT_CODE:
-                    logger.debug("Got heartbeat from interchange")
-
-                else:
-                    task_recv_counter += len(tasks)
-                    logger.debug("[TASK_PULL_THREAD] Got tasks: {} of {}".format([t['task_id'] for t in tasks],
-                                                                                 task_recv_counter))
-
-                    for task in tasks:
-                        self.pending_task_queue.put(task)
-                        # logger.debug("[TASK_PULL_THREAD] Ready tasks: {}".format(
-                        #    [i['task_id'] for i in self.pending_task_queue]))
+                if tids:
+                    task_recv_counter += len(tids)
+                    logger.debug("[TASK_PULL_THREAD] Got tasks: {} of {}".format(tids, task_recv_counter))
 
             else:
                 logger.debug("[TASK_PULL_THREAD] No incoming tasks")
@@ -311,24 +439,28 @@ class Manager(object):
         logger.debug("[RESULT_PUSH_THREAD] push poll period: {}".format(push_poll_period))
 
         last_beat = time.time()
+        # frames of the results to send, and the count of results they hold
         items = []
+        item_count = 0
 
         while not kill_event.is_set():
 
             try:
                 r = self.pending_result_queue.get(block=True, timeout=push_poll_period)
-                items.append(r)
+                items.extend(r)
+                item_count += 1
             except queue.Empty:
                 pass
             except Exception as e:
                 logger.exception("[RESULT_PUSH_THREAD] Got an exception: {}".format(e))
 
             # If we have reached poll_period duration or timer has expired, we send results
-            if len(items) >= self.max_queue_size or time.time() > last_beat + push_poll_period:
+            if item_count >= self.max_queue_size or time.time() > last_beat + push_poll_period:
                 last_beat = time.time()
                 if items:
-                    self.result_outgoing.send_multipart(items)
+                    self.result_outgoing.send_multipart(items, copy=False)
                     items = []
+                    item_count = 0
 
         logger.critical("[RESULT_PUSH_THREAD] Exiting")
 
@@ -354,26 +486,135 @@ class Manager(object):
                             raise WorkerLost(worker_id, platform.node())
                         except Exception:
                             logger.info("[WORKER_WATCHDOG_THREAD] Putting exception for task {} in the pending result queue".format(task['task_id']))
-                            result_package = {'task_id': task['task_id'], 'exception': serialize_object(RemoteExceptionWrapper(*sys.exc_info()))}
-                            pkl_package = pickle.dumps(result_package)
-                            self.pending_result_queue.put(pkl_package)
+                            exception = serialize_object(RemoteExceptionWrapper(*sys.exc_info()))
+                            self.pending_result_queue.put(messages.pack_exception(task['task_id'], exception))
                     except KeyError:
                         logger.info("[WORKER_WATCHDOG_THREAD] Worker {} was not busy when it died".format(worker_id))
 
-                    p = multiprocessing.Process(target=worker, args=(worker_id,
-                                                                     self.uid,
-                                                                     self.worker_count,
-                                                                     self.pending_task_queue,
-                                                                     self.pending_result_queue,
-                                                                     self.ready_worker_queue,
-                                                                     self._tasks_in_progress
-                                                                 ), name="HTEX-Worker-{}".format(worker_id))
-                    self.procs[worker_id] = p
+                    self._start_worker(worker_id)
                     logger.info("[WORKER_WATCHDOG_THREAD] Worker {} has been restarted".format(worker_id))
                 time.sleep(self.poll_period)
 
         logger.critical("[WORKER_WATCHDOG_THREAD] Exiting")
 
+    def _start_worker(self, worker_id):
+        """ Starts a worker process, connected to the manager by the shared queues,
+        or by a channel of its own with the shared memory transport
+        """
+        if self.shared_memory_size:
+            if worker_id in self.channels:
+                # the result receiver may be waiting on the old channel, so it closes it
+                self._retired_channels.put(self.channels[worker_id])
+            channel = WorkerChannel(self.shared_memory_size)
+            p = multiprocessing.Process(target=shared_memory_worker, args=(worker_id,
+                                                                           self.uid,
+                                                                           self.worker_count,
+                                                                           channel,
+                                                                           self.object_store_addresses,
+                                                                           self.broadcast_dir
+                                                                       ), name="HTEX-Worker-{}".format(worker_id))
+            p.start()
+            channel.close_worker_ends()
+            self.channels[worker_id] = channel
+            self.ready_worker_queue.put((worker_id, channel))
+        else:
+            p = multiprocessing.Process(target=worker, args=(worker_id,
+                                                             self.uid,
+                                                             self.worker_count,
+                                                             self.pending_task_queue,
+                                                             self.pending_result_queue,
+                                                             self.ready_worker_queue,
+                                                             self._tasks_in_progress,
+                                                             self.object_store_addresses,
+                                                             self.broadcast_dir
+                                                         ), name="HTEX-Worker-{}".format(worker_id))
+            p.start()
+        self.procs[worker_id] = p
+
+    def dispatch_tasks(self, kill_event):
+        """ Hands pending tasks to idle workers through their channels, with the
+        shared memory transport
+
+        Parameters:
+        -----------
+        kill_event : threading.Event
+              Event to let the thread know when it is time to die.
+        """
+        logger.debug("[TASK_DISPATCH_THREAD] Starting thread")
+        timeout = max(10, self.poll_period) / 1000
+        task = None
+        while not kill_event.is_set():
+            try:
+                if task is None:
+                    task = self.pending_task_queue.get(timeout=timeout)
+                worker_id, channel = self.ready_worker_queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+
+            with self._channel_lock:
+                if self.channels.get(worker_id) is not channel or channel.closed:
+                    # the worker has died and been restarted since it was idle
+                    continue
+                self._tasks_in_progress[worker_id] = task
+                try:
+                    channel.put_task(task)
+                except (OSError, ValueError):
+                    logger.info("[TASK_DISPATCH_THREAD] Worker {} is gone, retrying task {} on another worker".format(
+                        worker_id, task['task_id']))
+                    self._tasks_in_progress.pop(worker_id, None)
+                    continue
+            task = None
+        logger.critical("[TASK_DISPATCH_THREAD] Exiting")
+
+    def receive_results(self, kill_event):
+        """ Reads the results of the workers from their channels onto the pending
+        result queue, with the shared memory transport
+
+        This thread is the only one which closes channels while the workers run,
+        so that it never waits on a closed channel.
+
+        Parameters:
+        -----------
+        kill_event : threading.Event
+              Event to let the thread know when it is time to die.
+        """
+        logger.debug("[RESULT_RECEIVE_THREAD] Starting thread")
+        timeout = max(10, self.poll_period) / 1000
+        while not kill_event.is_set():
+            self._close_retired_channels()
+            readers = {channel.result_reader: (worker_id, channel)
+                       for worker_id, channel in list(self.channels.items()) if not channel.closed}
+            try:
+                ready = multiprocessing.connection.wait(list(readers), timeout=timeout)
+            except OSError:
+                logger.exception("[RESULT_RECEIVE_THREAD] Waiting on the worker channels failed, retrying")
+                continue
+            for reader in ready:
+                worker_id, channel = readers[reader]
+                try:
+                    frames = channel.get_result()
+                except (EOFError, OSError):
+                    # the worker has died; the watchdog reports its task and restarts it
+                    self._close_channel(channel)
+                    continue
+                self._tasks_in_progress.pop(worker_id, None)
+                self.ready_worker_queue.put((worker_id, channel))
+                self.pending_result_queue.put(frames)
+        logger.critical("[RESULT_RECEIVE_THREAD] Exiting")
+
+    def _close_channel(self, channel):
+        with self._channel_lock:
+            channel.close()
+
+    def _close_retired_channels(self):
+        """Close the channels of the workers which have been restarted."""
+        while True:
+            try:
+                channel = self._retired_channels.get_nowait()
+            except queue.Empty:
+                return
+            self._close_channel(channel)
+
     def start(self):
         """ Start the worker processes.
 
@@ -381,20 +622,26 @@ class Manager(object):
         """
         start = time.time()
         self._kill_event = threading.Event()
-        self._tasks_in_progress = multiprocessing.Manager().dict()
+        # Shut down when the provider terminates the block, so that the broadcasts
+        # held in shared memory are removed
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._kill_event.set())
+        if self.shared_memory_size:
+            # the manager records the task it hands to each worker
+            self._tasks_in_progress = {}
+            self.channels = {}
+            # channels replaced by the watchdog, for the result receiver to close
+            self._retired_channels = queue.Queue()
+            # held while a task is put on a channel, and while a channel is closed
+            self._channel_lock = threading.Lock()
+        else:
+            self._tasks_in_progress = multiprocessing.Manager().dict()
 
         self.procs = {}
         for worker_id in range(self.worker_count):
-            p = multiprocessing.Process(target=worker, args=(worker_id,
-                                                             self.uid,
-                                                             self.worker_count,
-                                                             self.pending_task_queue,
-                                                             self.pending_result_queue,
-                                                             self.ready_worker_queue,
-                                                             self._tasks_in_progress
-                                                         ), name="HTEX-Worker-{}".format(worker_id))
-            p.start()
-            self.procs[worker_id] = p
+            self._start_worker(worker_id)
+        # the store serves from a thread, which must not be running when the workers fork
+        if self.object_store:
+            self.object_store.start(self._kill_event)
 
         logger.debug("Manager synced with workers")
 
@@ -410,6 +657,15 @@ class Manager(object):
         self._task_puller_thread.start()
         self._result_pusher_thread.start()
         self._worker_watchdog_thread.start()
+        if self.shared_memory_size:
+            self._task_dispatcher_thread = threading.Thread(target=self.dispatch_tasks,
+                                                            args=(self._kill_event,),
+                                                            name="Task-Dispatcher")
+            self._result_receiver_thread = threading.Thread(target=self.receive_results,
+                                                            args=(self._kill_event,),
+                                                            name="Result-Receiver")
+            self._task_dispatcher_thread.start()
+            self._result_receiver_thread.start()
 
         logger.info("Loop start")
 
@@ -417,16 +673,27 @@ class Manager(object):
         # This might need a multiprocessing event to signal back.
         self._kill_event.wait()
         logger.critical("[MAIN] Received kill event, terminating worker processes")
+        # Workers keep the broadcasts they have mapped until they exit
+        broadcast_store.remove_directory(self.broadcast_dir)
 
         self._task_puller_thread.join()
         self._result_pusher_thread.join()
         self._worker_watchdog_thread.join()
+        if self.shared_memory_size:
+            self._task_dispatcher_thread.join()
+            self._result_receiver_thread.join()
+        if self.object_store:
+            self.object_store.join()
         for proc_id in self.procs:
             self.procs[proc_id].terminate()
             logger.critical("Terminating worker {}:{}".format(self.procs[proc_id],
                                                               self.procs[proc_id].is_alive()))
             self.procs[proc_id].join()
             logger.debug("Worker:{} joined successfully".format(self.procs[proc_id]))
+        if self.shared_memory_size:
+            self._close_retired_channels()
+            for channel in self.channels.values():
+                channel.close()
 
         self.task_incoming.close()
         self.result_outgoing.close()
@@ -436,15 +703,28 @@ class Manager(object):
         return
 
 
-def execute_task(bufs):
+def load_function(bufs):
+    """Deserialize a registered function, in a namespace of its own."""
+    f, _ = deserialize_object(bufs, {'__builtins__': __builtins__})
+    return f
+
+
+def execute_task(bufs, function=None):
     """Deserialize the buffer and execute the task.
 
+    If function is given, it is called in place of the function packed in
+    the buffer, which is then None.
+
     Returns the result or throws exception.
     """
     user_ns = locals()
     user_ns.update({'__builtins__': __builtins__})
 
     f, args, kwargs = unpack_apply_message(bufs, user_ns, copy=False)
+    if function is not None:
+        f = function
+    args, kwargs = object_store.resolve_references(args, kwargs)
+    args, kwargs = broadcast_store.resolve_broadcasts(args, kwargs)
 
     # We might need to look into callability of the function from itself
     # since we change it's name in the new namespace
@@ -474,14 +754,11 @@ def execute_task(bufs):
         return user_ns.get(resultname)
 
 
-def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue, tasks_in_progress):
-    """
+def _start_worker_process(worker_id, pool_id, pool_size, object_store_addresses, broadcast_dir):
+    """Set up logging, the environment and the stores of a worker process."""
+    # The manager handles SIGTERM to shut down; workers are simply terminated
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
 
-    Put request token into queue
-    Get task from task_queue
-    Pop request from queue
-    Put result into result_queue
-    """
     start_file_logger('{}/block-{}/{}/worker_{}.log'.format(args.logdir, args.block_id, pool_id, worker_id),
                       worker_id,
                       name="worker_log",
@@ -492,19 +769,62 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
     os.environ['PARSL_WORKER_COUNT'] = str(pool_size)
     os.environ['PARSL_WORKER_POOL_ID'] = str(pool_id)
 
+    if object_store_addresses:
+        object_store.start_worker_store(pool_id, *object_store_addresses)
+    if broadcast_dir:
+        broadcast_store.start_worker_store(broadcast_dir)
+
     # Sync worker with master
     logger.info('Worker {} started'.format(worker_id))
     if args.debug:
         logger.debug("Debug logging enabled")
 
+
+def run_task(req, functions):
+    """Run a task received by a worker, using and filling its cache of registered
+    functions, and return the frames of its result or exception."""
+    tid = req['task_id']
+    try:
+        function = None
+        if 'function_id' in req:
+            function = functions.get(req['function_id'])
+            if function is None:
+                function = load_function(req['function'])
+                functions.put(req['function_id'], function)
+        result = execute_task(req['buffer'], function)
+        serialized_result = serialize_object(result, buffer_threshold=1e6)
+    except Exception as e:
+        logger.info('Caught an exception: {}'.format(e))
+        result_package = messages.pack_exception(tid, serialize_object(RemoteExceptionWrapper(*sys.exc_info())))
+    else:
+        result_package = messages.pack_result(tid, serialized_result)
+        # logger.debug("Result: {}".format(result))
+
+    logger.info("Completed task {}".format(tid))
+    return result_package
+
+
+def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue, tasks_in_progress,
+           object_store_addresses=None, broadcast_dir=None):
+    """
+
+    Put request token into queue
+    Get task from task_queue
+    Pop request from queue
+    Put result into result_queue
+    """
+    _start_worker_process(worker_id, pool_id, pool_size, object_store_addresses, broadcast_dir)
+
+    # Registered functions which this worker has deserialized
+    functions = LRUCache()
+
     while True:
         worker_queue.put(worker_id)
 
         # The worker will receive {'task_id':<tid>, 'buffer':<buf>}
         req = task_queue.get()
         tasks_in_progress[worker_id] = req
-        tid = req['task_id']
-        logger.info("Received task {}".format(tid))
+        logger.info("Received task {}".format(req['task_id']))
 
         try:
             worker_queue.get()
@@ -512,21 +832,25 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
             logger.warning("Worker ID: {} failed to remove itself from ready_worker_queue".format(worker_id))
             pass
 
-        try:
-            result = execute_task(req['buffer'])
-            serialized_result = serialize_object(result, buffer_threshold=1e6)
-        except Exception as e:
-            logger.info('Caught an exception: {}'.format(e))
-            result_package = {'task_id': tid, 'exception': serialize_object(RemoteExceptionWrapper(*sys.exc_info()))}
-        else:
-            result_package = {'task_id': tid, 'result': serialized_result}
-            # logger.debug("Result: {}".format(result))
+        result_queue.put(run_task(req, functions))
+        tasks_in_progress.pop(worker_id)
 
-        logger.info("Completed task {}".format(tid))
-        pkl_package = pickle.dumps(result_package)
 
-        result_queue.put(pkl_package)
-        tasks_in_progress.pop(worker_id)
+def shared_memory_worker(worker_id, pool_id, pool_size, channel, object_store_addresses=None, broadcast_dir=None):
+    """Worker of the shared memory transport.
+
+    Get task from the channel, reading its buffers in place
+    Put result into the channel, releasing the task
+    """
+    _start_worker_process(worker_id, pool_id, pool_size, object_store_addresses, broadcast_dir)
+
+    # Registered functions which this worker has deserialized
+    functions = LRUCache()
+
+    while True:
+        req = channel.get_task()
+        logger.info("Received task {}".format(req['task_id']))
+        channel.put_result(run_task(req, functions))
 
 
 def start_file_logger(filename, rank, name='parsl', level=logging.DEBUG, format_string=None):
@@ -587,6 +911,17 @@ if __name__ == "__main__":
                         help="Poll period used in milliseconds")
     parser.add_argument("-r", "--result_port", required=True,
                         help="REQUIRED: Result port for posting results to the interchange")
+    parser.add_argument("--object_store", action='store_true',
+                        help="Keep the results of apps decorated with by_reference in an object store on this node")
+    parser.add_argument("--object_store_address", default=None,
+                        help="Address of the interface on which other nodes reach the object store. "
+                        "Default: the interface through which the interchange is reached")
+    parser.add_argument("--object_store_max_bytes", default=None,
+                        help="Most bytes of objects held by the object store. "
+                        "Default: a quarter of the memory available on the node")
+    parser.add_argument("--shared_memory_size", default=0,
+                        help="Bytes of the shared memory ring buffers between the manager and each worker. "
+                        "Default: 0, use queues")
 
     args = parser.parse_args()
 
@@ -611,6 +946,8 @@ if __name__ == "__main__":
         logger.info("poll_period: {}".format(args.poll))
         logger.info("address_probe_timeout: {}".format(args.address_probe_timeout))
         logger.info("Prefetch capacity: {}".format(args.prefetch_capacity))
+        logger.info("Object store: {}".format(args.object_store))
+        logger.info("Shared memory size: {}".format(args.shared_memory_size))
 
         manager = Manager(task_port=args.task_port,
                           result_port=args.result_port,
@@ -624,7 +961,11 @@ if __name__ == "__main__":
                           prefetch_capacity=int(args.prefetch_capacity),
                           heartbeat_threshold=int(args.hb_threshold),
                           heartbeat_period=int(args.hb_period),
-                          poll_period=int(args.poll))
+                          poll_period=int(args.poll),
+                          enable_object_store=args.object_store,
+                          object_store_address=args.object_store_address,
+                          object_store_max_bytes=None if args.object_store_max_bytes is None else int(args.object_store_max_bytes),
+                          shared_memory_size=int(args.shared_memory_size))
         manager.start()
 
     except Exception as e:
@@ -0,0 +1,223 @@
+"""Shared-memory transport of tasks and results between an HTEX manager and its workers.
+
+By default the workers of a manager take tasks from, and put results on,
+multiprocessing queues, which pickle every message through a pipe. With the
+shared memory transport, each worker is instead connected to its manager by
+a :class:`WorkerChannel`: a ring buffer in shared memory for tasks and
+another for results, and a pipe each way to signal that a message has been
+written. Messages are lists of buffers, which are copied into the ring by
+the sender, and read in place by the receiver::
+
+    record size, count, length of each buffer, buffers
+
+where the sizes are 8 byte little-endian integers, and each record and each
+buffer starts at a multiple of ALIGNMENT bytes, so that NumPy arrays can be
+used where they lie. A record of size 0 marks the rest of the ring as unused,
+so that every record is contiguous.
+
+Each ring has a single writer and a single reader. The writer keeps count of
+the bytes it has written, and the reader of the bytes it has read, and the
+reader publishes the count of bytes it has finished with in the header of the
+ring, so that the writer knows how much space is free. A message for which
+there is no space, such as one larger than the ring, is pickled and sent
+through the signalling pipe in its place.
+"""
+import multiprocessing
+import pickle
+import struct
+
+from parsl.errors import OptionalModuleMissing
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
+
+# Records and buffers are aligned for the widest vector loads
+ALIGNMENT = 64
+
+# Bytes before the records of a ring, holding the count of bytes released by the reader
+HEADER_SIZE = ALIGNMENT
+
+_U64 = struct.Struct("<Q")
+
+
+def _align(n):
+    return -(-n // ALIGNMENT) * ALIGNMENT
+
+
+class RingBuffer(object):
+    """A queue of messages in shared memory, with a single writer and a single reader.
+
+    The reader must only read a message after the writer has signalled it.
+    """
+
+    def __init__(self, size):
+        """
+        Args:
+            - size (int) : Bytes of shared memory to hold messages
+        """
+        if shared_memory is None:
+            raise OptionalModuleMissing(['multiprocessing.shared_memory'],
+                                        "The shared memory transport requires Python 3.8 or later")
+        self.size = _align(size)
+        self._shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + self.size)
+        # bytes written by the writer, and read by the reader
+        self._written = 0
+        self._read = 0
+
+    def put(self, buffers):
+        """Write a message, if there is space for it.
+
+        Returns:
+            - Whether the message was written
+        """
+        views = [memoryview(buf).cast('B') for buf in buffers]
+        offset = _align(_U64.size * (len(views) + 2))
+        offsets = []
+        for view in views:
+            offsets.append(offset)
+            offset = _align(offset + view.nbytes)
+        record_size = offset
+
+        position = self._written % self.size
+        skip = self.size - position if position + record_size > self.size else 0
+        released, = _U64.unpack_from(self._shm.buf, 0)
+        if skip + record_size > self.size - (self._written - released):
+            return False
+
+        buf = self._shm.buf
+        if skip:
+            _U64.pack_into(buf, HEADER_SIZE + position, 0)
+            self._written += skip
+            position = 0
+        start = HEADER_SIZE + position
+        struct.pack_into("<{}Q".format(len(views) + 2), buf, start,
+                         record_size, len(views), *[view.nbytes for view in views])
+        for view, offset in zip(views, offsets):
+            buf[start + offset:start + offset + view.nbytes] = view
+        self._written += record_size
+        return True
+
+    def get(self):
+        """Read the next message, as memoryviews of the ring which are valid until
+        the message is released."""
+        buf = self._shm.buf
+        position = self._read % self.size
+        record_size, = _U64.unpack_from(buf, HEADER_SIZE + position)
+        if record_size == 0:
+            self._read += self.size - position
+            position = 0
+            record_size, = _U64.unpack_from(buf, HEADER_SIZE)
+        start = HEADER_SIZE + position
+        count, = _U64.unpack_from(buf, start + _U64.size)
+        lengths = struct.unpack_from("<{}Q".format(count), buf, start + 2 * _U64.size)
+        offset = _align(_U64.size * (count + 2))
+        views = []
+        for length in lengths:
+            views.append(buf[start + offset:start + offset + length])
+            offset = _align(offset + length)
+        self._read += record_size
+        return views
+
+    def release(self):
+        """Free the space of the messages which have been read."""
+        _U64.pack_into(self._shm.buf, 0, self._read)
+
+    def close(self, unlink=False):
+        """Detach from the shared memory, and free it if unlink is set."""
+        try:
+            self._shm.close()
+        except BufferError:
+            # views of the ring are still held; the memory is freed when they are
+            pass
+        if unlink:
+            self._shm.unlink()
+
+
+class WorkerChannel(object):
+    """The connection of a manager to one of its workers.
+
+    The manager puts tasks and gets results, and the worker gets tasks and
+    puts results. A worker holds the memory of its current task until it puts
+    its result, so the manager must not put a task for a worker until it has
+    the result of the task before.
+    """
+
+    def __init__(self, size):
+        """
+        Args:
+            - size (int) : Bytes of shared memory for each direction
+        """
+        self.tasks = RingBuffer(size)
+        self.results = RingBuffer(size)
+        self.task_reader, self.task_writer = multiprocessing.Pipe(duplex=False)
+        self.result_reader, self.result_writer = multiprocessing.Pipe(duplex=False)
+        self._closed = False
+
+    @staticmethod
+    def _send(ring, connection, buffers):
+        if ring.put(buffers):
+            connection.send_bytes(b'')
+        else:
+            connection.send_bytes(pickle.dumps([bytes(memoryview(buf)) for buf in buffers], pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _receive(ring, connection):
+        message = connection.recv_bytes()
+        if message:
+            return pickle.loads(message)
+        return ring.get()
+
+    def put_task(self, task):
+        """Send a task to the worker."""
+        function = task.get('function', [])
+        meta = {'task_id': task['task_id'], 'function_id': task.get('function_id'), 'function_count': len(function)}
+        self._send(self.tasks, self.task_writer, [pickle.dumps(meta)] + list(function) + list(task['buffer']))
+
+    def get_task(self):
+        """Receive a task in the worker, whose buffers are valid until its result is put."""
+        buffers = self._receive(self.tasks, self.task_reader)
+        meta = pickle.loads(buffers[0])
+        function_count = meta.pop('function_count')
+        task = {'task_id': meta['task_id'], 'buffer': buffers[1 + function_count:]}
+        if meta['function_id'] is not None:
+            task['function_id'] = meta['function_id']
+            task['function'] = buffers[1:1 + function_count]
+        return task
+
+    def put_result(self, frames):
+        """Send the result of the current task to the manager, releasing the task."""
+        if self.results.put(frames):
+            signal = b''
+        else:
+            signal = pickle.dumps([bytes(memoryview(frame)) for frame in frames], pickle.HIGHEST_PROTOCOL)
+        # the result has been copied out of the task, so its space can be reused
+        self.tasks.release()
+        self.result_writer.send_bytes(signal)
+
+    def get_result(self):
+        """Receive a result in the manager."""
+        frames = [bytes(frame) for frame in self._receive(self.results, self.result_reader)]
+        self.results.release()
+        return frames
+
+    def close_worker_ends(self):
+        """Close the manager's copies of the pipe ends used by the worker, once it has started."""
+        self.task_reader.close()
+        self.result_writer.close()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """Close the manager's end of the channel, freeing its shared memory."""
+        if self._closed:
+            return
+        self._closed = True
+        self.task_writer.close()
+        self.result_reader.close()
+        self.tasks.close(unlink=True)
+        self.results.close(unlink=True)
@@ -80,8 +80,14 @@ class CommandClient(object):
 
 class TasksOutgoing(object):
     """ Outgoing task queue from the executor to the Interchange
+
+    Tasks are coalesced into batches, in the manner of Nagle's algorithm, so that
+    many tasks move to the interchange in one multipart message. A task put while
+    the queue has been idle for batch_period is sent at once. Otherwise it waits
+    to be sent with those put after it, until batch_size tasks or batch_bytes
+    bytes are waiting, or batch_period has passed.
     """
-    def __init__(self, ip_address, port_range):
+    def __init__(self, ip_address, port_range, batch_size=1, batch_bytes=1024 * 1024, batch_period=0.5):
         """
         Parameters
         ----------
@@ -90,6 +96,12 @@ class TasksOutgoing(object):
            IP address of the client (where Parsl runs)
         port_range: tuple(int, int)
            Port range for the comms between client and interchange
+        batch_size: int
+           Number of tasks at which a batch is sent. 1 sends every task at once
+        batch_bytes: int
+           Size in bytes of the task buffers at which a batch is sent
+        batch_period: float
+           Milliseconds for which a batch is held for more tasks
 
         """
         self.context = zmq.Context()
@@ -101,27 +113,83 @@ class TasksOutgoing(object):
         self.poller = zmq.Poller()
         self.poller.register(self.zmq_socket, zmq.POLLOUT)
 
-    def put(self, message):
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.batch_period = batch_period / 1000
+        self._lock = threading.Lock()
+        self._batch = []
+        self._batch_count = 0
+        self._batch_size_bytes = 0
+        self._last_send = 0
+        self.batches_sent = 0
+        self.tasks_sent = 0
+
+        self._batch_waiting = threading.Event()
+        self._closed = False
+        if self.batch_size > 1:
+            self._flush_thread = threading.Thread(target=self._flush_periodically, name="HTEX-Task-Batcher")
+            self._flush_thread.daemon = True
+            self._flush_thread.start()
+
+    def put(self, frames):
+        """ Queues the frames of a task, as made by messages.pack_task, to be sent
+        to the interchange, and sends the batch of waiting tasks if it is due.
+        """
+        with self._lock:
+            self._batch.extend(frames)
+            self._batch_count += 1
+            self._batch_size_bytes += sum(memoryview(f).nbytes for f in frames)
+            if (self._batch_count >= self.batch_size or
+                    self._batch_size_bytes >= self.batch_bytes or
+                    time.time() - self._last_send >= self.batch_period):
+                self._send_batch()
+            else:
+                self._batch_waiting.set()
+
+    def flush(self):
+        """ Sends the batch of waiting tasks now.
+        """
+        with self._lock:
+            if self._batch:
+                self._send_batch()
+
+    def _flush_periodically(self):
+        while not self._closed:
+            if self._batch_waiting.wait(timeout=1):
+                time.sleep(self.batch_period)
+                self.flush()
+
+    def _send_batch(self):
         """ This function needs to be fast at the same time aware of the possibility of
-        ZMQ pipes overflowing.
+        ZMQ pipes overflowing. It must be called holding the lock.
 
         The timeout increases slowly if contention is detected on ZMQ pipes.
-        We could set copy=False and get slightly better latency but this results
-        in ZMQ sockets reaching a broken state once there are ~10k tasks in flight.
-        This issue can be magnified if each the serialized buffer itself is larger.
+        The frames of the batch are sent without pickling them. They are sent with
+        copy=False, which pyzmq only honours for frames larger than zmq.COPY_THRESHOLD:
+        small frames are still copied, which avoids the broken ZMQ sockets seen with
+        ~10k uncopied messages in flight, while large serialized buffers are not copied.
         """
         timeout_ms = 0
         while True:
             socks = dict(self.poller.poll(timeout=timeout_ms))
             if self.zmq_socket in socks and socks[self.zmq_socket] == zmq.POLLOUT:
-                # The copy option adds latency but reduces the risk of ZMQ overflow
-                self.zmq_socket.send_pyobj(message, copy=True)
-                return
+                self.zmq_socket.send_multipart(self._batch, copy=False)
+                break
             else:
                 timeout_ms += 1
                 logger.debug("Not sending due to full zmq pipe, timeout: {} ms".format(timeout_ms))
 
+        self.batches_sent += 1
+        self.tasks_sent += self._batch_count
+        self._batch = []
+        self._batch_count = 0
+        self._batch_size_bytes = 0
+        self._last_send = time.time()
+        self._batch_waiting.clear()
+
     def close(self):
+        self.flush()
+        self._closed = True
         self.zmq_socket.close()
         self.context.term()
 
@@ -149,6 +217,9 @@ class ResultsIncoming(object):
                                                               max_port=port_range[1])
 
     def get(self, block=True, timeout=None):
+        """ Receives the frames of the next batch of results, to be split with
+        messages.split
+        """
         return self.results_receiver.recv_multipart()
 
     def request_close(self):
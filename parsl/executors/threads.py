@@ -1,5 +1,8 @@
+import heapq
+import itertools
 import logging
 import sys
+import threading
 import typeguard
 import concurrent.futures as cf
 
@@ -44,6 +47,14 @@ class ThreadPoolExecutor(NoStatusHandlingExecutor, RepresentationMixin):
         self.working_dir = working_dir
         self.managed = managed
 
+        # heap of [-priority, sequence, future, func, args, kwargs] entries,
+        # and the entry of each queued future. A reprioritized entry is
+        # replaced by a new one, and its future set to None.
+        self._prioritized = []
+        self._prioritized_entries = {}
+        self._prioritized_lock = threading.Lock()
+        self._prioritized_sequence = itertools.count()
+
     def start(self):
         if sys.version_info > (3, 6):
             self.executor = cf.ThreadPoolExecutor(max_workers=self.max_threads,
@@ -64,6 +75,51 @@ class ThreadPoolExecutor(NoStatusHandlingExecutor, RepresentationMixin):
         """
         return self.executor.submit(*args, **kwargs)
 
+    def submit_with_priority(self, priority, func, *args, **kwargs):
+        """Submits work to the thread pool, to run before any queued work which
+        was submitted with a lower priority.
+
+        Each call queues the task on a heap, and submits a runner to the pool
+        which runs the highest priority task on the heap when a thread is free.
+        """
+        fu = cf.Future()
+        entry = [-priority, next(self._prioritized_sequence), fu, func, args, kwargs]
+        with self._prioritized_lock:
+            heapq.heappush(self._prioritized, entry)
+            self._prioritized_entries[fu] = entry
+        self.executor.submit(self._run_prioritized)
+        return fu
+
+    def reprioritize(self, future, priority):
+        """Changes the priority of a task submitted with submit_with_priority,
+        if it is still queued."""
+        with self._prioritized_lock:
+            entry = self._prioritized_entries.get(future)
+            if entry is None or entry[0] == -priority:
+                return
+            new_entry = [-priority, entry[1], future, entry[3], entry[4], entry[5]]
+            entry[2:] = [None, None, None, None]
+            heapq.heappush(self._prioritized, new_entry)
+            self._prioritized_entries[future] = new_entry
+
+    def _run_prioritized(self):
+        # There is one runner for each queued future, so there is always a
+        # live entry to be found.
+        with self._prioritized_lock:
+            while True:
+                _, _, fu, func, args, kwargs = heapq.heappop(self._prioritized)
+                if fu is not None:
+                    break
+            del self._prioritized_entries[fu]
+        if not fu.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            fu.set_exception(e)
+        else:
+            fu.set_result(result)
+
     def scale_out(self, workers=1):
         """Scales out the number of active workers by 1.
 
@@ -0,0 +1,63 @@
+"""Compare makespans with and without critical path scheduling.
+
+A long chain of dependent tasks is submitted after a wide layer of
+independent tasks, on a pool with fewer threads than there are tasks. In
+submission order, the chain only starts once the wide layer has drained;
+with critical path scheduling, each link of the chain runs as soon as it
+is ready, alongside the wide layer.
+"""
+import argparse
+import time
+
+import parsl
+from parsl.app.app import python_app
+from parsl.config import Config
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+@python_app
+def step(dur, *deps):
+    import time
+    time.sleep(dur)
+    return 0
+
+
+def run(critical_path_scheduling, width, depth, dur, threads):
+    config = Config(executors=[ThreadPoolExecutor(max_threads=threads)],
+                    critical_path_scheduling=critical_path_scheduling)
+    parsl.load(config)
+    try:
+        start = time.time()
+        wide = [step(dur) for i in range(width)]
+        chain = [step(dur)]
+        for i in range(depth - 1):
+            chain.append(step(dur, chain[-1]))
+        for fu in wide + chain:
+            fu.result()
+        return time.time() - start
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-w", "--width", default=200, type=int,
+                        help="Number of independent apps")
+    parser.add_argument("-c", "--count", default=20, type=int,
+                        help="Length of the chain of dependent apps")
+    parser.add_argument("-t", "--time", default=0.05, type=float,
+                        help="Duration of each app, in seconds")
+    parser.add_argument("-n", "--threads", default=4, type=int,
+                        help="Number of threads")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    for critical_path_scheduling in [False, True]:
+        makespan = run(critical_path_scheduling, args.width, args.count, args.time, args.threads)
+        print("critical_path_scheduling={}: makespan {:.2f}s".format(critical_path_scheduling, makespan))
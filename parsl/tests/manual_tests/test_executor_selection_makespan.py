@@ -0,0 +1,62 @@
+"""Compare the makespan of executor selection policies.
+
+Tasks which may run on either of two executors of different sizes are
+submitted all at once with map, and through a bounded window with
+imap_unordered, under each executor_selection policy.
+"""
+import argparse
+import time
+
+import parsl
+from parsl.app.app import python_app
+from parsl.config import Config
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+@python_app(executors=['big', 'small'])
+def sleeper(dur):
+    import time
+    time.sleep(dur)
+
+
+def run(selection, count, dur, window):
+    config = Config(executors=[ThreadPoolExecutor(label='big', max_threads=4),
+                               ThreadPoolExecutor(label='small', max_threads=1)],
+                    executor_selection=selection)
+    parsl.load(config)
+    try:
+        start = time.time()
+        for fu in sleeper.map([dur] * count):
+            fu.result()
+        bulk = time.time() - start
+
+        start = time.time()
+        for result in sleeper.imap_unordered([dur] * count, max_inflight=window):
+            pass
+        windowed = time.time() - start
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+    return bulk, windowed
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default=400, type=int,
+                        help="Count of apps to launch")
+    parser.add_argument("-t", "--time", default=0.01, type=float,
+                        help="Duration of each app, in seconds")
+    parser.add_argument("-w", "--window", default=10, type=int,
+                        help="Maximum number of apps in flight for windowed submission")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    print("{:<20} {:>10} {:>10}".format("policy", "map (s)", "window (s)"))
+    for selection in ['random', 'least_outstanding', 'worker_weighted']:
+        bulk, windowed = run(selection, args.count, args.time, args.window)
+        print("{:<20} {:>10.2f} {:>10.2f}".format(selection, bulk, windowed))
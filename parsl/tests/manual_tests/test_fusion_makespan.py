@@ -0,0 +1,68 @@
+"""Compare makespans with and without task fusion.
+
+Many chains of short dependent tasks are submitted behind a gate task, so
+that each chain is waiting when its head becomes ready to run. With task
+fusion, each chain is sent through the interchange to a worker as a single
+task, rather than making a round trip for every task of the chain.
+"""
+import argparse
+import time
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.htex_local import fresh_config
+
+
+@python_app
+def gate(dur):
+    import time
+    time.sleep(dur)
+    return 0
+
+
+@python_app
+def step(x):
+    return x + 1
+
+
+def run(task_fusion, chains, depth):
+    config = fresh_config()
+    config.task_fusion = task_fusion
+    parsl.load(config)
+    try:
+        # wait for the workers to connect
+        gate(0).result()
+
+        start = time.time()
+        first = gate(1)
+        ends = []
+        for i in range(chains):
+            fu = step(first)
+            for j in range(depth - 1):
+                fu = step(fu)
+            ends.append(fu)
+        for fu in ends:
+            fu.result()
+        return time.time() - start
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default=100, type=int,
+                        help="Number of chains of apps")
+    parser.add_argument("-l", "--length", default=10, type=int,
+                        help="Length of each chain of apps")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    for task_fusion in [False, True]:
+        makespan = run(task_fusion, args.count, args.length)
+        print("task_fusion={}: makespan {:.2f}s".format(task_fusion, makespan))
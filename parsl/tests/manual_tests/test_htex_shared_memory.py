@@ -0,0 +1,55 @@
+"""Measure the time taken by tasks with large NumPy arguments on a
+HighThroughputExecutor, with tasks and results passing between each manager
+and its workers through queues, and through shared memory.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.htex_local import fresh_config
+
+
+@python_app
+def total(array):
+    return array.sum()
+
+
+def run(shared_memory, count, size):
+    config = fresh_config()
+    config.executors[0].shared_memory_transport = shared_memory
+    parsl.load(config)
+    try:
+        array = np.ones(size // 8)
+        # wait for the workers to connect
+        total(array).result()
+
+        start = time.time()
+        futures = [total(array) for i in range(count)]
+        for fu in futures:
+            fu.result()
+        return time.time() - start
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default=400, type=int,
+                        help="Count of apps to launch")
+    parser.add_argument("-s", "--size", default=4 * 1024 * 1024, type=int,
+                        help="Size in bytes of the array passed to each app")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    for shared_memory in [False, True]:
+        elapsed = run(shared_memory, args.count, args.size)
+        print("shared_memory_transport={}: {} tasks in {:.2f}s".format(shared_memory, args.count, elapsed))
@@ -0,0 +1,57 @@
+"""Measure the throughput of no-op tasks on a HighThroughputExecutor, with and
+without coalescing tasks into batches on their way to the interchange.
+
+For each batch size, reports the rate at which tasks are submitted and the
+rate at which they complete.
+"""
+import argparse
+import time
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.htex_local import fresh_config
+
+
+@python_app
+def noop():
+    pass
+
+
+def run(batch_size, count):
+    config = fresh_config()
+    config.executors[0].submit_batch_size = batch_size
+    parsl.load(config)
+    try:
+        # wait for the workers to connect
+        noop().result()
+
+        start = time.time()
+        futures = [noop() for i in range(count)]
+        submitted = time.time()
+        for fu in futures:
+            fu.result()
+        completed = time.time()
+        return count / (submitted - start), count / (completed - start)
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default=20000, type=int,
+                        help="Count of apps to launch")
+    parser.add_argument("-b", "--batch_sizes", default="1,1024",
+                        help="Comma separated batch sizes to compare")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        submit_rate, complete_rate = run(batch_size, args.count)
+        print("submit_batch_size={}: submitted {:.0f} tasks/s, completed {:.0f} tasks/s".format(
+            batch_size, submit_rate, complete_rate))
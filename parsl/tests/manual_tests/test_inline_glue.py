@@ -0,0 +1,58 @@
+"""Compare the time taken by cheap glue apps with and without inline execution.
+
+Each round runs a batch of tasks on a HighThroughputExecutor and sums their
+results with a glue app. Run inline, the glue task skips the serialization
+and round trip through the interchange.
+"""
+import argparse
+import time
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.htex_local import fresh_config
+
+
+@python_app
+def work(x):
+    return x
+
+
+def run(inline, rounds, width):
+
+    @python_app(inline=inline)
+    def total(inputs=[]):
+        return sum(inputs)
+
+    parsl.load(fresh_config())
+    try:
+        # wait for the workers to connect
+        work(0).result()
+
+        start = time.time()
+        result = 0
+        for i in range(rounds):
+            result = total(inputs=[work(result)] + [work(j) for j in range(width - 1)])
+        result.result()
+        return time.time() - start
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", "--rounds", default=100, type=int,
+                        help="Number of rounds of apps")
+    parser.add_argument("-w", "--width", default=4, type=int,
+                        help="Number of apps summed in each round")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    for inline in [False, True]:
+        elapsed = run(inline, args.rounds, args.width)
+        print("inline={}: {:.2f}s".format(inline, elapsed))
@@ -0,0 +1,70 @@
+"""Measure the memory held by the intermediate results of a long pipeline.
+
+Each stage of the pipeline consumes the result of the stage before and
+produces a new result of the given size, and only the future of the last
+stage is kept. The DFK releases each intermediate result once the stage
+which consumes it has been dispatched, so peak memory should stay at a few
+times the size of one result, rather than growing with the number of stages.
+"""
+import argparse
+import threading
+import time
+import tracemalloc
+
+import parsl
+from parsl.app.app import python_app
+from parsl.config import Config
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+@python_app
+def gate(event, size):
+    event.wait()
+    return bytearray(size)
+
+
+@python_app
+def stage(x, size):
+    return bytearray(size)
+
+
+def run(stages, size, retries):
+    config = Config(executors=[ThreadPoolExecutor(max_threads=4)], retries=retries)
+    parsl.load(config)
+    try:
+        tracemalloc.start()
+        release = threading.Event()
+        fu = gate(release, size)
+        for i in range(stages - 1):
+            fu = stage(fu, size)
+        start = time.time()
+        release.set()
+        fu.result()
+        elapsed = time.time() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak, elapsed
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default=1000, type=int,
+                        help="Number of stages of the pipeline")
+    parser.add_argument("-s", "--size", default=1000000, type=int,
+                        help="Size of each intermediate result, in bytes")
+    parser.add_argument("-r", "--retries", default=0, type=int,
+                        help="Number of retries")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    peak, elapsed = run(args.count, args.size, args.retries)
+    print("{} stages of {} bytes: peak traced memory {:.1f} MB ({:.1f} results), {:.2f}s".format(
+        args.count, args.size, peak / 1e6, peak / args.size, elapsed))
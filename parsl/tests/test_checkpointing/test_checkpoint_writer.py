@@ -0,0 +1,140 @@
+import argparse
+import threading
+import pytest
+import parsl
+from parsl import python_app
+
+from parsl.dataflow.checkpoints import CheckpointIndex, CheckpointWriter
+from parsl.tests.configs.local_threads_checkpoint import fresh_config
+
+
+@python_app(cache=True)
+def double(x):
+    return x * 2
+
+
+def test_writer_batches_by_size():
+    """A batch is committed as soon as it is full, and close commits
+    whatever remains queued.
+    """
+    batches = []
+    committed = threading.Event()
+
+    def commit(task_ids):
+        batches.append(task_ids)
+        committed.set()
+
+    writer = CheckpointWriter(commit, batch_size=3, batch_period=60)
+    for i in range(3):
+        writer.submit(i)
+    assert committed.wait(5), "Full batch should be committed without waiting for the batch period"
+
+    writer.submit(3)
+    writer.close()
+
+    assert batches == [[0, 1, 2], [3]]
+    stats = writer.stats()
+    assert stats['commits'] == 2
+    assert stats['tasks_committed'] == 4
+
+
+def test_writer_batches_by_period():
+    """A partial batch is committed once the batch period has passed.
+    """
+    committed = threading.Event()
+    writer = CheckpointWriter(lambda task_ids: committed.set(), batch_size=1000, batch_period=0.05)
+    writer.submit(0)
+    assert committed.wait(5), "Partial batch should be committed after the batch period"
+    writer.close()
+
+    assert writer.stats()['max_task_latency'] >= 0.05
+
+
+def test_writer_survives_failed_commit():
+    """A failing commit is logged, and later batches are still committed.
+    """
+    batches = []
+
+    def commit(task_ids):
+        if not batches:
+            batches.append(None)
+            raise IOError("disk full")
+        batches.append(task_ids)
+
+    writer = CheckpointWriter(commit, batch_size=1, batch_period=60)
+    writer.submit(0)
+    writer.submit(1)
+    writer.close()
+
+    assert batches == [None, [1]]
+    assert writer.stats()['commits'] == 1
+
+
+@pytest.mark.local
+@pytest.mark.parametrize("checkpoint_format", ['pickle', 'sqlite'])
+def test_task_exit_batched(checkpoint_format, n=20):
+    """With task_exit checkpointing, every completed task is in the
+    checkpoint after cleanup.
+    """
+    config = fresh_config()
+    config.checkpoint_mode = 'task_exit'
+    config.checkpoint_format = checkpoint_format
+    config.checkpoint_batch_period = 0.1
+    config.checkpoint_fsync = True
+    dfk = parsl.load(config)
+    assert dfk.checkpoint_writer is not None
+
+    results = [f.result() for f in [double(i) for i in range(n)]]
+    rundir = dfk.run_dir
+    dfk.cleanup()
+    parsl.clear()
+
+    assert dfk.checkpoint_writer.stats()['tasks_committed'] == n
+
+    index = CheckpointIndex(['{}/checkpoint'.format(rundir)])
+    assert len(index) == n
+    index.close()
+
+    config = fresh_config()
+    config.checkpoint_files = ['{}/checkpoint'.format(rundir)]
+    parsl.load(config)
+    relaunched = [f.result() for f in [double(i) for i in range(n)]]
+    assert relaunched == results
+    assert parsl.dfk().memoizer.memo_lookup_table.stats()['misses'] == 0
+
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_task_exit_synchronous(n=5):
+    """By default, task_exit checkpointing checkpoints each task as it completes.
+    """
+    config = fresh_config()
+    config.checkpoint_mode = 'task_exit'
+    dfk = parsl.load(config)
+    assert dfk.checkpoint_writer is None
+
+    for f in [double(i) for i in range(n)]:
+        f.result()
+    rundir = dfk.run_dir
+    dfk.cleanup()
+    parsl.clear()
+
+    index = CheckpointIndex(['{}/checkpoint'.format(rundir)])
+    assert len(index) == n
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default=10, type=int,
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_writer_batches_by_size()
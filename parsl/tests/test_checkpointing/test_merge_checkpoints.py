@@ -0,0 +1,115 @@
+import argparse
+import os
+import shutil
+import pytest
+import parsl
+
+from parsl.dataflow import checkpoints
+from parsl.dataflow.checkpoints import (CheckpointIndex, PickleCheckpointStore, SqliteCheckpointStore,
+                                        merge_checkpoints)
+from parsl.dataflow.error import BadCheckpoint
+from parsl.utils import compact_checkpoints
+
+
+def record(hashsum, result):
+    return {'hash': hashsum, 'exception': None, 'result': result}
+
+
+def test_merge_checkpoints(tmpdir):
+    """The merged checkpoint holds the latest record for each hash.
+    """
+    first = str(tmpdir.mkdir('first'))
+    second = str(tmpdir.mkdir('second'))
+    merged = os.path.join(str(tmpdir), 'merged')
+
+    PickleCheckpointStore(first).write([record('a', 1), record('b', 1), record('a', 2)])
+    store = SqliteCheckpointStore(second)
+    store.write([record('b', 3), record('c', 3)])
+    store.close()
+
+    stats = merge_checkpoints([first, second], merged, batch_size=2)
+    assert stats == {'checkpoints': 2, 'skipped': 0, 'records_read': 5, 'records_written': 3}
+    assert os.listdir(merged) == ['tasks.db']
+
+    index = CheckpointIndex([merged])
+    assert len(index) == 3
+    assert index.get('a').result() == 2
+    assert index.get('b').result() == 3
+    assert index.get('c').result() == 3
+    index.close()
+
+    # checkpoints are only merged again once they change
+    stats = merge_checkpoints([first, second], merged)
+    assert stats == {'checkpoints': 0, 'skipped': 2, 'records_read': 0, 'records_written': 3}
+    PickleCheckpointStore(first).write([record('d', 4)])
+    stats = merge_checkpoints([first, second], merged)
+    assert stats == {'checkpoints': 1, 'skipped': 1, 'records_read': 4, 'records_written': 4}
+
+
+def test_merge_checkpoints_errors(tmpdir):
+    """Merging a missing checkpoint, or into a 'pickle' checkpoint, fails
+    without leaving a merged checkpoint behind.
+    """
+    first = str(tmpdir.mkdir('first'))
+    merged = os.path.join(str(tmpdir), 'merged')
+    PickleCheckpointStore(first).write([record('a', 1)])
+
+    with pytest.raises(BadCheckpoint):
+        merge_checkpoints([first, os.path.join(str(tmpdir), 'missing')], merged)
+    assert os.listdir(merged) == []
+
+    with pytest.raises(ValueError):
+        merge_checkpoints([first], first)
+
+
+def test_compact_checkpoints(tmpdir, monkeypatch):
+    """compact_checkpoints merges every checkpoint in the run directory.
+    """
+    rundir = str(tmpdir.mkdir('runinfo'))
+    for run_id, result in [('000', 1), ('001', 2)]:
+        checkpoint_dir = os.path.join(rundir, run_id, 'checkpoint')
+        os.makedirs(checkpoint_dir)
+        PickleCheckpointStore(checkpoint_dir).write([record('a', result)])
+
+    merged = os.path.join(str(tmpdir), 'merged')
+    assert compact_checkpoints(merged, rundir=rundir) == [merged]
+
+    index = CheckpointIndex([merged])
+    assert index.get('a').result() == 2
+    index.close()
+
+    # a later call merges only the new runs into the existing merged checkpoint
+    shutil.rmtree(os.path.join(rundir, '000'))
+    checkpoint_dir = os.path.join(rundir, '002', 'checkpoint')
+    os.makedirs(checkpoint_dir)
+    PickleCheckpointStore(checkpoint_dir).write([record('b', 3)])
+    merged_runs = SqliteCheckpointStore(merged)
+    assert sorted(merged_runs.merged()) == [os.path.join(rundir, run_id, 'checkpoint') for run_id in ['000', '001']]
+    merged_runs.close()
+    read = []
+    read_checkpoint = checkpoints._read_checkpoint
+    monkeypatch.setattr(checkpoints, '_read_checkpoint', lambda store: read.append(store.path) or read_checkpoint(store))
+    assert compact_checkpoints(merged, rundir=rundir) == [merged]
+    assert read == [os.path.join(checkpoint_dir, 'tasks.pkl')]
+    assert os.listdir(merged) == ['tasks.db']
+
+    index = CheckpointIndex([merged])
+    assert len(index) == 2
+    assert index.get('a').result() == 2
+    assert index.get('b').result() == 3
+    index.close()
+
+    empty = os.path.join(str(tmpdir), 'empty')
+    assert compact_checkpoints(merged, rundir=empty) == [merged]
+    assert compact_checkpoints(os.path.join(str(tmpdir), 'none'), rundir=empty) == []
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import pytest
+import parsl
+from parsl import python_app
+
+from parsl.dataflow.checkpoints import CheckpointIndex, PickleCheckpointStore, SqliteCheckpointStore
+from parsl.tests.configs.local_threads_checkpoint import fresh_config
+
+
+@python_app(cache=True)
+def random_app(i):
+    import random
+    return random.randint(i, 100000)
+
+
+def launch_n_random(n=2):
+    d = [random_app(i) for i in range(0, n)]
+    return [i.result() for i in d]
+
+
+@pytest.mark.local
+def test_sqlite_checkpoint(n=10):
+    """Write an sqlite checkpoint, then load it and check that results are
+    looked up from it lazily.
+    """
+    config = fresh_config()
+    config.checkpoint_mode = 'task_exit'
+    config.checkpoint_format = 'sqlite'
+    parsl.load(config)
+    results = launch_n_random(n)
+    rundir = parsl.dfk().run_dir
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+    checkpoint_dir = os.path.join(rundir, 'checkpoint')
+    assert os.path.exists(os.path.join(checkpoint_dir, 'tasks.db'))
+    assert not os.path.exists(os.path.join(checkpoint_dir, 'tasks.pkl'))
+
+    local_config = fresh_config()
+    local_config.checkpoint_files = [checkpoint_dir]
+    parsl.load(local_config)
+
+    table = parsl.dfk().memoizer.memo_lookup_table
+    assert table.stats()['entries'] == 0, "Checkpoint should not be loaded into memory up front"
+
+    relaunched = launch_n_random(n)
+    assert relaunched == results, "Expected relaunched to contain cached results from first run"
+    assert table.stats()['backing_loads'] == n
+
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+def test_checkpoint_precedence(tmpdir):
+    """Later checkpoints take precedence, whatever their format.
+    """
+    first = str(tmpdir.mkdir('first'))
+    second = str(tmpdir.mkdir('second'))
+
+    PickleCheckpointStore(first).write([{'hash': 'a', 'exception': None, 'result': 1},
+                                        {'hash': 'b', 'exception': None, 'result': 1}])
+    store = SqliteCheckpointStore(second)
+    store.write([{'hash': 'a', 'exception': None, 'result': 2}])
+    store.close()
+
+    index = CheckpointIndex([first, second])
+    assert index.get('a').result() == 2
+    assert index.get('b').result() == 1
+    assert index.get('c') is None
+    index.close()
+
+    index = CheckpointIndex([second, first])
+    assert index.get('a').result() == 1
+    index.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="10",
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_sqlite_checkpoint(int(args.count))
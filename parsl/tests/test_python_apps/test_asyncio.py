@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.data_provider.files import File
+from parsl.dataflow.futures import as_completed, submit
+from parsl.tests.configs.local_threads import config
+
+
+@python_app
+def double(x):
+    return 2 * x
+
+
+@python_app
+def gated(release, x):
+    release.wait(10)
+    return x
+
+
+@python_app
+def fail():
+    raise ValueError("failed")
+
+
+@python_app
+def touch(outputs=[]):
+    with open(outputs[0].filepath, 'w') as f:
+        f.write("done")
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_await_app_future():
+    """AppFutures can be awaited for their results or exceptions."""
+    async def main():
+        assert await double(2) == 4
+        with pytest.raises(ValueError):
+            await fail()
+        return await submit(double, 3)
+
+    assert run(main()) == 6
+
+
+def test_await_data_future(tmpdir):
+    """DataFutures can be awaited for their files."""
+    async def main():
+        fu = touch(outputs=[File(str(tmpdir.join('out.txt')))])
+        return await fu.outputs[0]
+
+    out = run(main())
+    assert isinstance(out, File)
+    assert open(out.filepath).read() == "done"
+
+
+def test_many_awaits(n=1000):
+    """Awaiting many futures at once does not use a thread for each."""
+    release = threading.Event()
+    threads = []
+
+    async def main():
+        fus = [gated(release, i) for i in range(n)]
+        gathered = asyncio.gather(*fus)
+        # let the loop start waiting on every future
+        await asyncio.sleep(0.1)
+        threads.append(threading.active_count())
+        release.set()
+        return await gathered
+
+    before = threading.active_count()
+    try:
+        assert run(main()) == list(range(n))
+    finally:
+        release.set()
+    assert threads[0] <= before + 1
+
+
+def test_as_completed():
+    """as_completed yields futures in the order they complete, and times out
+    if they do not."""
+    first = threading.Event()
+    second = threading.Event()
+
+    async def main():
+        fus = [gated(second, 2), gated(first, 1)]
+        order = []
+        first.set()
+        async for fu in as_completed(fus):
+            order.append(fu.result())
+            second.set()
+        return order
+
+    try:
+        assert run(main()) == [1, 2]
+    finally:
+        first.set()
+        second.set()
+
+    never = threading.Event()
+
+    async def timeout():
+        async for fu in as_completed([gated(never, 0)], timeout=0.1):
+            pass
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            run(timeout())
+    finally:
+        never.set()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load(config)
+    test_await_app_future()
+    test_as_completed()
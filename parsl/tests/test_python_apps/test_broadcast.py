@@ -0,0 +1,237 @@
+import argparse
+import itertools
+import logging
+import operator
+import pickle
+import queue
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.broadcast import Broadcast, find_broadcasts, resolve_broadcasts
+from parsl.dataflow.memoization import id_for_memo
+from parsl.executors.high_throughput import broadcast_store, interchange, messages, process_worker_pool
+from parsl.executors.high_throughput.executor import HighThroughputExecutor
+from parsl.executors.high_throughput.function_registry import LRUCache
+from parsl.executors.high_throughput.interchange import Interchange
+from parsl.executors.high_throughput.process_worker_pool import Manager, execute_task, load_function
+from parsl.tests.configs import htex_local
+from parsl.tests.configs.local_threads import config
+
+
+class Recorder(object):
+    """Records the frames sent on a socket, or put on a TasksOutgoing."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames, copy=True):
+        self.sent.append(frames)
+
+    put = send_multipart
+
+
+@python_app
+def total(table, inputs=[]):
+    return sum(table) + sum(sum(i) for i in inputs)
+
+
+def test_broadcast_apps(n=4):
+    """Apps are passed the objects of the broadcasts in their arguments."""
+    table = parsl.broadcast(list(range(10)))
+    futures = [total(table, inputs=[table] * i) for i in range(n)]
+    assert [f.result() for f in futures] == [45 * (i + 1) for i in range(n)]
+
+
+def test_broadcast_references():
+    """Broadcasts are found in the arguments of tasks, and pickled without their objects."""
+    table = parsl.broadcast({'a': 1})
+    other = parsl.broadcast({'a': 1})
+    assert other.broadcast_id == table.broadcast_id
+    assert id_for_memo(other) == id_for_memo(table)
+
+    args, kwargs = (table, 1), {'inputs': [other], 'key': table}
+    assert [b.broadcast_id for b in find_broadcasts(args, kwargs)] == [table.broadcast_id]
+    assert resolve_broadcasts(args, kwargs) == ([{'a': 1}, 1], {'inputs': [{'a': 1}], 'key': {'a': 1}})
+    assert resolve_broadcasts((1,), {}) == ((1,), {})
+
+    unpickled = pickle.loads(pickle.dumps(table))
+    assert isinstance(unpickled, Broadcast)
+    assert unpickled.value is None
+    assert unpickled.broadcast_id == table.broadcast_id
+
+
+def test_store_round_trip(tmpdir):
+    """Broadcasts written to the store are loaded back from it."""
+    obj = {'key': [1, 2, 3], 'data': b'x' * (2 * 1024 * 1024)}
+    b = parsl.broadcast(obj)
+    directory = str(tmpdir)
+    assert not broadcast_store.contains(directory, b.broadcast_id)
+    broadcast_store.write(directory, b.broadcast_id, b.buffers)
+    assert broadcast_store.contains(directory, b.broadcast_id)
+    assert broadcast_store.load(directory, b.broadcast_id) == obj
+
+
+def test_store_zero_copy(tmpdir):
+    """Large arrays are loaded as views of the mapped file, without copying them."""
+    np = pytest.importorskip("numpy")
+    array = np.arange(1024 * 1024, dtype=np.float64)
+    b = parsl.broadcast(array)
+    directory = str(tmpdir)
+    broadcast_store.write(directory, b.broadcast_id, b.buffers)
+
+    loaded = broadcast_store.load(directory, b.broadcast_id)
+    assert np.array_equal(loaded, array)
+    assert not loaded.flags.owndata
+    assert not loaded.flags.writeable
+    assert loaded.ctypes.data % broadcast_store.ALIGNMENT == 0
+
+
+def test_broadcast_task_flow(monkeypatch, tmpdir):
+    """A broadcast is sent to the interchange with the first task which uses it,
+    fetched once by a manager, and resolved from the node by workers."""
+    monkeypatch.setattr(interchange, 'logger', logging.getLogger(__name__), raising=False)
+    monkeypatch.setattr(process_worker_pool, 'logger', logging.getLogger(__name__), raising=False)
+    monkeypatch.setattr(broadcast_store, '_worker_store', None)
+
+    table = parsl.broadcast({'a': 1, 'b': 2})
+    executor = HighThroughputExecutor()
+    executor.outgoing_q = Recorder()
+    for key in ['a', 'b']:
+        executor.submit(operator.getitem, table, key)
+
+    batches = [list(messages.split(frames)) for frames in executor.outgoing_q.sent]
+    assert [[kind for kind, _, _, _ in batch] for batch in batches] == [
+        [messages.BROADCAST, messages.TASK], [messages.FUNCTION, messages.TASK]]
+    broadcast_frames = batches[0][0][3]
+    assert broadcast_frames[1] == table.broadcast_id
+    tasks = [batch[-1] for batch in batches]
+    assert [messages.unpack_broadcast_ids(task[3][3]) for task in tasks] == [[table.broadcast_id]] * 2
+
+    # the interchange sends the broadcast to a manager which asks for it
+    ix = Interchange.__new__(Interchange)
+    ix._registered = {table.broadcast_id: broadcast_frames}
+    ix._requests = {}
+    ix.task_outgoing = Recorder()
+    ix.request(b'manager-a', table.broadcast_id)
+    ix.send_requested()
+    assert ix.task_outgoing.sent == [[b'manager-a', b''] + broadcast_frames]
+
+    # a manager holds tasks until it has their broadcasts, requesting each once
+    manager = Manager.__new__(Manager)
+    manager.functions = LRUCache()
+    manager.broadcast_dir = str(tmpdir)
+    manager.tasks_waiting = {}
+    manager.pending_task_queue = queue.Queue()
+    manager.task_incoming = Recorder()
+    for _, task_id, _, frames in tasks:
+        manager.queue_task({'task_id': task_id, 'buffer': frames[5:]},
+                           function_id=frames[2],
+                           broadcast_ids=messages.unpack_broadcast_ids(frames[3]))
+    assert manager.pending_task_queue.empty()
+    function_id = tasks[1][3][2]
+    assert manager.task_incoming.sent == [messages.pack_request(table.broadcast_id),
+                                          messages.pack_request(function_id)]
+    manager.broadcast_received(table.broadcast_id, broadcast_frames[2:])
+    assert manager.pending_task_queue.qsize() == 1
+    manager.function_received(function_id, batches[1][0][3][2:])
+    assert manager.pending_task_queue.qsize() == 2
+
+    # and workers replace the broadcast with the object held on the node
+    broadcast_store.start_worker_store(str(tmpdir))
+    first = manager.pending_task_queue.get()
+    assert execute_task(first['buffer']) == 1
+    second = manager.pending_task_queue.get()
+    assert execute_task(second['buffer'], load_function(second['function'])) == 2
+
+
+def test_broadcast_release(monkeypatch, tmpdir):
+    """A released broadcast is dropped by the interchange once no task refers
+    to it, and by the managers it tells, and is sent again if it is reused."""
+    monkeypatch.setattr(interchange, 'logger', logging.getLogger(__name__), raising=False)
+    table = parsl.broadcast([1, 2, 3])
+    executor = HighThroughputExecutor()
+    executor.outgoing_q = Recorder()
+    executor.submit(len, table)
+    executor.release_broadcast(table.broadcast_id)
+    executor.release_broadcast(table.broadcast_id)
+    executor.submit(len, table)
+    batches = [list(messages.split(frames)) for frames in executor.outgoing_q.sent]
+    assert [[kind for kind, _, _, _ in batch] for batch in batches] == [
+        [messages.BROADCAST, messages.TASK], [messages.RELEASE], [messages.BROADCAST, messages.FUNCTION, messages.TASK]]
+
+    ix = Interchange.__new__(Interchange)
+    ix.pending_task_queue = queue.PriorityQueue()
+    ix._task_sequence = itertools.count()
+    ix._affinity_queues = {}
+    ix._queued = {}
+    ix._stale_count = 0
+    ix._queue_lock = threading.Lock()
+    ix._registered = {table.broadcast_id: batches[0][0][3]}
+    ix._references = {}
+    ix._task_objects = {}
+    ix._released = set()
+    ix._dropped = []
+    ix._registered_lock = threading.Lock()
+    ix._ready_manager_queue = {b'manager-a': {}}
+    ix.task_outgoing = Recorder()
+
+    _, task_id, priority, task_frames = batches[0][1]
+    ix.queue_task(task_id, priority, task_frames)
+    ix.release(table.broadcast_id)
+    assert table.broadcast_id in ix._registered
+    ix.task_finished(task_id)
+    assert table.broadcast_id not in ix._registered
+    ix.send_dropped()
+    assert ix.task_outgoing.sent == [[b'manager-a', b''] + messages.pack_release(table.broadcast_id)]
+    assert ix._references == {} and ix._task_objects == {}
+
+    # which remove it from their nodes
+    broadcast_store.write(str(tmpdir), table.broadcast_id, table.buffers)
+    broadcast_store.remove(str(tmpdir), table.broadcast_id)
+    assert not broadcast_store.contains(str(tmpdir), table.broadcast_id)
+    broadcast_store.remove(str(tmpdir), table.broadcast_id)
+
+
+def test_broadcast_release_dfk():
+    """Releasing a broadcast drops its serialized object, which is made again
+    if it is needed."""
+    table = parsl.broadcast(list(range(10)))
+    assert total(table).result() == 45
+    buffers = table.buffers
+    table.release()
+    assert table._buffers is None
+    assert table.buffers == buffers
+
+
+@pytest.mark.local
+def test_htex_broadcast_release():
+    """A broadcast passed to tasks again after it was released is sent again."""
+    dfk = parsl.load(htex_local.fresh_config())
+    try:
+        executor = dfk.executors['htex_local']
+        table = parsl.broadcast(list(range(10)))
+        assert [f.result(timeout=60) for f in [executor.submit(sum, table) for i in range(3)]] == [45] * 3
+        table.release()
+        assert executor.submit(sum, table).result(timeout=60) == 45
+    finally:
+        dfk.cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load(config)
+    test_broadcast_apps()
+    test_broadcast_references()
+    test_broadcast_release_dfk()
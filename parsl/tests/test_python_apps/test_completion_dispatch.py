@@ -0,0 +1,92 @@
+import argparse
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.completion import CompletionDispatcher
+from parsl.tests.configs.local_threads import fresh_config
+
+
+@python_app
+def gated(release, x):
+    release.wait(10)
+    return x
+
+
+@python_app
+def add(x, y):
+    return x + y
+
+
+def test_dispatch_order(n=1000):
+    """Callbacks for the same key run in the order they were dispatched, and
+    close runs the callbacks which are waiting.
+    """
+    dispatcher = CompletionDispatcher(4)
+    calls = {key: [] for key in range(10)}
+    for i in range(n):
+        key = i % 10
+        dispatcher.dispatch(key, calls[key].append, i)
+    dispatcher.close()
+
+    for key in range(10):
+        assert calls[key] == list(range(key, n, 10))
+    stats = dispatcher.stats()
+    assert stats['processed'] == n
+    assert stats['waiting'] == 0
+    assert stats['max_depth'] >= 1
+
+
+def test_dispatch_errors():
+    """An exception raised by a callback does not stop the dispatcher."""
+    dispatcher = CompletionDispatcher(1)
+    calls = []
+    dispatcher.dispatch(0, int, "not a number")
+    dispatcher.dispatch(0, calls.append, 1)
+    dispatcher.close()
+    assert calls == [1]
+
+
+@pytest.mark.local
+def test_completion_dispatch():
+    """With a completion dispatch pool, completed tasks are handled on its
+    threads, and dependent tasks are launched from there.
+    """
+    config = fresh_config()
+    config.completion_dispatch_threads = 2
+    dfk = parsl.load(config)
+
+    threads = []
+    release = threading.Event()
+    try:
+        left = gated(release, 2)
+        right = gated(release, 3)
+        joined = add(left, right)
+        for fu in [left, right, joined]:
+            fu.add_done_callback(lambda fu: threads.append(threading.current_thread().name))
+    finally:
+        release.set()
+
+    assert joined.result() == 5
+
+    # cleanup waits for the dispatcher to finish handling completions
+    dfk.cleanup()
+    assert len(threads) == 3
+    assert all(name.startswith("Completion-Dispatch") for name in threads)
+    assert dfk.completion_dispatcher.stats()['processed'] == 3
+    parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_dispatch_order()
@@ -0,0 +1,147 @@
+import argparse
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.critical_path import CriticalPathEstimator
+from parsl.dataflow.states import States
+from parsl.dataflow.taskrecord import TaskRecord
+from parsl.executors.threads import ThreadPoolExecutor
+from parsl.tests.configs.local_threads import fresh_config
+
+
+@python_app
+def wait(event):
+    event.wait(10)
+    return 0
+
+
+@python_app
+def inc(x):
+    return x + 1
+
+
+def test_thread_pool_priority():
+    """Queued tasks with higher priorities run first.
+    """
+    executor = ThreadPoolExecutor(label='priority_test', max_threads=1)
+    executor.start()
+    release = threading.Event()
+    order = []
+    try:
+        blocker = executor.submit(release.wait, 10)
+        fus = [executor.submit_with_priority(priority, order.append, priority) for priority in [1, 3, 2, 3]]
+        release.set()
+        blocker.result()
+        for fu in fus:
+            fu.result()
+    finally:
+        executor.shutdown(block=True)
+
+    assert order == [3, 3, 2, 1]
+
+
+def test_thread_pool_reprioritize():
+    """A queued task can be moved ahead of others by raising its priority.
+    """
+    executor = ThreadPoolExecutor(label='priority_test', max_threads=1)
+    executor.start()
+    release = threading.Event()
+    order = []
+    try:
+        blocker = executor.submit(release.wait, 10)
+        fus = [executor.submit_with_priority(1, order.append, i) for i in range(3)]
+        executor.reprioritize(fus[2], 5)
+        executor.reprioritize(blocker, 5)
+        release.set()
+        blocker.result()
+        for fu in fus:
+            fu.result()
+    finally:
+        executor.shutdown(block=True)
+
+    assert order == [2, 0, 1]
+
+
+class Dependency(object):
+    """Stands in for the AppFuture of a task."""
+
+    def __init__(self, task_record):
+        self.task_record = task_record
+
+
+def test_lazy_estimates(depth=1000):
+    """Estimates are computed when tasks are dispatched, and launched tasks
+    whose estimates have grown are reprioritized at the next dispatch.
+    """
+    updated = []
+    estimator = CriticalPathEstimator(on_launched_update=updated.append)
+    chain = []
+    for i in range(depth):
+        task_record = TaskRecord(i, None, 'f', None, 'threads')
+        task_record.status = States.pending
+        task_record.depends = [Dependency(chain[-1])] if chain else []
+        estimator.task_submitted(task_record)
+        chain.append(task_record)
+        if i == 0:
+            # the head of the chain is dispatched at once
+            assert estimator.priority(task_record) == 1000
+            task_record.status = States.launched
+    assert [r.critical_path for r in chain] == [None] * depth
+
+    other = TaskRecord(depth, None, 'g', None, 'threads')
+    other.status = States.pending
+    estimator.task_submitted(other)
+    assert estimator.priority(other) == 1000
+    assert updated == [chain[0]]
+    assert [r.critical_path for r in chain] == [float(depth - i) for i in range(depth)]
+
+    estimator.task_finished(chain[0])
+    assert chain[0].id not in estimator._dependents
+
+
+@pytest.mark.local
+def test_critical_path_estimates(depth=4):
+    """Tasks on a chain are given critical path lengths which grow with the
+    length of the chain below them while they wait, and are dispatched with
+    priorities which reflect that.
+    """
+    config = fresh_config()
+    config.critical_path_scheduling = True
+    dfk = parsl.load(config)
+
+    release = threading.Event()
+    try:
+        fus = [wait(release)]
+        for i in range(depth):
+            fus.append(inc(fus[-1]))
+        chain = [fu.task_record for fu in fus]
+        lengths = [dfk.critical_path.length(task_record) for task_record in chain]
+        priorities = [dfk._dispatch_priority(task_record) for task_record in chain]
+    finally:
+        release.set()
+
+    assert fus[-1].result() == depth
+    assert lengths == [float(depth + 1 - i) for i in range(depth + 1)]
+    assert priorities == sorted(priorities, reverse=True)
+
+    # completed runtimes replace the default estimate
+    assert dfk.critical_path.runtime('inc') < 1.0
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_thread_pool_priority()
@@ -0,0 +1,107 @@
+import argparse
+import gc
+import threading
+import weakref
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.local_threads import fresh_config
+
+
+class Blob(object):
+    """A stand-in for a large intermediate result."""
+    pass
+
+
+@python_app
+def wait(event):
+    event.wait(10)
+    return Blob()
+
+
+@python_app
+def stage(x):
+    return Blob()
+
+
+@python_app
+def pair(x, y):
+    return Blob()
+
+
+@pytest.mark.local
+def test_intermediates_released(depth=20):
+    """Once the consumers of an intermediate result have been dispatched, the
+    DFK holds no references to it, so it is freed when the user's futures are.
+    """
+    dfk = parsl.load(fresh_config())
+    release = threading.Event()
+    try:
+        fus = [wait(release)]
+        for i in range(depth):
+            fus.append(stage(fus[-1]))
+    finally:
+        release.set()
+    fus[-1].result()
+
+    gc.disable()
+    try:
+        refs = [weakref.ref(fu.result()) for fu in fus[:-1]]
+        last = fus[-1]
+        del fus
+        assert [ref() for ref in refs] == [None] * depth
+    finally:
+        gc.enable()
+
+    # the last result is still held by its future
+    assert isinstance(last.result(), Blob)
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_shared_result_released():
+    """A result with several consumers is kept until the last has been
+    dispatched.
+    """
+    dfk = parsl.load(fresh_config())
+    release = threading.Event()
+    try:
+        shared = wait(release)
+        first = stage(shared)
+        second_release = threading.Event()
+        gate = wait(second_release)
+        second = pair(shared, gate)
+    finally:
+        release.set()
+    first.result()
+    gc.disable()
+    try:
+        shared_ref = weakref.ref(shared.result())
+        del shared
+        # the second consumer has not been dispatched yet
+        assert shared_ref() is not None
+        second_release.set()
+        second.result()
+        assert shared_ref() is None
+    finally:
+        gc.enable()
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_intermediates_released()
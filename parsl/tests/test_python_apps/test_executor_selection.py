@@ -0,0 +1,99 @@
+import argparse
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.config import Config
+from parsl.dataflow.error import ConfigurationError
+from parsl.dataflow.executor_selection import LeastOutstandingSelector, WorkerWeightedSelector
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+class FakeDFK(object):
+    def __init__(self, executors):
+        self.executors = executors
+
+
+def test_least_outstanding():
+    """Tasks go to the executor with the fewest incomplete tasks.
+    """
+    selector = LeastOutstandingSelector()
+    selector.start(FakeDFK({}))
+
+    assert sorted(selector.select(['a', 'b']) for i in range(4)) == ['a', 'a', 'b', 'b']
+    selector.task_done('b')
+    selector.task_done('b')
+    assert selector.select(['a', 'b']) == 'b'
+    assert selector.select(['a']) == 'a'
+    assert selector.outstanding == {'a': 3, 'b': 1}
+
+
+def test_worker_weighted():
+    """Tasks are spread in proportion to the workers of each executor.
+    """
+    selector = WorkerWeightedSelector()
+    selector.start(FakeDFK({'big': ThreadPoolExecutor(label='big', max_threads=3),
+                            'small': ThreadPoolExecutor(label='small', max_threads=1)}))
+
+    for i in range(8):
+        selector.select(['big', 'small'])
+    assert selector.outstanding == {'big': 6, 'small': 2}
+
+
+def test_default_selection():
+    """Tasks are spread over executors at random unless another policy is chosen."""
+    assert Config().executor_selection == 'random'
+
+
+def test_bad_selection():
+    with pytest.raises(ConfigurationError):
+        Config(executor_selection='fastest')
+
+
+@pytest.mark.local
+def test_avoids_busy_executor():
+    """With the least_outstanding policy, new tasks avoid an executor whose
+    workers are all busy.
+    """
+    config = Config(executors=[ThreadPoolExecutor(label='a', max_threads=1),
+                               ThreadPoolExecutor(label='b', max_threads=1)],
+                    executor_selection='least_outstanding')
+    parsl.load(config)
+
+    release = threading.Event()
+
+    @python_app(executors=['a', 'b'])
+    def wait(event):
+        event.wait(10)
+
+    @python_app(executors=['a', 'b'])
+    def quick():
+        return 1
+
+    blocker = wait(release)
+    busy = blocker.task_record.executor
+    try:
+        for i in range(5):
+            fu = quick()
+            assert fu.task_record.executor != busy
+            fu.result()
+    finally:
+        release.set()
+        blocker.result()
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_least_outstanding()
@@ -0,0 +1,57 @@
+import argparse
+import time
+
+from concurrent.futures import Future
+
+import parsl
+from parsl.app.app import python_app
+
+
+@python_app
+def count_inputs(inputs=[]):
+    return len(inputs)
+
+
+def time_fan_in(n):
+    """Submit a single task depending on n unresolved futures, and time how
+    long it takes to resolve all of those dependencies.
+    """
+    parents = [Future() for i in range(n)]
+    fu = count_inputs(inputs=parents)
+
+    start = time.time()
+    for i, p in enumerate(parents):
+        p.set_result(i)
+    delta = time.time() - start
+
+    assert fu.result() == n
+    return delta
+
+
+def test_fan_in_scaling(n=2000):
+    """Resolving the dependencies of a wide fan-in task should scale
+    linearly with the number of dependencies.
+    """
+    t_small = time_fan_in(n)
+    t_large = time_fan_in(n * 4)
+    print("Fan-in of {} took {}s, fan-in of {} took {}s".format(n, t_small, n * 4, t_large))
+
+    # Linear scaling would give a ratio of around 4; rescanning every
+    # dependency on each completion would give a ratio of around 16.
+    assert t_large < max(t_small, 0.01) * 10, "Fan-in dependency resolution does not scale linearly"
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="2000",
+                        help="Width of the smaller fan-in")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load()
+    test_fan_in_scaling(int(args.count))
@@ -0,0 +1,163 @@
+import argparse
+import logging
+import queue
+
+from ipyparallel.serialize import serialize_object
+
+from parsl.executors.high_throughput import interchange, messages, process_worker_pool
+from parsl.executors.high_throughput.executor import HighThroughputExecutor
+from parsl.executors.high_throughput.function_registry import FunctionRegistry, LRUCache
+from parsl.executors.high_throughput.interchange import Interchange
+from parsl.executors.high_throughput.process_worker_pool import Manager, execute_task, load_function
+
+
+class Recorder(object):
+    """Records the frames sent on a socket, or put on a TasksOutgoing."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames, copy=True):
+        self.sent.append(frames)
+
+    put = send_multipart
+
+
+def add(x, y):
+    return x + y
+
+
+class Scale(object):
+    """A function with state, which is serialized with it."""
+
+    def __init__(self, factor):
+        self.factor = factor
+
+    def __call__(self, x):
+        return x * self.factor
+
+
+def test_lru_cache():
+    """The cache holds its most recently used entries."""
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get('b') is None
+    assert len(cache) == 2
+    assert cache.put('d', 4) == ['a']
+
+
+def test_function_registry():
+    """Functions are sent with their first task, registered with their second,
+    and referred to by id after that."""
+    registry = FunctionRegistry()
+    fid, buffers, new = registry.register(add)
+    assert fid is None
+    fid, second_buffers, new = registry.register(add)
+    assert fid is not None and new
+    assert second_buffers == buffers
+    assert registry.register(add) == (fid, buffers, False)
+
+
+def test_function_changes():
+    """A function whose state changes between submissions is identified
+    by the digest of its new serialized form."""
+    scale = Scale(2)
+    registry = FunctionRegistry()
+    registry.register(scale)
+    fid, buffers, _ = registry.register(scale)
+    scale.factor = 3
+    assert registry.register(scale)[0] is None
+    new_fid, new_buffers, new = registry.register(scale)
+    assert new_fid != fid and new
+    assert load_function(new_buffers)(1) == 3
+
+
+def test_function_release():
+    """The least recently used function is released when another is
+    registered in its place, and registered again when it is reused twice."""
+    registry = FunctionRegistry(size=1)
+    registry.register(add)
+    fid = registry.register(add)[0]
+    assert registry.take_released() == []
+    registry.register(len)
+    registry.register(len)
+    assert registry.take_released() == [fid]
+    assert registry.take_released() == []
+    registry.register(add)
+    assert registry.register(add)[::2] == (fid, True)
+
+
+def test_registered_task_flow(monkeypatch, n=3):
+    """A task which refers to a registered function runs on a worker after
+    the function is fetched through the interchange."""
+    # the interchange and manager create their loggers when their processes start
+    monkeypatch.setattr(interchange, 'logger', logging.getLogger(__name__), raising=False)
+    monkeypatch.setattr(process_worker_pool, 'logger', logging.getLogger(__name__), raising=False)
+
+    executor = HighThroughputExecutor()
+    executor.outgoing_q = Recorder()
+    for i in range(n):
+        executor.submit(len, [0] * i)
+
+    # the executor sends the first task with its function, and then the function once
+    batches = [list(messages.split(frames)) for frames in executor.outgoing_q.sent]
+    assert [[kind for kind, _, _, _ in batch] for batch in batches] == [
+        [messages.TASK], [messages.FUNCTION, messages.TASK], [messages.TASK]]
+    assert batches[0][0][3][2] == b''
+    function_frames = batches[1][0][3]
+    function_id = function_frames[1]
+    tasks = [batch[-1] for batch in batches]
+    assert [task[3][2] for task in tasks[1:]] == [function_id, function_id]
+
+    # the interchange stores the function, and sends it to a manager which asks for it
+    ix = Interchange.__new__(Interchange)
+    ix._registered = {}
+    ix._requests = {}
+    ix.task_outgoing = Recorder()
+    ix.request(b'manager-a', function_id)
+    ix.send_requested()
+    assert ix.task_outgoing.sent == []
+    ix._registered[function_id] = function_frames
+    ix.send_requested()
+    assert ix.task_outgoing.sent == [[b'manager-a', b''] + function_frames]
+    assert ix._requests == {}
+
+    # a manager holds tasks until it has their function, requesting it once
+    manager = Manager.__new__(Manager)
+    manager.functions = LRUCache()
+    manager.tasks_waiting = {}
+    manager.pending_task_queue = queue.Queue()
+    manager.task_incoming = Recorder()
+    for _, task_id, _, frames in tasks[1:]:
+        manager.queue_task({'task_id': task_id, 'buffer': frames[5:]}, function_id=frames[2])
+    assert manager.pending_task_queue.empty()
+    assert manager.task_incoming.sent == [messages.pack_request(function_id)]
+    manager.function_received(function_id, function_frames[2:])
+    assert manager.pending_task_queue.qsize() == 2
+
+    # and the workers call the function in place of the None packed with the task
+    for i in range(1, n):
+        task = manager.pending_task_queue.get()
+        assert execute_task(task['buffer'], load_function(task['function'])) == i
+
+
+def test_load_function():
+    """Registered functions are deserialized in a namespace of their own."""
+    assert load_function(serialize_object(len)) is len
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    test_lru_cache()
+    test_function_registry()
+    test_function_release()
@@ -0,0 +1,187 @@
+import argparse
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.app.errors import RemoteExceptionWrapper
+from parsl.dataflow.error import DependencyError
+from parsl.dataflow.fusion import PreviousResult, mark_previous, run_fused
+from parsl.tests.configs.local_threads import fresh_config
+
+
+@python_app
+def wait(event):
+    event.wait(10)
+    return 0
+
+
+@python_app
+def inc(x):
+    return x + 1
+
+
+@python_app
+def add(x, y):
+    return x + y
+
+
+@python_app
+def fail(x):
+    raise ValueError("failed on {}".format(x))
+
+
+@python_app
+def flaky(x, attempts):
+    attempts.append(x)
+    if len(attempts) == 1:
+        raise ValueError("first attempt fails")
+    return x + 1
+
+
+def test_run_fused():
+    """Each stage of a fused chain is passed the result of the one before,
+    and stages after a failure are not run.
+    """
+    assert run_fused([(int, ["1"], {}),
+                      (lambda x, y: x + y, [PreviousResult(), 2], {}),
+                      (lambda inputs: sum(inputs), [], {'inputs': [PreviousResult(), 4]})]) == [1, 3, 7]
+
+    results = run_fused([(int, ["1"], {}), (int, ["x"], {}), (int, [PreviousResult()], {})])
+    assert len(results) == 2
+    assert results[0] == 1
+    assert isinstance(results[1], RemoteExceptionWrapper)
+
+
+def test_mark_previous():
+    fu = object()
+    args, kwargs = mark_previous([fu, 1], {'y': fu, 'inputs': [2, fu]}, fu)
+    assert isinstance(args[0], PreviousResult) and args[1] == 1
+    assert isinstance(kwargs['y'], PreviousResult)
+    assert kwargs['inputs'][0] == 2 and isinstance(kwargs['inputs'][1], PreviousResult)
+
+
+def count_submissions(dfk):
+    """Wrap the submit method of the DFK's executor to count submissions."""
+    executor = dfk.executors['threads']
+    submissions = []
+    submit = executor.submit
+
+    def counting_submit(func, *args, **kwargs):
+        submissions.append(func)
+        return submit(func, *args, **kwargs)
+
+    executor.submit = counting_submit
+    return submissions
+
+
+def load_fusion_config(retries=0):
+    config = fresh_config()
+    config.task_fusion = True
+    config.retries = retries
+    return parsl.load(config)
+
+
+@pytest.mark.local
+def test_fused_chain(depth=5):
+    """A chain of tasks which waits on another task is submitted as one task
+    once that task completes, and every task of the chain gets its result.
+    """
+    dfk = load_fusion_config()
+    submissions = count_submissions(dfk)
+    release = threading.Event()
+    try:
+        fus = [wait(release)]
+        for i in range(depth):
+            fus.append(inc(fus[-1]))
+    finally:
+        release.set()
+
+    assert [fu.result() for fu in fus] == list(range(depth + 1))
+    assert len(submissions) == 2
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_branch_not_fused():
+    """A task with two dependents is not fused with either, and a task with
+    two dependencies is not fused.
+    """
+    dfk = load_fusion_config()
+    submissions = count_submissions(dfk)
+    release = threading.Event()
+    try:
+        head = inc(wait(release))
+        left = inc(head)
+        right = inc(head)
+        joined = add(left, right)
+    finally:
+        release.set()
+
+    assert joined.result() == 4
+    assert len(submissions) == 5
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_fused_failure():
+    """A failure in a fused chain fails the tasks below it with dependency
+    errors, and does not affect the tasks above it.
+    """
+    dfk = load_fusion_config()
+    release = threading.Event()
+    try:
+        first = inc(wait(release))
+        failed = fail(first)
+        last = inc(failed)
+    finally:
+        release.set()
+
+    assert first.result() == 1
+    with pytest.raises(ValueError):
+        failed.result()
+    with pytest.raises(DependencyError):
+        last.result()
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_fused_retry():
+    """A task of a fused chain which fails is retried, and the tasks below it
+    then run with the result of the retry.
+    """
+    dfk = load_fusion_config(retries=1)
+    release = threading.Event()
+    attempts = []
+    try:
+        first = inc(wait(release))
+        retried = flaky(first, attempts)
+        last = inc(retried)
+    finally:
+        release.set()
+
+    assert last.result() == 3
+    assert attempts == [1, 1]
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_run_fused()
@@ -0,0 +1,202 @@
+import argparse
+import itertools
+import queue
+import threading
+import time
+
+import pytest
+import zmq
+from ipyparallel.serialize import deserialize_object, pack_apply_message, serialize_object, unpack_apply_message
+
+from parsl.executors.high_throughput import messages
+from parsl.executors.high_throughput.executor import HighThroughputExecutor
+from parsl.executors.high_throughput.interchange import Interchange
+from parsl.executors.high_throughput.zmq_pipes import TasksOutgoing
+
+
+class Recorder(object):
+    """Records the frames put on a TasksOutgoing."""
+
+    def __init__(self):
+        self.sent = []
+
+    def put(self, frames):
+        self.sent.append(frames)
+
+
+def test_split():
+    """Messages packed into one multipart message are split back apart with
+    their headers."""
+    frames = (messages.pack_task(1, [b'a', b'b'], priority=3, locality='manager-a') +
+              messages.pack_result(2, [b'c']) +
+              messages.pack_exception(-1, []) +
+              [messages.pack_header(messages.HEARTBEAT)])
+
+    split = list(messages.split(frames))
+    assert [(kind, task_id, priority) for kind, task_id, priority, _ in split] == [
+        (messages.TASK, 1, 3), (messages.RESULT, 2, 0), (messages.EXCEPTION, -1, 0), (messages.HEARTBEAT, 0, 0)]
+    assert split[0][3][1:] == [b'manager-a', b'', b'', b'', b'a', b'b']
+    assert messages.unpack_avoid_task(split[0][3][4]) is None
+    assert messages.unpack_avoid_task(messages.pack_task(5, [], avoid_task=4)[4]) == 4
+    assert split[1][3][1:] == [b'c']
+
+    with pytest.raises(ValueError):
+        list(messages.split(messages.pack_result(3, [b'd', b'e'])[:-1]))
+
+
+@pytest.mark.parametrize("priority", [1.5, -2.25, 2 ** 40, -2 ** 40, 30 * 24 * 3600 * 1000])
+def test_header_priorities(priority):
+    """Float priorities, and integer priorities beyond 32 bits, such as long
+    critical paths in milliseconds, are carried by task headers."""
+    _, _, unpacked, _ = messages.unpack_header(messages.pack_task(1, [], priority=priority)[0])
+    assert unpacked == priority
+
+
+def test_interchange_reprioritize():
+    """Queued tasks are taken in the order of their new priorities, and
+    tasks which are no longer queued are not affected."""
+    ix = Interchange.__new__(Interchange)
+    ix.pending_task_queue = queue.PriorityQueue()
+    ix._task_sequence = itertools.count()
+    ix._affinity_queues = {}
+    ix._queued = {}
+    ix._stale_count = 0
+    ix._queue_lock = threading.Lock()
+
+    for task_id in range(4):
+        ix.queue_task(task_id, 0, messages.pack_task(task_id, []))
+    assert [t['task_id'] for t in ix.get_tasks(1)] == [0]
+    ix.reprioritize(0, 10)
+    ix.reprioritize(2, 5)
+    ix.reprioritize(3, 5)
+    ix.reprioritize(3, 0)
+    ix.reprioritize(3, 5)
+    assert ix.pending_task_count() == 3
+    assert [t['task_id'] for t in ix.get_tasks(4)] == [2, 3, 1]
+    assert ix.pending_task_count() == 0 and ix._queued == {}
+
+    executor = HighThroughputExecutor()
+    executor.outgoing_q = Recorder()
+    future = executor.submit(len, [])
+    executor.reprioritize(future, 2.5)
+    (kind, task_id, priority, _), = messages.split(executor.outgoing_q.sent[-1])
+    assert (kind, task_id, priority) == (messages.REPRIORITIZE, future.parsl_executor_task_id, 2.5)
+
+
+def test_interchange_forwarding():
+    """The interchange queues and forwards the frames of tasks and results
+    as they are, reading only their headers."""
+    context = zmq.Context()
+    executor, interchange_in = context.socket(zmq.PAIR), context.socket(zmq.PAIR)
+    executor.bind("inproc://tasks")
+    interchange_in.connect("inproc://tasks")
+    try:
+        ix = Interchange.__new__(Interchange)
+        ix.pending_task_queue = queue.PriorityQueue()
+        ix._task_sequence = itertools.count()
+        ix._affinity_queues = {}
+        ix._queued = {}
+        ix._stale_count = 0
+        ix._queue_lock = threading.Lock()
+
+        for task_id in range(3):
+            executor.send_multipart(messages.pack_task(task_id, pack_apply_message(len, ([0] * task_id,), {}),
+                                                       priority=task_id), copy=False)
+        for task_id in range(3):
+            frames = interchange_in.recv_multipart(copy=False)
+            kind, task_id, priority, _ = messages.unpack_header(frames[0])
+            ix.queue_task(task_id, priority, frames)
+
+        # the interchange sends a manager the frames of a batch of tasks
+        batch = []
+        for task in ix.get_tasks(3):
+            batch.extend(task['frames'])
+        interchange_in.send_multipart(batch, copy=False)
+
+        tasks = list(messages.split(executor.recv_multipart()))
+        assert [task_id for _, task_id, _, _ in tasks] == [2, 1, 0]
+        for _, task_id, _, frames in tasks:
+            f, args, kwargs = unpack_apply_message(frames[5:], copy=False)
+            assert f(*args, **kwargs) == task_id
+
+        # and the executor results
+        interchange_in.send_multipart(messages.pack_result(7, serialize_object([1, 2])), copy=False)
+        (kind, task_id, _, frames), = messages.split(executor.recv_multipart())
+        assert (kind, task_id) == (messages.RESULT, 7)
+        assert deserialize_object(frames[1:])[0] == [1, 2]
+    finally:
+        executor.close()
+        interchange_in.close()
+        context.term()
+
+
+@pytest.fixture
+def receiver():
+    """A socket to receive tasks sent by a TasksOutgoing, in the place of the interchange."""
+    context = zmq.Context()
+    socket = context.socket(zmq.DEALER)
+    yield socket
+    socket.close()
+    context.term()
+
+
+def connect(receiver, outgoing):
+    """Connect the receiver to a TasksOutgoing, which cannot send until it is connected."""
+    receiver.connect("tcp://127.0.0.1:{}".format(outgoing.port))
+    while not outgoing.zmq_socket.poll(10, zmq.POLLOUT):
+        pass
+
+
+def receive_batches(receiver, timeout=500):
+    """Receive batches of tasks, returning the ids of the tasks in each."""
+    batches = []
+    while receiver.poll(timeout):
+        frames = receiver.recv_multipart()
+        batches.append([task_id for _, task_id, _, _ in messages.split(frames)])
+    return batches
+
+
+def test_submit_batching(receiver, n=100):
+    """Tasks put together are sent to the interchange in batches, while a task
+    put after a pause is sent at once."""
+    outgoing = TasksOutgoing("127.0.0.1", (55000, 56000), batch_size=40, batch_period=200)
+    try:
+        connect(receiver, outgoing)
+        for task_id in range(n):
+            outgoing.put(messages.pack_task(task_id, [b'buffer']))
+        time.sleep(0.5)
+        outgoing.put(messages.pack_task(n, [b'buffer']))
+        batches = receive_batches(receiver)
+    finally:
+        outgoing.close()
+
+    # the first task is sent at once, then full batches, then the rest after the batch period
+    assert batches == [[0], list(range(1, 41)), list(range(41, 81)), list(range(81, 100)), [100]]
+    assert outgoing.batches_sent == 5
+    assert outgoing.tasks_sent == n + 1
+
+
+def test_submit_unbatched(receiver, n=10):
+    """With a batch size of 1, every task is sent at once."""
+    outgoing = TasksOutgoing("127.0.0.1", (55000, 56000), batch_size=1)
+    try:
+        connect(receiver, outgoing)
+        for task_id in range(n):
+            outgoing.put(messages.pack_task(task_id, [b'buffer']))
+        batches = receive_batches(receiver)
+    finally:
+        outgoing.close()
+
+    assert batches == [[task_id] for task_id in range(n)]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    test_split()
+    test_interchange_reprioritize()
+    test_interchange_forwarding()
@@ -0,0 +1,156 @@
+import argparse
+import datetime
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.inline import INLINE_EXECUTOR_LABEL, InlinePolicy
+from parsl.dataflow.taskrecord import TaskRecord
+from parsl.tests.configs.local_threads import fresh_config
+
+
+@python_app(inline=True)
+def total(inputs=[]):
+    return sum(inputs)
+
+
+@python_app
+def double(x):
+    return 2 * x
+
+
+@python_app(executors=['threads'])
+def pinned(x):
+    return 2 * x
+
+
+@python_app(inline=True, cache=True, ignore_for_cache=['calls'])
+def cached(x, calls=None):
+    calls.append(x)
+    return x
+
+
+def completed(func_name, runtime):
+    task_record = TaskRecord(0, None, func_name, None, 'threads')
+    task_record.time_submitted = datetime.datetime.now()
+    task_record.time_returned = task_record.time_submitted + datetime.timedelta(seconds=runtime)
+    return task_record
+
+
+def test_inline_policy():
+    """Apps run inline once enough of their tasks have completed, while their
+    mean runtime is below the threshold.
+    """
+    policy = InlinePolicy(0.5, min_samples=2)
+    policy.task_completed(completed('f', 0.1))
+    assert not policy.runs_inline('f')
+    policy.task_completed(completed('f', 0.1))
+    assert policy.runs_inline('f')
+    for i in range(10):
+        policy.task_completed(completed('f', 2))
+    assert not policy.runs_inline('f')
+    assert not policy.runs_inline('g')
+
+
+def count_submissions(dfk):
+    """Wrap the submit methods of the DFK's executors to count submissions to each."""
+    submissions = {}
+    dfk._start_inline_executor()
+    for label in ['threads', INLINE_EXECUTOR_LABEL]:
+        executor = dfk.executors[label]
+        submissions[label] = []
+
+        def counting_submit(func, *args, submit=executor.submit, label=label, **kwargs):
+            submissions[label].append(func)
+            return submit(func, *args, **kwargs)
+
+        executor.submit = counting_submit
+    return submissions
+
+
+def load_inline_config(inline_threshold=None):
+    config = fresh_config()
+    config.inline_threshold = inline_threshold
+    return parsl.load(config)
+
+
+@pytest.mark.local
+def test_inline_app():
+    """Apps created with inline=True run on the DFK's own thread pool, and
+    can depend on and be depended on by other tasks.
+    """
+    dfk = load_inline_config()
+    submissions = count_submissions(dfk)
+
+    assert double(total(inputs=[double(1), double(2)])).result() == 12
+    assert len(submissions[INLINE_EXECUTOR_LABEL]) == 1
+    assert len(submissions['threads']) == 3
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_inline_executor_started_lazily():
+    """The executor for inline tasks is only started once a task may run inline."""
+    dfk = load_inline_config()
+    assert double(1).result() == 2
+    assert pinned(1).result() == 2
+    assert INLINE_EXECUTOR_LABEL not in dfk.executors
+
+    assert total(inputs=[1, 2]).result() == 3
+    assert INLINE_EXECUTOR_LABEL in dfk.executors
+    dfk.cleanup()
+    parsl.clear()
+
+    dfk = load_inline_config(inline_threshold=60)
+    assert INLINE_EXECUTOR_LABEL in dfk.executors
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_inline_memoization():
+    """Inline tasks are memoized like any others."""
+    dfk = load_inline_config()
+    calls = []
+
+    assert cached(1, calls=calls).result() == 1
+    assert cached(1, calls=calls).result() == 1
+    assert calls == [1]
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_adaptive_inline(n=5):
+    """With an inline threshold, apps which may run on any executor run
+    inline once they are known to be cheap, and pinned apps do not.
+    """
+    dfk = load_inline_config(inline_threshold=60)
+    submissions = count_submissions(dfk)
+
+    for i in range(n):
+        assert double(i).result() == 2 * i
+        assert pinned(i).result() == 2 * i
+
+    assert len(submissions[INLINE_EXECUTOR_LABEL]) == n - 3
+    assert len(submissions['threads']) == n + 3
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_inline_policy()
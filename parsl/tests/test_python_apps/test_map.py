@@ -0,0 +1,113 @@
+import argparse
+
+from concurrent.futures import Future
+
+import parsl
+from parsl.app.app import bash_app, python_app
+from parsl.dataflow.error import DependencyError
+
+
+@python_app
+def add(x, y=0):
+    return x + y
+
+
+@python_app
+def fail(x):
+    raise ValueError("Intentional failure {}".format(x))
+
+
+@bash_app
+def echo(x, stdout=None):
+    return "echo {}".format(x)
+
+
+def test_map(n=100):
+    """Mapping an app over an iterable gives results in order.
+    """
+    futs = add.map(range(n))
+    assert len(futs) == n
+    assert [f.result() for f in futs] == list(range(n))
+
+
+def test_map_multiple_iterables(n=10):
+    """Mapping over several iterables stops at the shortest, and keyword
+    arguments are passed to every invocation.
+    """
+    futs = add.map(range(n), range(n * 2))
+    assert [f.result() for f in futs] == [2 * i for i in range(n)]
+
+    futs = add.map(range(n), y=5)
+    assert [f.result() for f in futs] == [i + 5 for i in range(n)]
+
+
+def test_map_empty():
+    assert add.map([]) == []
+
+
+def test_map_with_dependencies(n=10):
+    """Tasks with unresolved dependencies are launched once those
+    dependencies complete, and failures propagate as dependency errors.
+    """
+    blocker = Future()
+    futs = add.map([blocker] * n + list(range(n)))
+    blocker.set_result(1)
+    assert [f.result() for f in futs] == [1] * n + list(range(n))
+
+    failed = fail.map([1])
+    futs = add.map(failed)
+    try:
+        futs[0].result()
+    except DependencyError:
+        pass
+    else:
+        raise AssertionError("Expected a DependencyError")
+
+
+def test_map_uses_submit_batch(n=20):
+    """Ready tasks are handed to the executor in a single batch.
+    """
+    dfk = parsl.dfk()
+    executors = [e for e in dfk.executors.values() if e.label != 'data_manager']
+    batch_sizes = []
+
+    def recording_submit_batch(executor):
+        original = executor.submit_batch
+
+        def submit_batch(tasks, priorities=None):
+            batch_sizes.append(len(tasks))
+            return original(tasks, priorities=priorities)
+        return submit_batch
+
+    for executor in executors:
+        executor.submit_batch = recording_submit_batch(executor)
+    try:
+        futs = add.map(range(n))
+        assert [f.result() for f in futs] == list(range(n))
+    finally:
+        for executor in executors:
+            del executor.submit_batch
+
+    assert sum(batch_sizes) == n
+    assert len(batch_sizes) <= len(executors)
+
+
+def test_bash_map(n=5):
+    futs = echo.map(range(n))
+    assert [f.result() for f in futs] == [0] * n
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="100",
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load()
+    test_map(int(args.count))
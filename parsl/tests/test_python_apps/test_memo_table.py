@@ -0,0 +1,131 @@
+import argparse
+import os
+
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.memotable import MemoTable
+from parsl.tests.configs.local_threads import fresh_config
+
+local_config = fresh_config()
+local_config.app_cache_max_entries = 2
+
+
+def done_future(result=None, exception=None):
+    fu = Future()
+    if exception is not None:
+        fu.set_exception(exception)
+    else:
+        fu.set_result(result)
+    return fu
+
+
+def test_unbounded_table():
+    table = MemoTable()
+    table['a'] = done_future(1)
+    assert 'a' in table
+    assert table.get('a').result() == 1
+    assert table.get('b') is None
+    assert table.stats()['hits'] == 1
+    assert table.stats()['misses'] == 1
+    with pytest.raises(KeyError):
+        table['b']
+
+
+def test_lru_eviction_and_spill(tmpdir):
+    table = MemoTable(max_entries=2, spill_dir=str(tmpdir))
+    table['a'] = done_future(1)
+    table['b'] = done_future(2)
+    table.get('a')
+    table['c'] = done_future(3)
+
+    # 'b' was least recently used, so was spilled to disk
+    stats = table.stats()
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+    assert stats['spill_bytes'] > 0
+    assert len(table) == 3
+
+    assert 'b' in table
+    assert table.get('b').result() == 2
+    assert table.stats()['spill_loads'] == 1
+
+    table.close()
+    assert not os.listdir(str(tmpdir))
+
+
+def test_spilled_exception(tmpdir):
+    table = MemoTable(max_entries=1, spill_dir=str(tmpdir))
+    table['a'] = done_future(exception=ValueError("failed"))
+    table['b'] = done_future(2)
+    with pytest.raises(ValueError):
+        table['a'].result()
+    table.close()
+
+
+def test_byte_limit(tmpdir):
+    table = MemoTable(max_bytes=5000, spill_dir=str(tmpdir))
+    for i in range(10):
+        table[str(i)] = done_future(b'x' * 1000)
+    stats = table.stats()
+    assert stats['bytes'] <= 5000
+    assert stats['evictions'] > 0
+    assert all(table[str(i)].result() == b'x' * 1000 for i in range(10))
+    table.close()
+
+
+def test_no_spill_dir():
+    table = MemoTable(max_entries=1)
+    table['a'] = done_future(1)
+    table['b'] = done_future(2)
+    assert 'a' not in table
+    assert table.get('b').result() == 2
+
+
+def test_replace_spilled_entry(tmpdir):
+    table = MemoTable(max_entries=1, spill_dir=str(tmpdir))
+    table['a'] = done_future(1)
+    table['b'] = done_future(2)
+    table['a'] = done_future(3)
+    assert table['a'].result() == 3
+    assert len(table) == 2
+    table.close()
+
+
+@python_app(cache=True)
+def random_uuid(x):
+    import uuid
+    return str(uuid.uuid4())
+
+
+@pytest.mark.local
+def test_bounded_app_cache(n=6):
+    """With a bounded app cache, results evicted from memory are still reused.
+    """
+    first = [random_uuid(i).result() for i in range(n)]
+    second = [random_uuid(i).result() for i in range(n)]
+    assert first == second
+
+    stats = parsl.dfk().memoizer.memo_lookup_table.stats()
+    assert stats['entries'] <= 2
+    assert stats['evictions'] >= n - 2
+    assert stats['spill_loads'] >= n - 2
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="6",
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load(local_config)
+    test_bounded_app_cache(int(args.count))
@@ -0,0 +1,92 @@
+import argparse
+import threading
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.local_threads import fresh_config
+
+local_config = fresh_config()
+local_config.retries = 2
+
+calls = {}
+
+
+@python_app(cache=True, ignore_for_cache=['event'])
+def count_calls(key, event=None):
+    event.wait()
+    calls[key] = calls.get(key, 0) + 1
+    return key
+
+
+@python_app(cache=True, ignore_for_cache=['event'])
+def fail_until(key, succeed_on, event=None):
+    event.wait()
+    calls[key] = calls.get(key, 0) + 1
+    if calls[key] < succeed_on:
+        raise ValueError("Intentional failure on attempt {}".format(calls[key]))
+    return calls[key]
+
+
+@pytest.mark.local
+def test_inflight_duplicates_collapsed(n=10):
+    """Identical calls made while the first is still running execute once.
+    """
+    event = threading.Event()
+    futs = [count_calls('collapse', event=event) for i in range(n)]
+    other = count_calls('other', event=event)
+    event.set()
+
+    assert [f.result() for f in futs] == ['collapse'] * n
+    assert other.result() == 'other'
+    assert calls['collapse'] == 1, "Duplicate in-flight calls were executed"
+    assert calls['other'] == 1
+
+
+@pytest.mark.local
+def test_inflight_failure_propagates(n=5):
+    """A collapsed call gets the final failure of the call it waits on, and
+    is not retried itself.
+    """
+    event = threading.Event()
+    futs = [fail_until('always_fail', succeed_on=100, event=event) for i in range(n)]
+    event.set()
+
+    for f in futs:
+        with pytest.raises(ValueError):
+            f.result()
+
+    # the first call is tried once and then retried twice
+    assert calls['always_fail'] == 3
+
+
+@pytest.mark.local
+def test_inflight_retry_success(n=5):
+    """If the call being waited on succeeds on a retry, collapsed calls get
+    that result.
+    """
+    event = threading.Event()
+    futs = [fail_until('fail_once', succeed_on=2, event=event) for i in range(n)]
+    event.set()
+
+    assert [f.result() for f in futs] == [2] * n
+    assert calls['fail_once'] == 2
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="10",
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load(local_config)
+    test_inflight_duplicates_collapsed(int(args.count))
+    test_inflight_failure_propagates()
+    test_inflight_retry_success()
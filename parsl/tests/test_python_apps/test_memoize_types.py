@@ -0,0 +1,175 @@
+import argparse
+import gc
+import os
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.data_provider.files import File
+from parsl.dataflow import memoization
+from parsl.dataflow.memoization import id_for_memo, id_for_memo_file, id_for_memo_file_content, id_for_memo_file_mtime
+
+
+@python_app(cache=True)
+def random_uuid(x):
+    import uuid
+    return str(uuid.uuid4())
+
+
+def test_tuple_memoization():
+    """Tuples can be memoized, and are distinct from lists of the same values.
+    """
+    assert random_uuid((1, 2)).result() == random_uuid((1, 2)).result()
+    assert random_uuid((1, 2)).result() != random_uuid([1, 2]).result()
+    assert id_for_memo((1, (2, 3))) != id_for_memo((1, [2, 3]))
+
+
+def test_bytes_memoization():
+    assert random_uuid(b'abc').result() == random_uuid(b'abc').result()
+    assert random_uuid(b'abc').result() != random_uuid(b'abd').result()
+    assert id_for_memo(b'abc') != id_for_memo('abc')
+
+
+def test_large_bytes_memoization():
+    """Large bytes differing only near the end hash differently."""
+    a = b'x' * 1024 * 1024 + b'a'
+    b = b'x' * 1024 * 1024 + b'b'
+    assert id_for_memo([a]) != id_for_memo([b])
+
+
+def test_bytes_digest_cache(monkeypatch):
+    """Large bytes are hashed once while they are in use, and dropped from
+    the cache once it holds the only reference to them."""
+    calls = []
+    digest = memoization._digest
+    monkeypatch.setattr(memoization, '_digest', lambda data: calls.append(len(data)) or digest(data))
+
+    a = b'x' * (2 * 1024 * 1024)
+    before = id_for_memo(a)
+    assert id_for_memo(a) == before
+    assert calls == [len(a)]
+    assert id_for_memo(bytearray(a)) == before
+    assert len(calls) == 2
+
+    key = id(a)
+    del a
+    id_for_memo(b'y' * (2 * 1024 * 1024))
+    assert key not in memoization._bytes_digests
+
+
+def test_file_by_url(tmpdir):
+    path = str(tmpdir.join('input.txt'))
+    assert id_for_memo(File(path)) == id_for_memo(File(path))
+    assert id_for_memo(File(path)) != id_for_memo(File(path + '.other'))
+
+
+@pytest.mark.parametrize("file_id", [id_for_memo_file_mtime, id_for_memo_file_content])
+def test_file_by_content(tmpdir, file_id):
+    path = str(tmpdir.join('input.txt'))
+    with open(path, 'w') as f:
+        f.write('one')
+
+    id_for_memo.register(File, file_id)
+    try:
+        before = id_for_memo(File(path))
+        assert id_for_memo(File(path)) == before
+
+        with open(path, 'w') as f:
+            f.write('three')
+        os.utime(path, ns=(0, 1))
+        assert id_for_memo(File(path)) != before
+
+        # output files and missing files are identified by URL
+        assert id_for_memo(File(path), output_ref=True) == id_for_memo_file(File(path))
+        missing = File(path + '.missing')
+        assert id_for_memo(missing) == id_for_memo_file(missing)
+    finally:
+        id_for_memo.register(File, id_for_memo_file)
+
+
+def test_numpy_memoization():
+    np = pytest.importorskip("numpy")
+
+    assert id_for_memo(np.arange(10)) == id_for_memo(np.arange(10))
+    assert id_for_memo(np.arange(10)) != id_for_memo(np.arange(1, 11))
+    assert id_for_memo(np.arange(10)) != id_for_memo(np.arange(10, dtype='float64'))
+    assert id_for_memo(np.arange(10)) != id_for_memo(np.arange(10).reshape(2, 5))
+    # non-contiguous arrays are hashed by content
+    assert id_for_memo(np.arange(20)[::2]) == id_for_memo(np.arange(0, 20, 2))
+
+    assert random_uuid(np.arange(10)).result() == random_uuid(np.arange(10)).result()
+
+    with pytest.raises(ValueError):
+        id_for_memo(np.array([object()]))
+
+
+def test_numpy_changes():
+    """Arrays are hashed by their content on every use, so changes to an array
+    or to its base, even through a read-only view, are seen.
+    """
+    np = pytest.importorskip("numpy")
+
+    array = np.zeros(1024)
+    before = id_for_memo(array)
+    array[0] = 1
+    assert id_for_memo(array) != before
+
+    view = array[:]
+    view.setflags(write=False)
+    before = id_for_memo(view)
+    array[1] = 1
+    assert id_for_memo(view) != before
+
+    array.setflags(write=False)
+    before = id_for_memo(array)
+    array.setflags(write=True)
+    array[2] = 1
+    assert id_for_memo(array) != before
+
+
+def test_numpy_digest_cache(monkeypatch):
+    """Large read-only arrays which own their data are hashed once while they
+    exist, and hashed again if they are made writeable."""
+    np = pytest.importorskip("numpy")
+    calls = []
+    array_digest = memoization._array_digest
+    monkeypatch.setattr(memoization, '_array_digest', lambda array: calls.append(1) or array_digest(array))
+
+    array = np.zeros(1024 * 1024)
+    array.setflags(write=False)
+    before = id_for_memo(array)
+    assert id_for_memo(array) == before
+    assert len(calls) == 1
+
+    # views and writeable arrays are hashed on every use
+    id_for_memo(array[:])
+    id_for_memo(array[:])
+    assert len(calls) == 3
+
+    array.setflags(write=True)
+    array[0] = 1
+    assert id_for_memo(array) != before
+
+    key = id(array)
+    array.setflags(write=False)
+    id_for_memo(array)
+    assert key in memoization._array_digests
+    del array
+    gc.collect()
+    assert key not in memoization._array_digests
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load()
+    test_tuple_memoization()
+    test_bytes_memoization()
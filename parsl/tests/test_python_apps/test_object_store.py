@@ -0,0 +1,258 @@
+import argparse
+import itertools
+import operator
+import pickle
+import queue
+import threading
+
+import pytest
+import zmq
+
+import parsl
+from parsl.app.app import python_app
+from parsl.executors.high_throughput import messages, object_store
+from parsl.executors.high_throughput.errors import RemoteReferenceError
+from parsl.executors.high_throughput.interchange import Interchange
+from parsl.executors.high_throughput.object_store import (ObjectStoreServer, RemoteReference, by_reference,
+                                                          find_references, preferred_manager, resolve_references)
+from parsl.tests.configs import htex_local
+from parsl.tests.configs.local_threads import fresh_config
+
+
+@python_app
+@by_reference
+def square(x):
+    return x * x
+
+
+class ByReference(object):
+    """A function which returns a reference to its result, in a form which
+    workers import rather than unpickle the code of."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, *args):
+        return by_reference(self.func)(*args)
+
+
+@pytest.fixture
+def store():
+    """An object store served in this process, used as the store of a worker
+    of its manager."""
+    kill_event = threading.Event()
+    server = ObjectStoreServer('manager-a', '127.0.0.1')
+    server.start(kill_event)
+    object_store.start_worker_store('manager-a', server.local_address, server.address)
+    yield server
+    object_store._worker_store = None
+    kill_event.set()
+    server.join()
+
+
+def test_object_store(store):
+    """Objects put in the store of a manager can be fetched through their
+    references until they are released.
+    """
+    ref = object_store._worker_store.put({'x': [1, 2, 3]})
+    assert ref.manager_id == 'manager-a'
+    assert ref.get(timeout=5) == {'x': [1, 2, 3]}
+
+    # as from a client, or a worker of another manager
+    object_store._worker_store = None
+    assert ref.get(timeout=5) == {'x': [1, 2, 3]}
+
+    ref.release(timeout=5)
+    with pytest.raises(RemoteReferenceError):
+        ref.get(timeout=5)
+
+
+class Unpicklable(object):
+    """An object whose unpickling would be noticed."""
+    unpickled = False
+
+    def __reduce__(self):
+        return (Unpicklable.mark, ())
+
+    @staticmethod
+    def mark():
+        Unpicklable.unpickled = True
+
+
+def test_bad_requests(store):
+    """The store replies to malformed requests with an error, and never
+    unpickles what it is sent.
+    """
+    context = zmq.Context()
+    sock = context.socket(zmq.REQ)
+    sock.setsockopt(zmq.LINGER, 0)
+    sock.setsockopt(zmq.RCVTIMEO, 5000)
+    sock.connect(store.local_address)
+    try:
+        for request in [[b'junk'], [b'frobnicate', b'x'], [b'get', b'x', b'y'], [pickle.dumps(Unpicklable()), b'x']]:
+            sock.send_multipart(request)
+            assert sock.recv_multipart()[0] == b'error'
+        sock.send_multipart([b'put', b'x', pickle.dumps(Unpicklable())])
+        assert sock.recv_multipart() == [b'ok']
+    finally:
+        sock.close()
+        context.term()
+    assert not Unpicklable.unpickled
+    assert object_store.RemoteReference('x', 'manager-a', store.address).get(timeout=5) is None
+    assert Unpicklable.unpickled
+
+
+def test_binding():
+    """The store is bound to the loopback interface, and to the interface
+    through which the node reaches the interchange, rather than to all.
+    """
+    address = object_store.interface_address('127.0.0.1', 55055)
+    assert address == '127.0.0.1'
+    server = ObjectStoreServer('manager-a', address)
+    try:
+        endpoints = server.socket.getsockopt_string(zmq.LAST_ENDPOINT)
+        assert endpoints == server.local_address
+        assert server.address == server.local_address
+    finally:
+        server.socket.close()
+        server.context.term()
+
+
+def test_eviction():
+    """Beyond max_bytes, the least recently used objects are evicted."""
+    server = ObjectStoreServer('manager-a', '127.0.0.1', max_bytes=250)
+    try:
+        for ref_id in [b'a', b'b']:
+            assert server.handle([b'put', ref_id, b'x' * 100]) == [b'ok']
+        # b is now the least recently used
+        assert server.handle([b'get', b'a']) == [b'ok', b'x' * 100]
+        server.handle([b'put', b'c', b'x' * 100])
+        assert list(server.objects) == [b'a', b'c']
+        assert server.handle([b'get', b'b']) == [b'missing']
+        assert (server.nbytes, server.evicted) == (200, 1)
+
+        # an object larger than the store is still kept, on its own
+        server.handle([b'put', b'd', b'x' * 1000])
+        assert list(server.objects) == [b'd']
+        server.handle([b'release', b'd'])
+        assert (server.nbytes, server.evicted) == (0, 3)
+    finally:
+        server.socket.close()
+        server.context.term()
+
+
+def test_resolve_references(store):
+    """References are found and resolved in the same places as the DFK
+    looks for dependencies.
+    """
+    a = object_store._worker_store.put(1)
+    b = object_store._worker_store.put(2)
+    other = RemoteReference('x', 'manager-b', 'tcp://127.0.0.1:1')
+
+    args, kwargs = [a, 3], {'y': b, 'inputs': [a, 4]}
+    assert find_references(args, kwargs) == [a, b, a]
+    assert preferred_manager(args, kwargs) == 'manager-a'
+    assert preferred_manager([other, other, a], {}) == 'manager-b'
+    assert preferred_manager([1], {'y': 2}) is None
+
+    assert resolve_references(args, kwargs, timeout=5) == ([1, 3], {'y': 2, 'inputs': [1, 4]})
+
+
+@pytest.mark.local
+def test_by_reference_without_store():
+    """Apps decorated with by_reference return their results as usual when
+    they are not run by an HTEX worker with an object store.
+    """
+    parsl.load(fresh_config())
+    assert square(3).result() == 9
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_htex_object_store():
+    """Results kept in the object store of a manager are passed by reference
+    to later tasks, and fetched by clients, until they are released.
+    """
+    config = htex_local.fresh_config()
+    config.executors[0].object_store = True
+    config.executors[0].object_store_max_bytes = 1024 * 1024
+    dfk = parsl.load(config)
+    try:
+        executor = dfk.executors['htex_local']
+        ref = executor.submit(ByReference(operator.mul), 6, 7).result(timeout=60)
+        assert isinstance(ref, RemoteReference)
+        assert executor.submit(operator.add, ref, 1).result(timeout=60) == 43
+        assert ref.get(timeout=10) == 42
+
+        ref.release(timeout=10)
+        with pytest.raises(RemoteReferenceError):
+            executor.submit(operator.add, ref, 1).result(timeout=60)
+    finally:
+        dfk.cleanup()
+        parsl.clear()
+
+
+def test_interchange_affinity():
+    """The interchange sends a task which refers to objects to the manager
+    which holds them, unless that manager has not asked for it first.
+    """
+    ix = Interchange.__new__(Interchange)
+    ix.pending_task_queue = queue.PriorityQueue()
+    ix._task_sequence = itertools.count()
+    ix._affinity_queues = {}
+    ix._queued = {}
+    ix._stale_count = 0
+    ix._queue_lock = threading.Lock()
+
+    ix.queue_task(1, 0, messages.pack_task(1, []))
+    ix.queue_task(2, 0, messages.pack_task(2, [], locality='manager-a'))
+    ix.queue_task(3, 5, messages.pack_task(3, [], priority=5, locality='manager-b'))
+    assert ix.pending_task_count() == 3
+
+    assert [t['task_id'] for t in ix.get_tasks(1, b'manager-a')] == [2]
+    assert [t['task_id'] for t in ix.get_tasks(2, b'manager-c')] == [1, 3]
+    assert ix.pending_task_count() == 0
+
+    ix.queue_task(4, 0, messages.pack_task(4, [], locality='manager-a'))
+    ix.requeue_affinity_tasks(b'manager-a')
+    assert ix.pending_task_queue.qsize() == 1
+    assert [t['task_id'] for t in ix.get_tasks(1)] == [4]
+
+
+def test_interchange_avoid():
+    """The interchange does not send a task to the manager running the task
+    it should avoid, while that task is running.
+    """
+    ix = Interchange.__new__(Interchange)
+    ix.pending_task_queue = queue.PriorityQueue()
+    ix._task_sequence = itertools.count()
+    ix._affinity_queues = {}
+    ix._queued = {}
+    ix._stale_count = 0
+    ix._queue_lock = threading.Lock()
+    ix._ready_manager_queue = {b'manager-a': {'tasks': [1]}, b'manager-b': {'tasks': []}}
+
+    ix.queue_task(2, 0, messages.pack_task(2, [], avoid_task=1))
+    ix.queue_task(3, 0, messages.pack_task(3, []))
+    assert [t['task_id'] for t in ix.get_tasks(2, b'manager-a')] == [3]
+    assert ix.pending_task_count() == 1
+    assert [t['task_id'] for t in ix.get_tasks(2, b'manager-b')] == [2]
+
+    ix.queue_task(4, 0, messages.pack_task(4, [], avoid_task=1))
+    ix._ready_manager_queue[b'manager-a']['tasks'].remove(1)
+    assert [t['task_id'] for t in ix.get_tasks(1, b'manager-a')] == [4]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_interchange_affinity()
+    test_interchange_avoid()
@@ -0,0 +1,119 @@
+import argparse
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.tests.configs.local_threads import config
+
+
+@python_app(priority=3)
+def urgent(x):
+    return x
+
+
+@python_app
+def bulk(x):
+    return x
+
+
+def record_priorities():
+    """Wrap the submission methods of the DFK's executors to record the
+    priority each task is submitted with."""
+    dfk = parsl.dfk()
+    if dfk.critical_path is not None:
+        pytest.skip("critical path scheduling adds to task priorities")
+    executors = [e for e in dfk.executors.values() if e.label != 'data_manager']
+    priorities = []
+    submitting = []
+
+    def wrap(executor):
+        submit = executor.submit
+        submit_with_priority = executor.submit_with_priority
+
+        def recording_submit(func, *args, **kwargs):
+            # the default submit_with_priority calls submit, so only
+            # record calls which were not made through it
+            if not submitting:
+                priorities.append(0)
+            return submit(func, *args, **kwargs)
+
+        def recording_submit_with_priority(priority, func, *args, **kwargs):
+            priorities.append(priority)
+            submitting.append(True)
+            try:
+                return submit_with_priority(priority, func, *args, **kwargs)
+            finally:
+                submitting.pop()
+
+        executor.submit = recording_submit
+        executor.submit_with_priority = recording_submit_with_priority
+
+    def unwrap():
+        for executor in executors:
+            del executor.submit
+            del executor.submit_with_priority
+
+    for executor in executors:
+        wrap(executor)
+    return priorities, unwrap
+
+
+def test_priority():
+    """Tasks are submitted with the priority of their app, which an
+    invocation can override.
+    """
+    priorities, unwrap = record_priorities()
+    try:
+        assert urgent(1).result() == 1
+        assert urgent(2, parsl_priority=7).result() == 2
+        assert bulk(3).result() == 3
+    finally:
+        unwrap()
+
+    assert priorities == [3, 7, 0]
+
+
+def test_float_priority():
+    """Priorities may be floats, but must be finite numbers."""
+    priorities, unwrap = record_priorities()
+    try:
+        assert bulk(1, parsl_priority=1.5).result() == 1
+    finally:
+        unwrap()
+    assert priorities == [1.5]
+
+    with pytest.raises(TypeError):
+        bulk(2, parsl_priority='high')
+    with pytest.raises(ValueError):
+        bulk(3, parsl_priority=float('nan'))
+    with pytest.raises(ValueError):
+        bulk(4, parsl_priority=10 ** 400)
+
+
+def test_map_priority(n=4):
+    """Mapped invocations are submitted with the app's priority, or the
+    priority given to map.
+    """
+    priorities, unwrap = record_priorities()
+    try:
+        assert [f.result() for f in urgent.map(range(n))] == list(range(n))
+        assert [f.result() for f in bulk.map(range(n), parsl_priority=2)] == list(range(n))
+    finally:
+        unwrap()
+
+    assert priorities == [3] * n + [2] * n
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load(config)
+    test_priority()
@@ -0,0 +1,198 @@
+import argparse
+import ctypes
+import logging
+import queue
+import threading
+
+import pytest
+from ipyparallel.serialize import deserialize_object, pack_apply_message, unpack_apply_message
+
+from parsl.executors.high_throughput import messages, process_worker_pool
+from parsl.executors.high_throughput.function_registry import LRUCache
+from parsl.executors.high_throughput.process_worker_pool import Manager, execute_task, run_task
+
+pytest.importorskip("multiprocessing.shared_memory")
+
+from parsl.executors.high_throughput.ring_buffer import ALIGNMENT, RingBuffer, WorkerChannel  # noqa: E402
+
+
+@pytest.fixture
+def ring():
+    ring = RingBuffer(1024)
+    yield ring
+    ring.close(unlink=True)
+
+
+def test_ring_buffer(ring):
+    """Messages are read back in order, and are only written while there is
+    space for them."""
+    # records of 150 bytes take 256 bytes of the ring, so three leave 256 bytes free
+    for c in b'abc':
+        assert ring.put([bytes([c]) * 150])
+    assert not ring.put([b'd' * 300])
+    assert bytes(ring.get()[0]) == b'a' * 150
+    ring.release()
+    assert ring.put([b'd' * 150])
+    assert [bytes(ring.get()[0]) for _ in range(3)] == [b'b' * 150, b'c' * 150, b'd' * 150]
+    ring.release()
+
+    # a message larger than the ring is never written
+    assert not ring.put([b'e' * 2048])
+
+
+def test_ring_buffer_wraps(ring):
+    """Records which would run past the end of the ring start again at its beginning."""
+    for i in range(20):
+        message = [bytes([i]) * 100, b'', bytes([i]) * (7 * i)]
+        assert ring.put(message)
+        assert [bytes(view) for view in ring.get()] == message
+        ring.release()
+
+
+def test_ring_buffer_alignment(ring):
+    """Buffers are read in place, at aligned addresses."""
+    ring.put([b'x', b'y' * 10])
+    for view in ring.get():
+        assert ctypes.addressof(ctypes.c_char.from_buffer(view)) % ALIGNMENT == 0
+
+
+def test_channel_fallback():
+    """Messages which do not fit in a ring are sent through its pipe."""
+    channel = WorkerChannel(4096)
+    try:
+        channel.put_task({'task_id': 1, 'buffer': [b'small']})
+        channel.put_task({'task_id': 2, 'buffer': [b'large' * 2000], 'function_id': b'f', 'function': [b'g']})
+        assert channel.get_task() == {'task_id': 1, 'buffer': [b'small']}
+        task = channel.get_task()
+        assert task == {'task_id': 2, 'buffer': [b'large' * 2000], 'function_id': b'f', 'function': [b'g']}
+
+        channel.put_result(messages.pack_result(1, [b'r' * 10000]))
+        assert channel.get_result() == messages.pack_result(1, [b'r' * 10000])
+    finally:
+        channel.close_worker_ends()
+        channel.close()
+
+
+def test_channel_zero_copy():
+    """Arrays passed to tasks are read where they lie in shared memory."""
+    np = pytest.importorskip("numpy")
+    channel = WorkerChannel(16 * 1024 * 1024)
+    try:
+        array = np.arange(1024 * 1024, dtype=np.float64)
+        channel.put_task({'task_id': 1, 'buffer': pack_apply_message(np.sum, (array,), {})})
+        task = channel.get_task()
+        _, (received,), _ = unpack_apply_message(task['buffer'], copy=False)
+        assert not received.flags.owndata
+        assert np.array_equal(received, array)
+        assert execute_task(task['buffer']) == array.sum()
+        # the shared memory cannot be closed while views of it are held
+        del task, received
+    finally:
+        channel.close_worker_ends()
+        channel.close()
+
+
+def make_manager(monkeypatch):
+    """A manager with the state used by its threads with the shared memory transport."""
+    monkeypatch.setattr(process_worker_pool, 'logger', logging.getLogger(__name__), raising=False)
+
+    manager = Manager.__new__(Manager)
+    manager.poll_period = 10
+    manager.shared_memory_size = 1024 * 1024
+    manager.pending_task_queue = queue.Queue()
+    manager.pending_result_queue = queue.Queue()
+    manager.ready_worker_queue = queue.Queue()
+    manager._tasks_in_progress = {}
+    manager.channels = {}
+    manager._retired_channels = queue.Queue()
+    manager._channel_lock = threading.Lock()
+    return manager
+
+
+def test_dispatch_and_receive(monkeypatch, n=20):
+    """The manager hands each task to an idle worker, tracking it until its result arrives."""
+    manager = make_manager(monkeypatch)
+    for worker_id in range(2):
+        manager.channels[worker_id] = WorkerChannel(1024 * 1024)
+        manager.ready_worker_queue.put((worker_id, manager.channels[worker_id]))
+
+    kill_event = threading.Event()
+    seen = {}
+
+    def work(worker_id, channel):
+        functions = LRUCache()
+        while not kill_event.is_set():
+            if channel.task_reader.poll(0.01):
+                req = channel.get_task()
+                seen[req['task_id']] = worker_id
+                assert manager._tasks_in_progress[worker_id]['task_id'] == req['task_id']
+                channel.put_result(run_task(req, functions))
+
+    threads = [threading.Thread(target=work, args=item) for item in manager.channels.items()]
+    threads += [threading.Thread(target=manager.dispatch_tasks, args=(kill_event,)),
+                threading.Thread(target=manager.receive_results, args=(kill_event,))]
+    for thread in threads:
+        thread.start()
+    try:
+        for task_id in range(n):
+            manager.pending_task_queue.put({'task_id': task_id, 'buffer': pack_apply_message(len, ([0] * task_id,), {})})
+        results = {}
+        for _ in range(n):
+            (kind, task_id, _, frames), = messages.split(manager.pending_result_queue.get(timeout=10))
+            assert kind == messages.RESULT
+            results[task_id] = deserialize_object(frames[1:])[0]
+    finally:
+        kill_event.set()
+        for thread in threads:
+            thread.join()
+        for channel in manager.channels.values():
+            channel.close_worker_ends()
+            channel.close()
+
+    assert results == {task_id: task_id for task_id in range(n)}
+    assert set(seen) == set(range(n))
+    assert manager._tasks_in_progress == {}
+
+
+def test_restarted_worker(monkeypatch):
+    """The result receiver keeps running when the channel of a worker is
+    replaced, or closed, while it waits on it."""
+    manager = make_manager(monkeypatch)
+    old, new, other = [WorkerChannel(1024 * 1024) for _ in range(3)]
+    manager.channels[0] = old
+
+    kill_event = threading.Event()
+    receiver = threading.Thread(target=manager.receive_results, args=(kill_event,))
+    receiver.start()
+    try:
+        # as the watchdog restarts a worker which has died
+        manager._retired_channels.put(old)
+        manager.channels[0] = new
+        old.result_writer.close()
+        new.put_result(messages.pack_result(1, [b'first']))
+        assert manager.pending_result_queue.get(timeout=10) == messages.pack_result(1, [b'first'])
+        assert old.closed
+
+        # a channel closed under the receiver is no longer waited on
+        new.close()
+        manager.channels[1] = other
+        other.put_result(messages.pack_result(2, [b'second']))
+        assert manager.pending_result_queue.get(timeout=10) == messages.pack_result(2, [b'second'])
+        assert receiver.is_alive()
+    finally:
+        kill_event.set()
+        receiver.join()
+        for channel in [old, new, other]:
+            channel.close_worker_ends()
+            channel.close()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    test_channel_fallback()
+    test_channel_zero_copy()
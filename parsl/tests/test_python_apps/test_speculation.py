@@ -0,0 +1,181 @@
+import argparse
+import datetime
+import threading
+import time
+
+import pytest
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.speculation import Speculator
+from parsl.dataflow.states import States
+from parsl.dataflow.taskrecord import TaskRecord
+from parsl.executors.threads import ThreadPoolExecutor
+from parsl.tests.configs.local_threads import fresh_config
+
+
+@python_app
+def work(x, attempts=None, release=None, fail_copy=False):
+    """Returns x after a short sleep, except when given attempts: then the
+    first attempt waits for release, and later ones return at once."""
+    if attempts is None:
+        import time
+        time.sleep(0.1)
+        return x
+    attempts.append(len(attempts))
+    if len(attempts) == 1:
+        release.wait(30)
+        return 'original'
+    if fail_copy:
+        raise ValueError("speculative copy fails")
+    return 'speculative'
+
+
+def where(threads, release=None):
+    """Returns the name of the thread it runs on, after waiting for release
+    if it is the first attempt."""
+    import threading
+    threads.append(threading.current_thread().name)
+    if len(threads) == 1 and release is not None:
+        release.wait(30)
+    return threads[-1]
+
+
+def record(func_name, status, running_for):
+    task_record = TaskRecord(0, None, func_name, None, 'threads')
+    task_record.status = status
+    task_record.time_submitted = datetime.datetime.now() - datetime.timedelta(seconds=running_for)
+    task_record.time_returned = task_record.time_submitted + datetime.timedelta(seconds=running_for)
+    return task_record
+
+
+def test_stragglers():
+    """Tasks running for longer than the percentile of the runtimes of their
+    app are straggling, once enough tasks of the app have completed.
+    """
+    speculator = Speculator(percentile=90, min_samples=10)
+    for runtime in range(1, 10):
+        speculator.task_completed(record('f', States.done, runtime))
+    assert speculator.threshold('f') is None
+
+    speculator.task_completed(record('f', States.done, 10))
+    assert speculator.threshold('f') == 9
+
+    slow = record('f', States.launched, 20)
+    fast = record('f', States.launched, 5)
+    other = record('g', States.launched, 20)
+    speculated = record('f', States.launched, 20)
+    speculated.speculated = True
+    assert speculator.stragglers([slow, fast, other, speculated], datetime.datetime.now()) == [slow]
+
+
+def load_speculation_config():
+    config = fresh_config()
+    config.speculative_execution = True
+    config.speculative_execution_min_samples = 3
+    return parsl.load(config)
+
+
+@pytest.mark.local
+def test_speculative_copy_wins():
+    """A straggling task is completed by its speculative copy."""
+    dfk = load_speculation_config()
+    release = threading.Event()
+    attempts = []
+    try:
+        assert [fu.result() for fu in [work(i) for i in range(5)]] == list(range(5))
+        assert work(None, attempts, release).result(timeout=20) == 'speculative'
+        assert attempts == [0, 1]
+    finally:
+        release.set()
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_original_completes_after_copy(caplog):
+    """The original attempt at a task may complete after its speculative
+    copy has won and the task has been wiped, and is then ignored.
+    """
+    dfk = load_speculation_config()
+    release = threading.Event()
+    attempts = []
+    try:
+        assert [fu.result() for fu in [work(i) for i in range(5)]] == list(range(5))
+        fu = work(None, attempts, release)
+        assert fu.result(timeout=20) == 'speculative'
+    finally:
+        release.set()
+
+    # wait for the original attempt, and its done callbacks, to complete
+    dfk.executors['threads'].executor.shutdown(wait=True)
+    assert attempts == [0, 1]
+    assert 'exception calling callback' not in caplog.text
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_failed_copy_ignored():
+    """A failure of a speculative copy is ignored while the original attempt
+    is still running.
+    """
+    dfk = load_speculation_config()
+    release = threading.Event()
+    attempts = []
+    try:
+        assert [fu.result() for fu in [work(i) for i in range(5)]] == list(range(5))
+        fu = work(None, attempts, release, fail_copy=True)
+        deadline = time.time() + 20
+        while len(attempts) < 2 and time.time() < deadline:
+            time.sleep(0.1)
+        time.sleep(0.5)
+        assert not fu.done()
+    finally:
+        release.set()
+
+    assert fu.result(timeout=20) == 'original'
+    assert attempts == [0, 1]
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+@pytest.mark.local
+def test_copy_on_other_executor():
+    """A speculative copy of a task is sent to another of the executors the
+    task could run on.
+    """
+    config = fresh_config()
+    config.executors = [ThreadPoolExecutor(label='first', thread_name_prefix='first'),
+                        ThreadPoolExecutor(label='second', thread_name_prefix='second')]
+    config.speculative_execution = True
+    config.speculative_execution_min_samples = 3
+    dfk = parsl.load(config)
+    release = threading.Event()
+    threads = []
+    try:
+        assert all(fu.result().startswith('first') for fu in [python_app(where, executors=['first'])([]) for i in range(5)])
+        # the original may be sent to either executor, and its copy to the other
+        assert python_app(where)(threads, release).result(timeout=20) == threads[1]
+        assert sorted(t.split('_')[0] for t in threads) == ['first', 'second']
+    finally:
+        release.set()
+
+    dfk.cleanup()
+    parsl.clear()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    test_stragglers()
@@ -0,0 +1,105 @@
+import argparse
+import gc
+import logging
+import threading
+import tracemalloc
+
+from concurrent.futures import Future
+
+import parsl
+from parsl.app.app import python_app
+from parsl.dataflow.taskrecord import TaskRecord
+
+
+@python_app
+def identity(x, y=None):
+    return x
+
+
+@python_app
+def wait_for(event, payload):
+    event.wait()
+    return len(payload)
+
+
+def test_memory_per_task(n=5000):
+    """Measure the memory held by the DFK for each pending task.
+    """
+    blocker = Future()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        futs = [identity(blocker, y=i) for i in range(n)]
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    # Exclude log records, which may be retained by log capturing handlers
+    # (for example, when running under pytest) and are not held by the DFK.
+    filters = [tracemalloc.Filter(False, logging.__file__),
+               tracemalloc.Filter(False, "*/logging/*"),
+               tracemalloc.Filter(False, "*/_pytest/*")]
+    before = before.filter_traces(filters)
+    after = after.filter_traces(filters)
+
+    per_task = sum(s.size_diff for s in after.compare_to(before, 'filename')) / n
+    print("Memory per pending task: {} bytes".format(per_task))
+
+    blocker.set_result(1)
+    assert [f.result() for f in futs] == [1] * n
+
+    assert per_task < 4096, "Pending tasks use more memory than expected"
+
+
+def test_task_record_is_slotted():
+    fu = identity(1)
+    fu.result()
+    assert not hasattr(fu.task_record, '__dict__'), "TaskRecord should not have a per-instance dict"
+    assert isinstance(fu.task_record, TaskRecord)
+
+
+def test_task_def():
+    """Futures still give their task record as task_def, with subscript access."""
+    fu = identity(1)
+    fu.result()
+    assert fu.task_def is fu.task_record
+    assert fu.task_def['id'] == fu.tid
+    assert fu.task_def['func_name'] == 'identity'
+
+
+def test_arguments_released_after_launch():
+    """Once a task has been launched with no retries left, the DFK should
+    not hold onto its arguments.
+    """
+    dfk = parsl.dfk()
+    if dfk.config.retries > 0 or dfk.speculator is not None:
+        # arguments are kept for retries, and for speculative copies
+        return
+
+    event = threading.Event()
+    fu = wait_for(event, [0] * 1000)
+    try:
+        record = dfk.tasks[fu.tid]
+        assert record.args is None, "Task arguments should be released once the task is launched"
+    finally:
+        event.set()
+    assert fu.result() == 1000
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="5000",
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load()
+    test_memory_per_task(int(args.count))
@@ -0,0 +1,95 @@
+import argparse
+
+import pytest
+
+import parsl
+from parsl.app.app import bash_app, python_app
+from parsl.config import Config
+from parsl.dataflow.error import ConfigurationError
+
+
+@python_app
+def square(x):
+    return x * x
+
+
+@python_app
+def fail_on(x, bad=None):
+    if x == bad:
+        raise ValueError("Intentional failure on {}".format(x))
+    return x
+
+
+@bash_app
+def echo(x):
+    return "echo {}".format(x)
+
+
+def test_imap_unordered(n=200):
+    results = list(square.imap_unordered(range(n), max_inflight=10))
+    assert sorted(results) == sorted(i * i for i in range(n))
+
+
+def test_window_bounds_tasks(n=200, window=5):
+    """Items are only pulled from the iterable as slots free up, and the DFK
+    never holds more than a window of tasks from the sweep.
+    """
+    dfk = parsl.dfk()
+    pulled = []
+
+    def sweep():
+        for i in range(n):
+            pulled.append(i)
+            yield i
+
+    baseline = len(dfk.tasks)
+    results = []
+    for r in square.imap_unordered(sweep(), max_inflight=window):
+        assert len(pulled) - len(results) <= window
+        if dfk.checkpoint_mode is None:
+            assert len(dfk.tasks) - baseline <= window
+        results.append(r)
+
+    assert len(pulled) == n
+    assert sorted(results) == sorted(i * i for i in range(n))
+
+
+def test_submit_windowed_yields_futures(n=50):
+    dfk = parsl.dfk()
+    futs = list(dfk.submit_windowed(square.func, ((i,) for i in range(n)), max_inflight=7, fn_hash='square'))
+    assert len(futs) == n
+    assert all(f.done() for f in futs)
+    assert sorted(f.result() for f in futs) == sorted(i * i for i in range(n))
+
+
+def test_imap_unordered_failure():
+    with pytest.raises(ValueError):
+        list(fail_on.imap_unordered(range(20), max_inflight=4, bad=10))
+
+
+def test_bad_window():
+    with pytest.raises(ValueError):
+        list(square.imap_unordered(range(5), max_inflight=0))
+
+    with pytest.raises(ConfigurationError):
+        Config(max_inflight=0)
+
+
+def test_bash_imap_unordered(n=5):
+    assert list(echo.imap_unordered(range(n), max_inflight=2)) == [0] * n
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--count", default="200",
+                        help="Count of apps to launch")
+    parser.add_argument("-d", "--debug", action='store_true',
+                        help="Count of apps to launch")
+    args = parser.parse_args()
+
+    if args.debug:
+        parsl.set_stream_logger()
+
+    parsl.load()
+    test_imap_unordered(int(args.count))
@@ -100,6 +100,42 @@ def get_last_checkpoint(rundir: str = "runinfo") -> List[str]:
     return [last_checkpoint]
 
 
+@typeguard.typechecked
+def compact_checkpoints(output_dir: str, rundir: str = "runinfo") -> List[str]:
+    """Merges the checkpoints from all runs into a single checkpoint.
+
+    The merged checkpoint holds only the latest result for each task hash,
+    and is indexed, so that loading it takes the place of loading every
+    previous checkpoint with :func:`get_all_checkpoints`. The earlier
+    checkpoints are left in place. Later calls with the same output_dir merge
+    only the checkpoints of runs which have not been merged before, so this
+    can be called at the start of every run.
+
+    output_dir should not be within rundir, or the merged checkpoint will
+    be found by later calls to :func:`get_all_checkpoints`.
+
+    Args:
+       - output_dir(str) : Directory to write the merged checkpoint to
+
+    Kwargs:
+       - rundir(str) : Path to the runinfo directory
+
+    Returns:
+       - a list suitable for the checkpointFiles parameter of the DataFlowKernel
+         constructor, with 0 or 1 elements
+
+    """
+    from parsl.dataflow.checkpoints import SqliteCheckpointStore, merge_checkpoints
+
+    output_dir = os.path.abspath(output_dir)
+    checkpoints = get_all_checkpoints(rundir)
+    if checkpoints:
+        merge_checkpoints(checkpoints, output_dir)
+    elif not os.path.exists(os.path.join(output_dir, SqliteCheckpointStore.filename)):
+        return []
+    return [output_dir]
+
+
 def get_std_fname_mode(fdname, stdfspec):
     import parsl.app.errors as pe
     if stdfspec is None:
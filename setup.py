@@ -66,5 +66,6 @@ setup(
       [
        'parsl-globus-auth=parsl.data_provider.globus:cli_run',
        'parsl-visualize=parsl.monitoring.visualization.app:cli_run',
+       'parsl-compact-checkpoints=parsl.dataflow.checkpoints:cli_run',
       ]}
 )